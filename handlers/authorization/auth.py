@@ -1,6 +1,10 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+import asyncio
+
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
 from services.api_client import login_user
+from services.keyboards import ROLE_CHOICE_KEYBOARD, START_KEYBOARD, main_menu_keyboard
+from services.subscriptions import unsubscribe
 from decouple import config
 
 ENTER_ROLE, AUTH_COMPLETE = range(2)
@@ -18,13 +22,8 @@ async def start_auth(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["tg_id"] = tg_id
 
 
-    keyboard = [
-        [KeyboardButton("Бенефіціар"), KeyboardButton("Волонтер")],
-        [KeyboardButton("Скасувати авторизацію")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
     await update.message.reply_text(
-        "Виберіть вашу роль:", reply_markup=reply_markup
+        "Виберіть вашу роль:", reply_markup=ROLE_CHOICE_KEYBOARD
     )
     return ENTER_ROLE
 
@@ -66,40 +65,28 @@ async def enter_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return ConversationHandler.END
     except ValueError as e:
         await update.message.reply_text(f"Помилка даних: {str(e)}. Уточніть ваші дані й спробуйте ще раз.",
-                                        reply_markup=ReplyKeyboardMarkup(
-                                            keyboard=[[KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]],
-                                            resize_keyboard=True, one_time_keyboard=False
-                                        ))
+                                        reply_markup=START_KEYBOARD)
         return ConversationHandler.END
     except PermissionError as e:
         await update.message.reply_text(f"Доступ заборонено: {str(e)}. Зверніться до служби підтримки.",
-                                        reply_markup=ReplyKeyboardMarkup(
-                                            keyboard=[
-                                                [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]],
-                                            resize_keyboard=True, one_time_keyboard=False
-                                        ))
+                                        reply_markup=START_KEYBOARD)
 
         return ConversationHandler.END
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         await update.message.reply_text(f"Сталася помилка: {str(e)}. Спробуйте пізніше.",
-                                        reply_markup=ReplyKeyboardMarkup(
-                                            keyboard=[
-                                                [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]],
-                                            resize_keyboard=True, one_time_keyboard=False
-                                        ))
+                                        reply_markup=START_KEYBOARD)
 
         return ConversationHandler.END
 
 async def cancel_auth(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Скасування авторизації."""
-    keyboard = [[KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
-    await update.message.reply_text("Авторизацію скасовано.",
-                                    reply_markup=reply_markup)
+    await update.message.reply_text("Авторизацію скасовано.", reply_markup=START_KEYBOARD)
     return ConversationHandler.END
 
 auth_handler = ConversationHandler(
+    name="auth",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Авторизація$"), start_auth)],
     states={
         ENTER_ROLE: [MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.Regex("^Скасувати авторизацію$"), enter_role)],
@@ -112,44 +99,21 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     role_id = context.user_data.get("role_id")
 
     if role_id == 2:
-        keyboard = [
-            [KeyboardButton("Список завдань")],
-            [KeyboardButton("Прийняти заявку в обробку")],
-            [KeyboardButton("Закрити заявку")],
-            [KeyboardButton("Скасувати заявку")],
-            [KeyboardButton("Редагувати профіль")],
-            [KeyboardButton("Деактивувати профіль волонтера")],
-            [KeyboardButton("Вихід")]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-        await update.message.reply_text("Головне меню для волонтера:", reply_markup=reply_markup)
+        await update.message.reply_text("Головне меню для волонтера:", reply_markup=main_menu_keyboard(role_id))
 
     elif role_id == 1:
-        keyboard = [
-            [KeyboardButton("Деактивувати профіль бенефіціара")],
-            [KeyboardButton("Подати заявку")],
-            [KeyboardButton("Підтвердити заявку")],
-            [KeyboardButton("Деактивувати заявку")],
-            [KeyboardButton("Переглянути мої заявки")],
-            [KeyboardButton("Вихід")]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-        await update.message.reply_text("Головне меню для бенефіціара:", reply_markup=reply_markup)
+        await update.message.reply_text("Головне меню для бенефіціара:", reply_markup=main_menu_keyboard(role_id))
 
 
 async def handle_exit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обробка кнопки 'Вийти'. Повертає користувача до сторінки авторизації та реєстрації."""
 
     context.user_data.clear()
+    # Після виходу сповіщення про нові заявки більше не надсилаються.
+    await asyncio.to_thread(unsubscribe, update.effective_user.id)
 
 
-    keyboard = [
-        [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
-
-    await update.message.reply_text("Ви вийшли з облікового запису. Будь ласка, оберіть опцію:", reply_markup=reply_markup)
+    await update.message.reply_text("Ви вийшли з облікового запису. Будь ласка, оберіть опцію:", reply_markup=START_KEYBOARD)
 
 
 
@@ -1,14 +1,17 @@
 import re
 from datetime import datetime
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, \
-    ReplyKeyboardRemove
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, CallbackQueryHandler, \
     filters
-from urllib3 import request
 
-from handlers.beneficiary.create_application import reverse_geocode, ensure_valid_token
 from services.api_client import register_user, login_user, get_applications_by_status, accept_application
+from services.geocoding import reverse_geocode
+from services.keyboards import CANCEL_KEYBOARD, CONFIRM_KEYBOARD, CONFIRM_OR_EDIT_KEYBOARD, DEVICE_KEYBOARD, \
+    EXECUTE_APPLICATION_KEYBOARD, MODERATOR_START_KEYBOARD, SHARE_CONTACT_KEYBOARD, SHARE_LOCATION_KEYBOARD, \
+    START_KEYBOARD, VOLUNTEER_MENU, check_status_keyboard, main_menu_keyboard
+from services.records import find_record
+from services.token_manager import call_with_token
 
 AWAIT_CONFIRMATION, AWAIT_AUTHORIZATION, ENTER_PHONE, ENTER_FIRSTNAME, ENTER_LASTNAME, ENTER_PATRONYMIC, CHOOSE_DEVICE, ENTER_LOCATION, SELECT_APPLICATION, CONFIRM_APPLICATION, CONFIRM_DATA, CONFIRM_OR_EDIT = range(
     12)
@@ -36,23 +39,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         elif param == "beneficiary":
             return await start_beneficiary_registration(update, context)
 
-    keyboard = [
-        [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")],
-        [KeyboardButton("Авторизація модератора")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     await update.message.reply_text(
         "🎉 Вітаємо!👋 Оберіть одну з опцій нижче, щоб продовжити.",
-        reply_markup=reply_markup
+        reply_markup=MODERATOR_START_KEYBOARD
     )
 
     return ConversationHandler.END
 
 
-from datetime import datetime
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import CallbackQueryHandler
-
 async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE, application_id: str) -> int:
     """
     Логіка обробки заявки за її ID.
@@ -60,9 +54,8 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
     і надсилає повідомлення з кнопками для підтвердження.
     """
     try:
-        access_token = await ensure_valid_token(context)
-
-        applications = await get_applications_by_status(access_token, status="available")
+        applications = await call_with_token(
+            context, lambda token: get_applications_by_status(token, status="available"))
 
         application_data = next((app for app in applications if str(app['id']) == application_id), None)
 
@@ -103,18 +96,20 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
             if query.data == "confirm_yes":
 
                 try:
-                    application_data = await accept_application(access_token, int(application_id))
+                    application_data = await call_with_token(
+                        context, lambda token: accept_application(token, int(application_id)))
 
-                    local_application_data = next(
-                        (app for app in context.user_data["applications_list"] if str(app["id"]) == application_id), {})
+                    local_application = find_record(context.user_data.get("applications_list", []), application_id)
 
                     creator_name = (
                             application_data.get("creator", {}).get("first_name")
-                            or local_application_data.get("creator", {}).get("first_name", "Ім'я не вказано")
+                            or (local_application and local_application.creator_name)
+                            or "Ім'я не вказано"
                     )
                     creator_phone = (
                             application_data.get("creator", {}).get("phone_num")
-                            or local_application_data.get("creator", {}).get("phone_num", "Телефон не вказано")
+                            or (local_application and local_application.creator_phone)
+                            or "Телефон не вказано"
                     )
 
                     location = application_data.get("location", {})
@@ -156,17 +151,6 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
                         f"{location_text}"
                     )
 
-                    next_keyboard = [
-                        [KeyboardButton("Список завдань")],
-                        [KeyboardButton("Прийняти заявку в обробку")],
-                        [KeyboardButton("Закрити заявку")],
-                        [KeyboardButton("Скасувати заявку")],
-                        [KeyboardButton("Редагувати профіль")],
-                        [KeyboardButton("Деактивувати профіль волонтера")],
-                        [KeyboardButton("Вихід")],
-                    ]
-                    reply_markup = ReplyKeyboardMarkup(next_keyboard, resize_keyboard=True)
-
                     await query.edit_message_text(
                         confirmation_text,
                         parse_mode="Markdown",
@@ -175,7 +159,7 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
 
                     await query.message.reply_text(
                         "Оберіть наступну дію з меню:",
-                        reply_markup=reply_markup,
+                        reply_markup=VOLUNTEER_MENU,
                     )
 
                 except Exception as e:
@@ -186,17 +170,6 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
                     await main_menu(update, context)
 
             elif query.data == "confirm_no":
-                next_keyboard = [
-                    [KeyboardButton("Список завдань")],
-                    [KeyboardButton("Прийняти заявку в обробку")],
-                    [KeyboardButton("Закрити заявку")],
-                    [KeyboardButton("Скасувати заявку")],
-                    [KeyboardButton("Редагувати профіль")],
-                    [KeyboardButton("Деактивувати профіль волонтера")],
-                    [KeyboardButton("Вихід")]
-                ]
-                reply_markup = ReplyKeyboardMarkup(next_keyboard, resize_keyboard=True)
-
                 await query.edit_message_text(
                     text="Заявка не підтверджена. Оберіть наступну дію:",
                     parse_mode="Markdown"
@@ -206,7 +179,7 @@ async def process_application(update: Update, context: ContextTypes.DEFAULT_TYPE
                 if effective_message:
                     await effective_message.reply_text(
                         text="Головне меню:",
-                        reply_markup=reply_markup
+                        reply_markup=VOLUNTEER_MENU
                     )
 
             context.user_data.pop("pending_application_id", None)
@@ -345,37 +318,19 @@ async def check_and_start_registration(update: Update, context: ContextTypes.DEF
 
             confirmation_message += "Якщо дані вірні, натисніть '✅ Підтвердити'. Якщо потрібно внести зміни, натисніть '✏️ Редагувати'."
 
-            keyboard = [
-                [KeyboardButton("✅ Підтвердити")],
-                [KeyboardButton("✏️ Редагувати")],
-                [KeyboardButton("❌ Скасувати")],
-            ]
-
-            reply_markup = ReplyKeyboardMarkup(
-
-                keyboard, resize_keyboard=True, one_time_keyboard=True
-            )
             await update.message.reply_text(
                 confirmation_message,
                 parse_mode="Markdown",
                 disable_web_page_preview=True,
-                reply_markup=reply_markup,
+                reply_markup=CONFIRM_OR_EDIT_KEYBOARD,
             )
             return CONFIRM_OR_EDIT
 
 
     except PermissionError:
-        keyboard = [
-            [KeyboardButton("🔍 Перевірити статус волонтера")],
-            [KeyboardButton("❌ Скасувати")]
-        ] if role_id == 2 else [
-            [KeyboardButton("🔍 Перевірити статус бенефіціара")],
-            [KeyboardButton("❌ Скасувати")]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text(
             "❗ Доступ заборонено. Зверніться до адміністратора або дочекайтеся підтвердження модератора.",
-            reply_markup=reply_markup
+            reply_markup=check_status_keyboard(role_id)
         )
         return AWAIT_CONFIRMATION
 
@@ -415,12 +370,7 @@ async def start_application_flow(update: Update, context: ContextTypes.DEFAULT_T
         "🔒 Ви не авторизовані. Щоб продовжити обробку заявки, натисніть кнопку 'Виконати заявку'."
     )
 
-    keyboard = [
-        [KeyboardButton("🟢 Виконати заявку")],
-        [KeyboardButton("❌ Скасувати")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-    await update.message.reply_text("Виберіть дію:", reply_markup=reply_markup)
+    await update.message.reply_text("Виберіть дію:", reply_markup=EXECUTE_APPLICATION_KEYBOARD)
 
     return AWAIT_AUTHORIZATION
 
@@ -457,23 +407,9 @@ async def handle_confirm_or_edit(update: Update, context: ContextTypes.DEFAULT_T
         try:
             await register_user(update.message.from_user.id, user_data)
 
-            if role_id == 2:
-                keyboard = [
-                    [KeyboardButton("🔍 Перевірити статус волонтера")],
-                    [KeyboardButton("❌ Скасувати")]
-                ]
-            else:
-                keyboard = [
-                    [KeyboardButton("🔍 Перевірити статус бенефіціара")],
-                    [KeyboardButton("❌ Скасувати")]
-                ]
-
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
-
             await update.message.reply_text(
                 f"{response_text} Ви можете перевірити статус або повернутися до меню.",
-                reply_markup=reply_markup
+                reply_markup=check_status_keyboard(role_id)
             )
             return AWAIT_CONFIRMATION
         except Exception as e:
@@ -490,14 +426,9 @@ async def handle_confirm_or_edit(update: Update, context: ContextTypes.DEFAULT_T
 
 async def start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок процесу реєстрації."""
-    keyboard = [
-        [KeyboardButton("📱 Надіслати номер телефону", request_contact=True)],
-        [KeyboardButton("❌ Скасувати")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
     await update.message.reply_text(
         "📲 Для реєстрації, будь ласка, надішліть свій номер телефону за допомогою кнопки нижче:",
-        reply_markup=reply_markup
+        reply_markup=SHARE_CONTACT_KEYBOARD
     )
     return ENTER_PHONE
 
@@ -522,9 +453,6 @@ async def enter_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         print("Extracted phone number:", phone)
         context.user_data["phone_num"] = phone
 
-        keyboard = [[KeyboardButton("❌ Скасувати")]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
         await update.message.reply_text(
             "📝 Будь ласка, введіть своє повне ім'я в одному рядку, розділяючи частини пробілами.\n\n"
             "🔹 Наприклад:\n"
@@ -532,7 +460,7 @@ async def enter_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
             "- Іван Петренко (тільки ім'я та прізвище)\n"
             "- Іван (лише ім'я)\n\n"
             "Якщо ви введете тільки ім'я, буде збережено лише його.",
-            reply_markup=reply_markup
+            reply_markup=CANCEL_KEYBOARD
         )
 
         print("Proceeding to ENTER_FIRSTNAME")
@@ -581,15 +509,9 @@ async def enter_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def choose_device(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Запитує, чи працює користувач з телефону чи ПК."""
-    keyboard = [
-        [KeyboardButton("📱 Я на телефоні")],
-        [KeyboardButton("💻 Я використовую ПК")],
-        [KeyboardButton("❌ Скасувати")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
     await update.message.reply_text(
         "Вкажіть, будь ласка, чи працюєте ви з телефону чи ПК: 🖥️📱",
-        reply_markup=reply_markup
+        reply_markup=DEVICE_KEYBOARD
     )
     return ENTER_LOCATION
 
@@ -603,11 +525,6 @@ async def enter_coordinates(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return await cancel(update, context)
 
         if user_response == "📱 Я на телефоні":
-            keyboard = [
-                [KeyboardButton("📍 Поділитися локацією", request_location=True)],
-                [KeyboardButton("❌ Скасувати")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
             await update.message.reply_text(
         "🔔 **Інструкція для користувача мобільного телефону:**\n\n"
         "1. **Увімкніть місцезнаходження:**\n"
@@ -619,15 +536,11 @@ async def enter_coordinates(update: Update, context: ContextTypes.DEFAULT_TYPE)
         "   - Натисніть кнопку \"📍 Поділитися локацією\".\n"
         "   - З'явиться вікно з картою, де ви зможете вручну вибрати точку або перемістити маркер на правильне місце.\n"
         "   - Після вибору потрібної точки, підтвердіть локацію і надішліть її.",
-                reply_markup=reply_markup, parse_mode="Markdown"
+                reply_markup=SHARE_LOCATION_KEYBOARD, parse_mode="Markdown"
             )
             return ENTER_LOCATION
 
         elif user_response == "💻 Я використовую ПК":
-            keyboard = [
-                [KeyboardButton("❌ Скасувати")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
             await update.message.reply_text(
                 "💻 **Як знайти координати за допомогою Google Maps на ПК:**\n\n"
                 "1️⃣ Відкрийте [Google Maps](https://www.google.com/maps) у вашому браузері.\n"
@@ -637,7 +550,7 @@ async def enter_coordinates(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 "5️⃣ Координати (широта та довгота) автоматично скопіюються в буфер обміну.\n"
                 "6️⃣ Поверніться до цього чату і натисніть праву кнопку миші (ПКМ) у текстовому полі чату, а потім виберіть **'Вставити'**.\n"
                 "   Також можна використати комбінацію клавіш **Ctrl + V** для вставлення.\n\n"
-                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=reply_markup
+                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=CANCEL_KEYBOARD
             )
             return ENTER_LOCATION
 
@@ -720,13 +633,7 @@ async def confirm_registration(update: Update, context: ContextTypes.DEFAULT_TYP
         "Якщо все вірно, натисніть '✅ Підтвердити'. Якщо потрібно виправити, натисніть '✏️ Редагувати'."
     )
 
-    keyboard = [
-        [KeyboardButton("✅ Підтвердити")],
-        [KeyboardButton("❌ Скасувати")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
-    await update.message.reply_text(confirmation_message, reply_markup=reply_markup)
+    await update.message.reply_text(confirmation_message, reply_markup=CONFIRM_KEYBOARD)
     return CONFIRM_DATA
 
 
@@ -741,40 +648,17 @@ async def send_to_api(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         await register_user(user_id, user_data)
         role_id = user_data.get("role_id")
 
-        if role_id == 2:
-            keyboard = [
-                [KeyboardButton("🔍 Перевірити статус волонтера")],
-                [KeyboardButton("❌ Скасувати")]
-            ]
-        else:
-            keyboard = [
-                [KeyboardButton("🔍 Перевірити статус бенефіціара")],
-                [KeyboardButton("❌ Скасувати")]
-            ]
-
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
         await update.message.reply_text(
             "✅ Реєстрація успішна! Ви можете перевірити статус або повернутися до меню.",
-            reply_markup=reply_markup
+            reply_markup=check_status_keyboard(role_id)
         )
 
         return AWAIT_CONFIRMATION
     except PermissionError:
 
-        keyboard = [
-            [KeyboardButton("🔍 Перевірити статус волонтера")],
-            [KeyboardButton("❌ Скасувати")]
-        ] if user_data.get("role_id") == 2 else [
-            [KeyboardButton("🔍 Перевірити статус бенефіціара")],
-            [KeyboardButton("❌ Скасувати")]
-        ]
-
-
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text(
             "Доступ заборонено. Зверніться до адміністратора або дочекайтеся підтвердження модератора.",
-            reply_markup=reply_markup
+            reply_markup=check_status_keyboard(user_data.get("role_id"))
         )
 
         return AWAIT_CONFIRMATION
@@ -795,12 +679,9 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             reply_markup=ReplyKeyboardRemove()
         )
 
-        keyboard = [[KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
         await update.message.reply_text(
             "Виберіть одну з опцій:",
-            reply_markup=reply_markup
+            reply_markup=START_KEYBOARD
         )
 
         return ConversationHandler.END
@@ -816,31 +697,12 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Головне меню для користувача після реєстрації."""
     role_id = context.user_data.get("role_id")
 
-    if role_id == 2:
-        keyboard = [
-            [KeyboardButton("Список завдань")],
-            [KeyboardButton("Прийняти заявку в обробку")],
-            [KeyboardButton("Закрити заявку")],
-            [KeyboardButton("Скасувати заявку")],
-            [KeyboardButton("Редагувати профіль")],
-            [KeyboardButton("Деактивувати профіль волонтера")],
-            [KeyboardButton("Вихід")]
-        ]
-    else:
-        keyboard = [
-            [KeyboardButton("Подати заявку")],
-            [KeyboardButton("Підтвердити заявку")],
-            [KeyboardButton("Деактивувати заявку")],
-            [KeyboardButton("Переглянути мої заявки")],
-            [KeyboardButton("Деактивувати профіль бенефіціара")],
-            [KeyboardButton("Вихід")]
-        ]
-
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
-    await update.message.reply_text("Оберіть дію:", reply_markup=reply_markup)
+    await update.message.reply_text("Оберіть дію:", reply_markup=main_menu_keyboard(role_id))
 
 
 registration_handler = ConversationHandler(
+    name="registration",
+    persistent=True,
     entry_points=[
         CommandHandler("start", start),
         MessageHandler(filters.Regex("^Стати волонтером$"), start_volunteer_registration),
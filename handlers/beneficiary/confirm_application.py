@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     ContextTypes,
@@ -8,63 +8,14 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from services.api_client import get_applications_by_type, confirm_application, refresh_token_log
+from services.api_client import get_applications_by_type, confirm_application
+from services.callback_data import APPLICATION, callback_pattern, decode_callback, encode_callback
+from services.token_manager import call_with_token
 
 
 CHOOSE_FINISHED_APPLICATION, CONFIRM_APPLICATION = range(2)
 
 
-
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    """
-    Перевіряє дійсність access_token і оновлює його за потреби.
-    """
-    user_data = context.user_data
-
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="❗️Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-
-
 async def start_confirming_finished_applications(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок процесу підтвердження завершених заявок."""
     if not context.user_data.get("access_token"):
@@ -72,18 +23,17 @@ async def start_confirming_finished_applications(update: Update, context: Contex
         return ConversationHandler.END
 
 
-    access_token = await ensure_valid_token(context)
-
     try:
 
-        applications = await get_applications_by_type(access_token, application_type="complete", role="beneficiary")
+        applications = await call_with_token(
+            context, lambda token: get_applications_by_type(token, application_type="complete", role="beneficiary"))
         if not applications:
             await update.message.reply_text("🔍 Наразі немає завершених заявок для підтвердження.")
             return ConversationHandler.END
 
 
         keyboard = [
-            [InlineKeyboardButton(f"ID: {app['id']} | {app['description']}", callback_data=str(app["id"]))]
+            [InlineKeyboardButton(f"ID: {app['id']} | {app['description']}", callback_data=encode_callback(APPLICATION, id=app["id"]))]
             for app in applications
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -102,7 +52,11 @@ async def choose_finished_application(update: Update, context: ContextTypes.DEFA
     """Обробка вибору завершеної заявки користувачем."""
     query = update.callback_query
     await query.answer()
-    application_id = query.data
+    data = decode_callback(query.data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    application_id = str(data.id)
 
 
     print(f"Selected application ID: {application_id}")
@@ -140,20 +94,14 @@ async def confirm_finished_application(update: Update, context: ContextTypes.DEF
         await query.edit_message_text("⚠️ Помилка: ID заявки не знайдено. Спробуйте знову.")
         return ConversationHandler.END
 
-    try:
-
-        access_token = await ensure_valid_token(context)
-    except Exception as e:
-        await query.edit_message_text(f"🚨 Сталася помилка при перевірці токена: {str(e)}")
-        return ConversationHandler.END
-
     try:
 
         application_id = int(application_id)
         print(f"Confirming application with ID: {application_id}")
 
 
-        await confirm_application(application_id=application_id, access_token=access_token)
+        await call_with_token(
+            context, lambda token: confirm_application(application_id=application_id, access_token=token))
         await query.edit_message_text(f"✅ Заявка з ID {application_id} успішно підтверджена!")
     except ValueError:
         await query.edit_message_text("⚠️ Помилка: ID заявки має бути числовим.")
@@ -170,9 +118,12 @@ async def cancel_confirming_application(update: Update, context: ContextTypes.DE
 
 
 finished_application_confirmation_handler = ConversationHandler(
+    name="application_confirmation",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Підтвердити заявку$"), start_confirming_finished_applications)],
     states={
-        CHOOSE_FINISHED_APPLICATION: [CallbackQueryHandler(choose_finished_application)],
+        CHOOSE_FINISHED_APPLICATION: [
+            CallbackQueryHandler(choose_finished_application, pattern=callback_pattern(APPLICATION))],
         CONFIRM_APPLICATION: [CallbackQueryHandler(confirm_finished_application)],
     },
     fallbacks=[CommandHandler("cancel", cancel_confirming_application)],
@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -7,64 +7,51 @@ from telegram.ext import (
     CallbackQueryHandler,
     filters,
 )
-from services.api_client import create_application, get_categories, refresh_token_log
-from decouple import config
+from services.api_client import create_application
+from services.callback_data import CATEGORY, callback_pattern, decode_callback, encode_callback
+from services.category_cache import get_category_tree
+from services.geocoding import discard_prefetched_address, get_prefetched_address, prefetch_address
+from services.keyboards import APPLICATION_DEVICE_KEYBOARD, APPLICATION_LOCATION_KEYBOARD, BENEFICIARY_MENU, \
+    CANCEL_APPLICATION_KEYBOARD
+from services.token_manager import call_with_token
 
-CLIENT_NAME = config("CLIENT_NAME")
-CLIENT_PASSWORD = config("CLIENT_PASSWORD")
 ENTER_CATEGORY_ID, ENTER_DESCRIPTION, ENTER_LOCATION, ENTER_ACTIVE_TO, CONFIRM_DATA = range(5)
 
-MAIN_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Деактивувати профіль бенефіціара")],
-        [KeyboardButton("Подати заявку")],
-        [KeyboardButton("Підтвердити заявку")],
-        [KeyboardButton("Деактивувати заявку")],
-        [KeyboardButton("Переглянути мої заявки")],
-        [KeyboardButton("Вихід")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
 
 async def start_application_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок створення заявки."""
     try:
-        categories = await get_categories(CLIENT_NAME, CLIENT_PASSWORD)
+        tree = await get_category_tree()
 
-        if not categories:
+        if not tree:
             await update.message.reply_text("❌ Категорії відсутні. Спробуйте пізніше.")
-            await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=MAIN_KEYBOARD)
+            await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=BENEFICIARY_MENU)
             return ConversationHandler.END
 
-        parent_categories = [cat for cat in categories if cat["parent_id"] is None]
+        parent_categories = tree.roots
 
         if not parent_categories:
             await update.message.reply_text("❌ Категорії верхнього рівня відсутні.")
-            await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=MAIN_KEYBOARD)
+            await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=BENEFICIARY_MENU)
             return ConversationHandler.END
 
-        cancel_keyboard = ReplyKeyboardMarkup(
-            [[KeyboardButton("❌ Скасувати подачу заявки")]], resize_keyboard=True, one_time_keyboard=True
-        )
         await update.message.reply_text(
             "❗ Натисніть кнопку нижче для скасування реєстрації, якщо захочете змінити якісь дані:",
-            reply_markup=cancel_keyboard)
+            reply_markup=CANCEL_APPLICATION_KEYBOARD)
 
         keyboard = [
-            [InlineKeyboardButton(cat["name"], callback_data=f"parent_{cat['id']}")]
+            [InlineKeyboardButton(cat["name"], callback_data=encode_callback(CATEGORY, id=cat["id"]))]
             for cat in parent_categories
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         await update.message.reply_text("📋 Оберіть категорію:", reply_markup=reply_markup)
 
-        context.user_data["categories"] = categories
         return ENTER_CATEGORY_ID
 
     except Exception as e:
         await update.message.reply_text(f"⚠️ Помилка отримання категорій: {e}")
-        await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=MAIN_KEYBOARD)
+        await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=BENEFICIARY_MENU)
         return ConversationHandler.END
 
 
@@ -73,16 +60,19 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
 
-    callback_data = query.data
-    category_id = int(callback_data.split("_")[1])
+    data = decode_callback(query.data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    category_id = data.id
     context.user_data["category_id"] = category_id
 
-    categories = context.user_data.get("categories", [])
-    subcategories = [cat for cat in categories if cat["parent_id"] == category_id]
+    tree = await get_category_tree()
+    subcategories = tree.children(category_id)
 
     if subcategories:
         keyboard = [
-            [InlineKeyboardButton(cat["name"], callback_data=f"parent_{cat['id']}")]
+            [InlineKeyboardButton(cat["name"], callback_data=encode_callback(CATEGORY, id=cat["id"]))]
             for cat in subcategories
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -90,7 +80,8 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("📋 Оберіть підкатегорію:", reply_markup=reply_markup)
         return ENTER_CATEGORY_ID
     else:
-        await query.edit_message_text(f"✅ Вибрано категорію ID {category_id}.\n📝 Введіть опис вашої заявки:")
+        category_name = tree.breadcrumb(category_id) or f"ID {category_id}"
+        await query.edit_message_text(f"✅ Вибрано категорію {category_name}.\n📝 Введіть опис вашої заявки:")
         return ENTER_DESCRIPTION
 
 
@@ -110,16 +101,9 @@ async def get_description(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     context.user_data["description"] = description
 
-    keyboard = [
-        [KeyboardButton("📱 Я на телефоні")],
-        [KeyboardButton("💻 Я використовую ПК")],
-        [KeyboardButton("❌ Скасувати подачу заявки")],
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-
     await update.message.reply_text(
         "📍 Ви працюєте з телефону чи ПК?\nЦе допоможе нам правильно запросити вашу локацію.",
-        reply_markup=reply_markup
+        reply_markup=APPLICATION_DEVICE_KEYBOARD
     )
     return ENTER_LOCATION
 
@@ -138,10 +122,6 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 
         elif user_response == "📱 я на телефоні":
 
-            keyboard = [[KeyboardButton("📍 Поділитися локацією", request_location=True)],
-                        [KeyboardButton("❌ Скасувати подачу заявки")]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
-
             await update.message.reply_text(
                 "🔔 **Інструкція для користувача мобільного телефону:**\n\n"
                 "1. **Увімкніть місцезнаходження:**\n"
@@ -153,14 +133,11 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
                 "   - Натисніть кнопку \"📍 Поділитися локацією\".\n"
                 "   - З'явиться вікно з картою, де ви зможете вручну вибрати точку або перемістити маркер на правильне місце.\n"
                 "   - Після вибору потрібної точки, підтвердіть локацію і надішліть її.",
-                reply_markup=reply_markup, parse_mode="Markdown"
+                reply_markup=APPLICATION_LOCATION_KEYBOARD, parse_mode="Markdown"
             )
             return ENTER_LOCATION
 
         elif user_response == "💻 я використовую пк":
-            keyboard = [[KeyboardButton("❌ скасувати подачу заявки")]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
-
             await update.message.reply_text(
                 "💻 **Як знайти координати за допомогою Google Maps на ПК:**\n\n"
                 "1️⃣ Відкрийте [Google Maps](https://www.google.com/maps) у вашому браузері.\n"
@@ -170,7 +147,7 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
                 "5️⃣ Координати (широта та довгота) автоматично скопіюються в буфер обміну.\n"
                 "6️⃣ Поверніться до цього чату і натисніть праву кнопку миші (ПКМ) у текстовому полі чату, а потім виберіть **'Вставити'**.\n"
                 "   Також можна використати комбінацію клавіш **Ctrl + V** для вставлення.\n\n"
-                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=reply_markup
+                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=CANCEL_APPLICATION_KEYBOARD
             )
             return ENTER_LOCATION
 
@@ -180,13 +157,10 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             latitude = float(coordinates_match.group(1))
             longitude = float(coordinates_match.group(3))
             context.user_data["location"] = {"latitude": latitude, "longitude": longitude}
-
-            address = await reverse_geocode(latitude, longitude)
-            context.user_data["location"]["address"] = address
+            prefetch_address(update.effective_user.id, latitude, longitude)
 
             await update.message.reply_text(
-                f"🎉 **Координати отримано!**\n"
-                f"📍 **Адреса:** {address}\n\n"
+                "🎉 **Координати отримано!**\n\n"
                 "🗓️ Тепер введіть дату, до якої заявка буде активною (у форматі ДД.ММ.РРРР 00:00):",
                 parse_mode="Markdown"
             )
@@ -202,12 +176,13 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             return ENTER_ACTIVE_TO
 
 
-
     elif update.message.location:
         context.user_data["location"] = {
             "latitude": update.message.location.latitude,
             "longitude": update.message.location.longitude,
         }
+        prefetch_address(update.effective_user.id, update.message.location.latitude,
+                         update.message.location.longitude)
         await update.message.reply_text(
             "📍 Локацію отримано!\n\n"
             "🗓️ Тепер введіть дату, до якої заявка буде активною (у форматі ДД.ММ.РРРР 00:00):"
@@ -217,40 +192,17 @@ async def get_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     return ENTER_LOCATION
 
 
-import aiohttp
-
-GOOGLE_GEOCODING_API_KEY = config("GOOGLE_GEOCODING_API_KEY")
-
-
-async def reverse_geocode(latitude: float, longitude: float) -> str:
-    """Перетворює координати в адресу за допомогою Google Maps Geocoding API."""
-    url = (
-        f"https://maps.googleapis.com/maps/api/geocode/json"
-        f"?latlng={latitude},{longitude}&key={GOOGLE_GEOCODING_API_KEY}"
-    )
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                data = await response.json()
-
-                print(f"Geocoding API Response: {data}")
-                if data["status"] == "OK" and data["results"]:
-                    return data["results"][0]["formatted_address"]
-                else:
-                    return "Адресу не вдалося знайти 😔"
-    except Exception as e:
-        return f"❌ Помилка геокодування: {e}"
-
-
 async def get_active_to(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_data = context.user_data
     location = user_data.get("location", {})
     location_info = ""
 
-    if "latitude" in location and "longitude" in location:
-        address = await reverse_geocode(location["latitude"], location["longitude"])
-        location_info = f"📍 Адреса: {address}"
-    elif "address" in location:
+    if "latitude" in location and "longitude" in location and "address" not in location:
+        # Геокодування запущене ще в get_location; тут лише чекаємо на результат.
+        location["address"] = await get_prefetched_address(
+            update.effective_user.id, location["latitude"], location["longitude"])
+
+    if "address" in location:
         location_info = f"📍 Адреса: {location['address']}"
     else:
         location_info = "🚫 Локація не вказана."
@@ -273,112 +225,42 @@ async def get_active_to(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
     await update.message.reply_text(confirmation_message, reply_markup=reply_markup)
 
-    cancel_keyboard = ReplyKeyboardMarkup(
-        [[KeyboardButton("❌ Скасувати подачу заявки")]],
-        resize_keyboard=True,
-        one_time_keyboard=False
-    )
     await update.message.reply_text(
         "❗ Якщо потрібно скасувати заявку, натисніть кнопку нижче:",
-        reply_markup=cancel_keyboard
+        reply_markup=CANCEL_APPLICATION_KEYBOARD
     )
 
     return CONFIRM_DATA
 
 
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-
-
 async def confirm_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Підтвердження заявки."""
     query = update.callback_query
     await query.answer()
 
     user_data = context.user_data
-    access_token = user_data.get("access_token")
 
     try:
-
-        result = await create_application(
+        result = await call_with_token(context, lambda token: create_application(
             description=user_data["description"],
             category_id=user_data.get("category_id"),
             address=user_data["location"].get("address"),
             latitude=user_data["location"].get("latitude"),
             longitude=user_data["location"].get("longitude"),
             active_to=user_data["active_to"],
-            access_token=access_token,
-        )
+            access_token=token,
+        ))
         await query.edit_message_text(f"🎉 Заявка успішно створена!\nID: {result['id']}")
     except Exception as e:
-        if "401" in str(e):
-            try:
-                access_token = await ensure_valid_token(context)
-
-                result = await create_application(
-                    description=user_data["description"],
-                    category_id=user_data.get("category_id"),
-                    address=user_data["location"].get("address"),
-                    latitude=user_data["location"].get("latitude"),
-                    longitude=user_data["location"].get("longitude"),
-                    active_to=user_data["active_to"],
-                    access_token=access_token,
-                )
-                await query.edit_message_text(f"🎉 Заявка успішно створена!\nID: {result['id']}")
-            except Exception as refresh_error:
-                await query.edit_message_text(f"❌ Помилка при оновленні токена: {refresh_error}")
-                return ConversationHandler.END
-        else:
-            await query.edit_message_text(f"❌ Помилка при створенні заявки: {e}")
+        await query.edit_message_text(f"❌ Помилка при створенні заявки: {e}")
 
-    await query.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=MAIN_KEYBOARD)
+    await query.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=BENEFICIARY_MENU)
     return ConversationHandler.END
 
 
 async def cancel_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Скасування створення заявки."""
+    discard_prefetched_address(update.effective_user.id)
     query = update.callback_query
     if query:
         await query.answer()
@@ -386,15 +268,17 @@ async def cancel_application(update: Update, context: ContextTypes.DEFAULT_TYPE)
     else:
         await update.message.reply_text("❌ Процес створення заявки скасовано.")
 
-    await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=MAIN_KEYBOARD)
+    await update.message.reply_text("🔙 Повертаємось до головного меню.", reply_markup=BENEFICIARY_MENU)
     return ConversationHandler.END
 
 
 application_creation_handler = ConversationHandler(
+    name="application_creation",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Подати заявку$"), start_application_creation)],
     states={
         ENTER_CATEGORY_ID: [
-            CallbackQueryHandler(select_category, pattern=r"^parent_\d+$"),
+            CallbackQueryHandler(select_category, pattern=callback_pattern(CATEGORY)),
             MessageHandler(filters.TEXT & filters.Regex("^❌ Скасувати подачу заявки$"), cancel_application),
         ],
         ENTER_DESCRIPTION: [
@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -7,59 +7,12 @@ from telegram.ext import (
     CallbackQueryHandler,
     filters,
 )
-from services.api_client import get_applications_by_type, delete_application, refresh_token_log
+from services.api_client import get_applications_by_type, delete_application
+from services.callback_data import APPLICATION, callback_pattern, decode_callback, encode_callback
+from services.token_manager import call_with_token
 
 CHOOSE_ACCESSIBLE_APPLICATION, CONFIRM_DELETE = range(2)
 
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    """
-    Перевіряє дійсність access_token і оновлює його за потреби.
-    """
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="❗️ Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-
 
 async def start_accessible_application_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок процесу видалення заявок з типом `accessible`."""
@@ -67,16 +20,16 @@ async def start_accessible_application_deletion(update: Update, context: Context
         await update.message.reply_text("❌ Ви не авторизовані. Спочатку виконайте вхід до системи.")
         return ConversationHandler.END
 
-    access_token = await ensure_valid_token(context)
-
     try:
-        applications = await get_applications_by_type(access_token, application_type="accessible", role="beneficiary")
+        applications = await call_with_token(
+            context, lambda token: get_applications_by_type(token, application_type="accessible", role="beneficiary"))
         if not applications:
             await update.message.reply_text("🔍 Наразі немає доступних заявок для видалення.")
             return ConversationHandler.END
 
         keyboard = [
-            [InlineKeyboardButton(f"ID: {app['id']} | {app['description']}", callback_data=str(app["id"]))] for app in applications
+            [InlineKeyboardButton(f"ID: {app['id']} | {app['description']}", callback_data=encode_callback(APPLICATION, id=app["id"]))]
+            for app in applications
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text("📋 Оберіть заявку зі списку для видалення:", reply_markup=reply_markup)
@@ -95,7 +48,11 @@ async def choose_accessible_application(update: Update, context: ContextTypes.DE
     """Обробка вибору заявки користувачем."""
     query = update.callback_query
     await query.answer()
-    application_id = query.data
+    data = decode_callback(query.data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    application_id = str(data.id)
 
     context.user_data["application_id"] = application_id
 
@@ -127,10 +84,9 @@ async def confirm_accessible_application_deletion(update: Update, context: Conte
         await query.edit_message_text("⚠️ Помилка: ID заявки не знайдено. Спробуйте знову.")
         return ConversationHandler.END
 
-    access_token = await ensure_valid_token(context)
-
     try:
-        await delete_application(application_id=int(application_id), access_token=access_token)
+        await call_with_token(
+            context, lambda token: delete_application(application_id=int(application_id), access_token=token))
         await query.edit_message_text(f"✅ Заявка з ID {application_id} успішно видалена!")
     except Exception as e:
         await query.edit_message_text(f"⚠️ Сталася помилка: {str(e)}")
@@ -145,9 +101,12 @@ async def cancel_accessible_application_deletion(update: Update, context: Contex
 
 
 accessible_application_deletion_handler = ConversationHandler(
+    name="beneficiary_application_deletion",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Деактивувати заявку$"), start_accessible_application_deletion)],
     states={
-        CHOOSE_ACCESSIBLE_APPLICATION: [CallbackQueryHandler(choose_accessible_application)],
+        CHOOSE_ACCESSIBLE_APPLICATION: [
+            CallbackQueryHandler(choose_accessible_application, pattern=callback_pattern(APPLICATION))],
         CONFIRM_DELETE: [CallbackQueryHandler(confirm_accessible_application_deletion)],
     },
     fallbacks=[CommandHandler("cancel", cancel_accessible_application_deletion)],
@@ -1,83 +1,20 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filters
-from services.api_client import deactivate_beneficiary_profile, refresh_token_log  # Імпортуємо функцію для деактивації
+from services.api_client import deactivate_beneficiary_profile  # Імпортуємо функцію для деактивації
+from services.keyboards import BENEFICIARY_MENU, DEACTIVATION_KEYBOARD, START_KEYBOARD
+from services.token_manager import call_with_token, ensure_valid_token
 
 ENTER_DEACTIVATION_CONFIRMATION_VOLUNTEER = range(1)
 
-MAIN_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Деактивувати профіль волонтера")],
-        [KeyboardButton("Подати заявку")],
-        [KeyboardButton("Підтвердити заявку")],
-        [KeyboardButton("Деактивувати заявку")],
-        [KeyboardButton("Переглянути мої заявки")],
-        [KeyboardButton("Вихід")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False,
-)
-
-AUTH_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False,
-)
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=AUTH_KEYBOARD
-    )
-
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    """
-    Перевіряє дійсність access_token і оновлює його за потреби.
-    """
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
 
 async def start_deactivation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Запит на деактивацію профілю бенефіціара."""
     try:
         await ensure_valid_token(context)
 
-        keyboard = [
-            [KeyboardButton("Так, деактивувати мій профіль")],
-            [KeyboardButton("Ні, скасувати деактивацію")],
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text(
             "⚠️ Ви впевнені, що хочете деактивувати свій профіль бенефіціара?",
-            reply_markup=reply_markup,
+            reply_markup=DEACTIVATION_KEYBOARD,
         )
         return ENTER_DEACTIVATION_CONFIRMATION_VOLUNTEER
     except Exception as e:
@@ -91,8 +28,7 @@ async def confirm_deactivation(update: Update, context: ContextTypes.DEFAULT_TYP
 
     if "деактивувати" in text:
         try:
-            access_token = await ensure_valid_token(context)
-            result = await deactivate_beneficiary_profile(access_token)
+            result = await call_with_token(context, deactivate_beneficiary_profile)
 
             if result:
 
@@ -101,18 +37,18 @@ async def confirm_deactivation(update: Update, context: ContextTypes.DEFAULT_TYP
                 await update.message.reply_text("✅ Ваш профіль бенефіціара успішно деактивовано.")
                 await update.message.reply_text(
                     "🔑 Будь ласка, зареєструйтеся або авторизуйтеся для подальшої роботи:",
-                    reply_markup=AUTH_KEYBOARD,
+                    reply_markup=START_KEYBOARD,
                 )
             else:
                 raise RuntimeError("Не вдалося виконати деактивацію профілю.")
         except Exception as e:
             await update.message.reply_text(
-                f"Помилка: {e}. Повертаю вас до головного меню.", reply_markup=MAIN_KEYBOARD
+                f"Помилка: {e}. Повертаю вас до головного меню.", reply_markup=BENEFICIARY_MENU
             )
         return ConversationHandler.END
     elif "скасувати" in text:
         await update.message.reply_text("❌ Деактивація профілю бенефіціара скасована.")
-        await update.message.reply_text("🔙 Повертаюсь до головного меню:", reply_markup=MAIN_KEYBOARD)
+        await update.message.reply_text("🔙 Повертаюсь до головного меню:", reply_markup=BENEFICIARY_MENU)
         return ConversationHandler.END
     else:
         await update.message.reply_text("⚠️ Будь ласка, виберіть одну з наданих опцій.")
@@ -120,6 +56,8 @@ async def confirm_deactivation(update: Update, context: ContextTypes.DEFAULT_TYP
 
 
 deactivation_handler_ben = ConversationHandler(
+    name="beneficiary_deactivation",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Деактивувати профіль бенефіціара"), start_deactivation)],
     states={
         ENTER_DEACTIVATION_CONFIRMATION_VOLUNTEER: [
@@ -1,83 +1,27 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters, \
     CallbackQueryHandler
-from services.api_client import create_or_activate_category, get_categories, refresh_moderator_token
+from services.api_client import create_or_activate_category
+from services.callback_data import CATEGORY, decode_callback, encode_callback
+from services.category_cache import get_cached_categories, invalidate_categories
+from services.keyboards import CANCEL_CATEGORY_KEYBOARD, MODERATOR_MENU
+from services.token_manager import call_with_token
 
 # Константи для станів
 ENTER_CATEGORY_NAME, SELECT_PARENT_CATEGORY, CONFIRM_CREATION = range(3)
 
-MODERATOR_START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером"), KeyboardButton("Стати бенефіціаром")],
-        [KeyboardButton("Авторизація модератора")]
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
-async def ensure_valid_moderator_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    """
-    Перевіряє дійсність access_token для модератора і оновлює його за потреби.
-    """
-    user_data = context.user_data
-
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-
-        await reset_moderator_to_start_menu(context)
-        raise Exception("Refresh token for moderator is missing. Moderator needs to reauthenticate.")
-
-    try:
-
-        tokens = await refresh_moderator_token(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_moderator_to_start_menu(context)
-        raise Exception(f"Failed to refresh moderator access token: {e}")
-
-async def reset_moderator_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає модератора до початкового меню.
-    """
-    if "moderator_user_id" in context.user_data:
-        del context.user_data["moderator_user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу модератора закінчився. Повертаємось до головного меню.",
-        reply_markup=MODERATOR_START_KEYBOARD
-    )
-
-
 
 async def moderator_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Головне меню для модератора."""
-    keyboard = [
-        [KeyboardButton("Додати категорію")],
-        [KeyboardButton("Видалити категорію")],
-        [KeyboardButton("Видалити заявку")],
-        [KeyboardButton("Перевірити користувача")],
-        [KeyboardButton("Вихід")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-    await update.message.reply_text("Головне меню для модератора:", reply_markup=reply_markup)
+    await update.message.reply_text("Головне меню для модератора:", reply_markup=MODERATOR_MENU)
 
 async def start_category_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Запуск створення категорії."""
     context.user_data["chat_id"] = update.effective_chat.id
 
-    keyboard = [[KeyboardButton("Скасувати додавання")]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
-    await update.message.reply_text("Введіть назву категорії:", reply_markup=reply_markup)
+    await update.message.reply_text("Введіть назву категорії:", reply_markup=CANCEL_CATEGORY_KEYBOARD)
     return ENTER_CATEGORY_NAME
-from decouple import config
+
 async def get_category_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Отримання назви категорії."""
     if update.message:
@@ -95,13 +39,11 @@ async def get_category_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if category_name.lower() == "скасувати додавання":
             return await cancel_creation(update, context)
 
-    client = config("CLIENT_NAME")
-    password = config("CLIENT_PASSWORD")
-
     try:
-        categories = await get_categories(client, password)
+        categories = await get_cached_categories()
         keyboard = [
-            [InlineKeyboardButton(category["name"], callback_data=str(category["id"]))] for category in categories
+            [InlineKeyboardButton(category["name"], callback_data=encode_callback(CATEGORY, id=category["id"]))]
+            for category in categories
         ]
         keyboard.append([InlineKeyboardButton("Пропустити", callback_data="skip")])
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -118,7 +60,14 @@ async def get_parent_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     query = update.callback_query
     await query.answer()
 
-    parent_id = None if query.data == "skip" else int(query.data)
+    if query.data == "skip":
+        parent_id = None
+    else:
+        data = decode_callback(query.data)
+        if data is None:
+            await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+            return ConversationHandler.END
+        parent_id = data.id
     context.user_data["parent_id"] = parent_id
 
     category_name = context.user_data["category_name"]
@@ -153,17 +102,7 @@ async def cancel_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await context.bot.send_message(
                 chat_id=chat_id,
                 text="Головне меню для модератора:",
-                reply_markup=ReplyKeyboardMarkup(
-                    [
-                        [KeyboardButton("Додати категорію")],
-                        [KeyboardButton("Видалити категорію")],
-                        [KeyboardButton("Видалити заявку")],
-                        [KeyboardButton("Перевірити користувача")],
-                        [KeyboardButton("Вихід")]
-                    ],
-                    resize_keyboard=True,
-                    one_time_keyboard=False
-                )
+                reply_markup=MODERATOR_MENU
             )
         except Exception as e:
             print(f"Помилка під час відправки повідомлення: {str(e)}")
@@ -174,23 +113,18 @@ async def cancel_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return ConversationHandler.END
 
 
-
 async def confirm_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Підтвердження створення категорії."""
     query = update.callback_query
     await query.answer()
 
-    try:
-        access_token = await ensure_valid_moderator_token(context)
-    except Exception as e:
-        await query.edit_message_text(f"Помилка авторизації: {str(e)}")
-        return ConversationHandler.END
-
     category_name = context.user_data["category_name"]
     parent_id = context.user_data.get("parent_id")
 
     try:
-        result = await create_or_activate_category(category_name, parent_id, access_token)
+        result = await call_with_token(
+            context, lambda token: create_or_activate_category(category_name, parent_id, token), moderator=True)
+        await invalidate_categories()
         await query.edit_message_text(
             f"Категорія успішно створена або активована!\n"
             f"ID: {result['id']}\n"
@@ -213,25 +147,15 @@ async def confirm_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await context.bot.send_message(
         chat_id=chat_id,
         text="Головне меню для модератора:",
-        reply_markup=ReplyKeyboardMarkup(
-            [
-                [KeyboardButton("Додати категорію")],
-                [KeyboardButton("Видалити категорію")],
-                [KeyboardButton("Видалити заявку")],
-                [KeyboardButton("Перевірити користувача")],
-                [KeyboardButton("Вихід")]
-            ],
-            resize_keyboard=True,
-            one_time_keyboard=False
-        )
+        reply_markup=MODERATOR_MENU
     )
 
     return ConversationHandler.END
 
 
-
-
 category_creation_handler = ConversationHandler(
+    name="category_creation",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Додати категорію$"), start_category_creation)],
     states={
         ENTER_CATEGORY_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_category_name)],
@@ -244,4 +168,3 @@ category_creation_handler = ConversationHandler(
 )
 
 
-
@@ -1,36 +1,22 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from services.api_client import verify_user, get_customers
+from services.callback_data import USER, callback_pattern, decode_callback, encode_callback
+from services.keyboards import MODERATOR_MENU, VERIFY_ROLE_KEYBOARD
 
 CHOOSE_ROLE, CHOOSE_USER = range(2)
 
 
-MAIN_MENU_KEYBOARD = ReplyKeyboardMarkup(
-    keyboard=[
-        [KeyboardButton("Додати категорію")],
-        [KeyboardButton("Видалити категорію")],
-        [KeyboardButton("Видалити заявку")],
-        [KeyboardButton("Перевірити користувача")],
-        [KeyboardButton("Вихід")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
-
 async def start_verify_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок процесу верифікації користувача."""
     access_token = context.user_data.get("access_token")
     refresh_token = context.user_data.get("refresh_token")
 
     if not access_token or not refresh_token:
-        await update.message.reply_text("Вам потрібно авторизуватись як модератор.", reply_markup=MAIN_MENU_KEYBOARD)
+        await update.message.reply_text("Вам потрібно авторизуватись як модератор.", reply_markup=MODERATOR_MENU)
         return ConversationHandler.END
 
-    role_keyboard = ReplyKeyboardMarkup(
-        [["Верифікувати волонтерів"], ["Верифікувати бенефіціарів"], ["Скасувати"]],
-        resize_keyboard=True,
-        one_time_keyboard=True,
-    )
-    await update.message.reply_text("Оберіть роль, яку потрібно верифікувати:", reply_markup=role_keyboard)
+    await update.message.reply_text("Оберіть роль, яку потрібно верифікувати:", reply_markup=VERIFY_ROLE_KEYBOARD)
     return CHOOSE_ROLE
 
 async def cancel_process(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -40,7 +26,7 @@ async def cancel_process(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.answer()
         await query.edit_message_text("Процес верифікації скасовано. Повертаємося до головного меню.")
     else:
-        await update.message.reply_text("Процес верифікації скасовано. Повертаємося до головного меню.", reply_markup=MAIN_MENU_KEYBOARD)
+        await update.message.reply_text("Процес верифікації скасовано. Повертаємося до головного меню.", reply_markup=MODERATOR_MENU)
 
     return ConversationHandler.END
 
@@ -63,13 +49,13 @@ async def choose_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         filtered_users = [user for user in users if user["role"] == role_id]
 
         if not filtered_users:
-            await update.message.reply_text(f"Немає доступних користувачів із роллю '{role_text}'.", reply_markup=MAIN_MENU_KEYBOARD)
+            await update.message.reply_text(f"Немає доступних користувачів із роллю '{role_text}'.", reply_markup=MODERATOR_MENU)
             return ConversationHandler.END
 
         context.user_data["users"] = filtered_users
 
         keyboard = [
-            [InlineKeyboardButton(f"{user['firstname']} {user['lastname']} (ID: {user['id']})", callback_data=str(user["id"]))]
+            [InlineKeyboardButton(f"{user['firstname']} {user['lastname']} (ID: {user['id']})", callback_data=encode_callback(USER, id=user["id"]))]
             for user in filtered_users
         ]
         keyboard.append([InlineKeyboardButton("Скасувати", callback_data="cancel")])
@@ -79,7 +65,7 @@ async def choose_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         return CHOOSE_USER
 
     except Exception as e:
-        await update.message.reply_text(f"Сталася помилка: {str(e)}", reply_markup=MAIN_MENU_KEYBOARD)
+        await update.message.reply_text(f"Сталася помилка: {str(e)}", reply_markup=MODERATOR_MENU)
         return ConversationHandler.END
 
 async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -90,7 +76,11 @@ async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TY
     if query.data == "cancel":
         return await cancel_process(update, context)
 
-    user_id = int(query.data)
+    data = decode_callback(query.data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    user_id = data.id
     users = context.user_data.get("users", [])
     selected_user = next((user for user in users if user["id"] == user_id), None)
 
@@ -123,7 +113,7 @@ async def confirm_verification(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.edit_message_text(
             "Процес верифікації скасовано. Повертаємося до головного меню."
         )
-        await query.message.reply_text("Головне меню:", reply_markup=MAIN_MENU_KEYBOARD)
+        await query.message.reply_text("Головне меню:", reply_markup=MODERATOR_MENU)
         return ConversationHandler.END
 
     selected_user = context.user_data.get("selected_user")
@@ -145,18 +135,18 @@ async def confirm_verification(update: Update, context: ContextTypes.DEFAULT_TYP
             f"ID: {response['id']}\n"
             f"Статус: Підтверджено ✅"
         )
-        await query.message.reply_text("Головне меню:", reply_markup=MAIN_MENU_KEYBOARD)
+        await query.message.reply_text("Головне меню:", reply_markup=MODERATOR_MENU)
     except Exception as e:
         # Обробка помилки
         await query.edit_message_text(f"Сталася помилка: {str(e)}")
-        await query.message.reply_text("Головне меню:", reply_markup=MAIN_MENU_KEYBOARD)
+        await query.message.reply_text("Головне меню:", reply_markup=MODERATOR_MENU)
 
     return ConversationHandler.END
 
 
-
-
 verify_user_handler = ConversationHandler(
+    name="verify_user",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Перевірити користувача$"), start_verify_user)],
     states={
         CHOOSE_ROLE: [
@@ -164,7 +154,7 @@ verify_user_handler = ConversationHandler(
             MessageHandler(filters.Regex("^Скасувати$"), cancel_process),
         ],
         CHOOSE_USER: [
-            CallbackQueryHandler(handle_user_selection, pattern="^\d+$"),
+            CallbackQueryHandler(handle_user_selection, pattern=callback_pattern(USER)),
             CallbackQueryHandler(confirm_verification, pattern="^confirm$"),
             CallbackQueryHandler(cancel_process, pattern="^cancel$"),
             MessageHandler(filters.Regex("^Скасувати$"), cancel_process),
@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     ContextTypes,
@@ -8,7 +8,12 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from services.api_client import get_applications_by_status, accept_application, refresh_token_log
+from services.api_client import get_application_records, accept_application
+from services.application_cache import get_application_index, invalidate_application_lists
+from services.callback_data import APPLICATION, DISTANCE, callback_pattern, decode_callback, encode_callback
+from services.records import find_record
+from services.spatial_index import parse_radius, volunteer_origin
+from services.token_manager import call_with_token
 
 
 CHOOSE_DISTANCE, CHOOSE_APPLICATION, CONFIRM_APPLICATION = range(3)
@@ -17,48 +22,12 @@ PAGE_SIZE = 5
 DISTANCE_FILTERS = ["до 5 км", "до 10 км", "до 20 км", "до 50 км"]
 
 
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
+async def available_application_index(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Спільний для процесу індекс доступних заявок (з кешу або з бекенду)."""
+    return await get_application_index(
+        update.effective_user.id, "available",
+        lambda: call_with_token(context, lambda token: get_application_records(token, "available")))
 
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="⏳ Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
 
 async def start_accept_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the application selection process with distance filter."""
@@ -67,19 +36,18 @@ async def start_accept_application(update: Update, context: ContextTypes.DEFAULT
         await update.message.reply_text("❌ Ви не авторизовані. Спочатку виконайте вхід до системи.")
         return ConversationHandler.END
 
-
-    try:
-        access_token = await ensure_valid_token(context)
-    except Exception as e:
-        await update.message.reply_text(f"Сталася помилка при перевірці токена: {str(e)}")
-        return ConversationHandler.END
+    # Старі сеанси зберігали повний список у user_data; тепер він лише в кеші процесу.
+    context.user_data.pop("all_applications", None)
 
     try:
 
-        applications = await get_applications_by_status(access_token, status="available")
+        applications = await available_application_index(update, context)
 
-        if 'detail' in applications and applications['detail'] == 'No applications found.':
-            await update.message.reply_text("Наразі немає доступних заявок.")
+        if isinstance(applications, dict):
+            if applications.get('detail') == 'No applications found.':
+                await update.message.reply_text("Наразі немає доступних заявок.")
+            else:
+                await update.message.reply_text(f"❌ Сталася помилка: {applications.get('detail')}")
             return ConversationHandler.END
 
         if not applications:
@@ -87,16 +55,15 @@ async def start_accept_application(update: Update, context: ContextTypes.DEFAULT
             return ConversationHandler.END
 
 
-        context.user_data["all_applications"] = applications
-
-
         keyboard = [
-            [InlineKeyboardButton(distance, callback_data=f"distance_{i}") for i, distance in enumerate(DISTANCE_FILTERS)]
+            [InlineKeyboardButton(distance, callback_data=encode_callback(DISTANCE, filter=i)) for i, distance in enumerate(DISTANCE_FILTERS)]
         ]
         keyboard.append([InlineKeyboardButton("❌ Скасувати", callback_data="cancel")])
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await update.message.reply_text("📍 Оберіть дистанцію для пошуку заявок:", reply_markup=reply_markup)
+        await update.message.reply_text(
+            "📍 Оберіть дистанцію для пошуку заявок або надішліть свою в кілометрах (наприклад, 7.5):",
+            reply_markup=reply_markup)
         return CHOOSE_DISTANCE
 
     except PermissionError as e:
@@ -112,28 +79,53 @@ async def choose_distance(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
 
-    if not query.data.startswith("distance_"):
+    data = decode_callback(query.data)
+    if data is None or data.filter >= len(DISTANCE_FILTERS):
         await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
         return ConversationHandler.END
 
-    selected_distance_index = int(query.data.removeprefix("distance_"))
-    selected_distance = DISTANCE_FILTERS[selected_distance_index]
+    selected_distance = DISTANCE_FILTERS[data.filter]
     context.user_data["selected_distance"] = selected_distance
 
-    max_distance = int(selected_distance.split(" ")[1])
+    return await show_applications_within(update, context, parse_radius(selected_distance))
 
-    all_applications = context.user_data.get("all_applications", [])
-    filtered_applications = [
-        app for app in all_applications
-        if app.get("distance", float('inf')) <= max_distance
-    ]
 
-    if not filtered_applications:
-        await query.edit_message_text("📭 Наразі немає доступних заявок у вибраній дистанції.")
+async def choose_custom_distance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Обробка довільної дистанції, надісланої текстом."""
+    max_distance = parse_radius(update.message.text)
+    if max_distance is None:
+        await update.message.reply_text("⚠️ Надішліть дистанцію числом кілометрів, наприклад 7.5.")
+        return CHOOSE_DISTANCE
+
+    context.user_data["selected_distance"] = f"до {max_distance:g} км"
+    return await show_applications_within(update, context, max_distance)
+
+
+async def show_applications_within(update: Update, context: ContextTypes.DEFAULT_TYPE, max_distance) -> int:
+    """Показує заявки в радіусі `max_distance` км, від найближчої."""
+    try:
+        # Якщо індекс уже застарів у кеші, список запитується заново.
+        index = await available_application_index(update, context)
+    except Exception as e:
+        index = {"detail": str(e)}
+    if isinstance(index, dict):
+        nearby = None if index.get("detail") != "No applications found." else []
+    else:
+        nearby = index.nearest(volunteer_origin(context.user_data), max_distance)
+
+    if not nearby:
+        if nearby is None:
+            text = f"❌ Сталася помилка: {index.get('detail')}"
+        else:
+            text = "📭 Наразі немає доступних заявок у вибраній дистанції."
+        if update.callback_query:
+            await update.callback_query.edit_message_text(text)
+        else:
+            await update.message.reply_text(text)
         return ConversationHandler.END
 
 
-    context.user_data["applications_list"] = filtered_applications
+    context.user_data["applications_list"] = [app for _, app in nearby]
     context.user_data["current_page"] = 0
 
 
@@ -142,22 +134,20 @@ async def choose_distance(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 def get_paginated_keyboard(applications_list, page, page_size):
-    """Створення клавіатури для заявок із пагінацією."""
-    sorted_applications = sorted(applications_list, key=lambda app: app['id'])
-
+    """Створення клавіатури для заявок із пагінацією (у порядку списку — найближчі першими)."""
     start = page * page_size
     end = start + page_size
-    current_apps = sorted_applications[start:end]
+    current_apps = applications_list[start:end]
 
     keyboard = [
-        [InlineKeyboardButton(f"🆔 ID: {app['id']} | 📝 {app['description']}", callback_data=f"app_{app['id']}")]
+        [InlineKeyboardButton(f"🆔 ID: {app.id} | 📝 {app.description}", callback_data=encode_callback(APPLICATION, id=app.id))]
         for app in current_apps
     ]
 
     nav_buttons = []
     if page > 0:
         nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data="prev_page"))
-    if end < len(sorted_applications):
+    if end < len(applications_list):
         nav_buttons.append(InlineKeyboardButton("➡️ Вперед", callback_data="next_page"))
 
     if nav_buttons:
@@ -175,21 +165,22 @@ async def display_application_page(update: Update, context: ContextTypes.DEFAULT
     reply_markup = get_paginated_keyboard(applications_list, page, PAGE_SIZE)
 
     if update.message:
-        await update.message.reply_text("📋 Виберіть заявку зі списку (сортовано за ID):", reply_markup=reply_markup)
+        await update.message.reply_text("📋 Виберіть заявку зі списку (найближчі першими):", reply_markup=reply_markup)
     elif update.callback_query:
-        await update.callback_query.edit_message_text("📋 Виберіть заявку зі списку (сортовано за ID):", reply_markup=reply_markup)
+        await update.callback_query.edit_message_text("📋 Виберіть заявку зі списку (найближчі першими):", reply_markup=reply_markup)
 
 async def choose_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обробка вибору заявки користувачем."""
     query = update.callback_query
     await query.answer()
 
-    if not query.data.startswith("app_"):
+    data = decode_callback(query.data)
+    if data is None:
         await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
         return CHOOSE_APPLICATION
 
-    application_id = query.data.removeprefix("app_")
-    application = next((app for app in context.user_data["applications_list"] if str(app["id"]) == application_id), None)
+    application_id = str(data.id)
+    application = find_record(context.user_data["applications_list"], application_id)
 
     if not application:
         await query.edit_message_text("❌ Помилка: Заявка не знайдена.")
@@ -210,7 +201,7 @@ async def choose_application(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.edit_message_text(
         text=(
             f"✅ Ви вибрали заявку з ID: {application_id}.\n\n"
-            f"📝 Опис: {application['description']}\n"
+            f"📝 Опис: {application.description}\n"
             f"❓ Ви впевнені, що виконаєте її?"
         ),
         reply_markup=reply_markup,
@@ -227,29 +218,26 @@ async def confirm_application(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     application_id = context.user_data.get("selected_application_id")
 
-    try:
-        access_token = await ensure_valid_token(context)
-    except Exception as e:
-        await query.edit_message_text(f"❌ Сталася помилка при перевірці токена: {str(e)}")
-        return ConversationHandler.END
-
     if not application_id:
         await query.edit_message_text("⚠️ Виберіть заявку перед підтвердженням.")
         return ConversationHandler.END
 
     try:
-        application_data = await accept_application(access_token, int(application_id))
+        application_data = await call_with_token(
+            context, lambda token: accept_application(token, int(application_id)))
+        invalidate_application_lists(update.effective_user.id, shared_status="available")
 
-        local_application_data = next(
-            (app for app in context.user_data["applications_list"] if str(app["id"]) == application_id), {})
+        local_application = find_record(context.user_data.get("applications_list", []), application_id)
 
         creator_name = (
                 application_data.get("creator", {}).get("first_name")
-                or local_application_data.get("creator", {}).get("first_name", "Ім'я не вказано")
+                or (local_application and local_application.creator_name)
+                or "Ім'я не вказано"
         )
         creator_phone = (
                 application_data.get("creator", {}).get("phone_num")
-                or local_application_data.get("creator", {}).get("phone_num", "Телефон не вказано")
+                or (local_application and local_application.creator_phone)
+                or "Телефон не вказано"
         )
 
         location = application_data.get("location", {})
@@ -298,7 +286,6 @@ async def confirm_application(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ConversationHandler.END
 
 
-
 async def navigate_pages(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обробка переходу між сторінками."""
     query = update.callback_query
@@ -328,14 +315,17 @@ async def cancel_accept_application(update: Update, context: ContextTypes.DEFAUL
 
 
 accept_application_handler = ConversationHandler(
+    name="accept_application",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Прийняти заявку в обробку"), start_accept_application)],
     states={
         CHOOSE_DISTANCE: [
-            CallbackQueryHandler(choose_distance, pattern="^distance_\\d+$"),
+            CallbackQueryHandler(choose_distance, pattern=callback_pattern(DISTANCE)),
+            MessageHandler(filters.Regex(r"^\s*\d+([.,]\d+)?\s*(км)?\s*$"), choose_custom_distance),
             CallbackQueryHandler(cancel_accept_application, pattern="^cancel$"),
         ],
         CHOOSE_APPLICATION: [
-            CallbackQueryHandler(choose_application, pattern="^app_\\d+$"),
+            CallbackQueryHandler(choose_application, pattern=callback_pattern(APPLICATION)),
             CallbackQueryHandler(navigate_pages, pattern="^(prev_page|next_page)$"),
             CallbackQueryHandler(cancel_accept_application, pattern="^cancel$"),
         ],
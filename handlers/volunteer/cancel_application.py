@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     ContextTypes,
@@ -8,73 +8,27 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from services.api_client import get_applications_by_status, cancel_application, refresh_token_log
+from services.api_client import get_application_records, cancel_application
+from services.application_cache import invalidate_application_lists
+from services.callback_data import APPLICATION, callback_pattern, decode_callback, encode_callback
+from services.token_manager import call_with_token
 
 CHOOSE_CANCEL_APPLICATION, CONFIRM_CANCEL_APPLICATION = range(2)
 
 PAGE_SIZE = 5
 
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
 
 async def start_cancel_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Початок процесу скасування заявки."""
     try:
-        access_token = await ensure_valid_token(context)
-    except Exception as e:
-        await update.message.reply_text(f"❌ Помилка: {str(e)}")
-        return ConversationHandler.END
-
-    try:
-        applications = await get_applications_by_status(access_token, status="in_progress")
+        applications = await fetch_application_page(context, 0)
         if not applications:
             await update.message.reply_text("ℹ️ Наразі немає заявок в процесі виконання.")
             return ConversationHandler.END
 
-        context.user_data["applications_list"] = applications
         context.user_data["current_page"] = 0
 
-        await display_application_page(update, context)
+        await display_application_page(update, context, applications)
         return CHOOSE_CANCEL_APPLICATION
 
     except PermissionError as e:
@@ -86,20 +40,18 @@ async def start_cancel_application(update: Update, context: ContextTypes.DEFAULT
 
 
 def get_paginated_keyboard(applications, page, page_size):
-    """Створення клавіатури для заявок із пагінацією."""
-    start = page * page_size
-    end = start + page_size
-    current_apps = applications[start:end]
+    """Клавіатура сторінки: `applications` — заявки сторінки і, якщо є, перша заявка наступної."""
+    current_apps = applications[:page_size]
 
     keyboard = [
-        [InlineKeyboardButton(f"🆔 ID: {app['id']} | 📝 {app['description']}", callback_data=f"app_{app['id']}")]
+        [InlineKeyboardButton(f"🆔 ID: {app.id} | 📝 {app.description}", callback_data=encode_callback(APPLICATION, id=app.id))]
         for app in current_apps
     ]
 
     nav_buttons = []
     if page > 0:
         nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data="prev_page"))
-    if end < len(applications):
+    if len(applications) > page_size:
         nav_buttons.append(InlineKeyboardButton("➡️ Вперед", callback_data="next_page"))
 
     if nav_buttons:
@@ -108,10 +60,20 @@ def get_paginated_keyboard(applications, page, page_size):
     return InlineKeyboardMarkup(keyboard)
 
 
-async def display_application_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def fetch_application_page(context: ContextTypes.DEFAULT_TYPE, page: int) -> list:
+    """Заявки в процесі виконання для сторінки `page` плюс одна наперед, щоб знати, чи є наступна."""
+    applications = await call_with_token(context, lambda token: get_application_records(
+        token, "in_progress", limit=PAGE_SIZE + 1, offset=page * PAGE_SIZE))
+    if not isinstance(applications, list):
+        raise RuntimeError(applications.get("detail", "Не вдалося отримати заявки"))
+    return applications
+
+
+async def display_application_page(update: Update, context: ContextTypes.DEFAULT_TYPE, applications=None):
     """Відображення поточної сторінки заявок."""
-    applications = context.user_data["applications_list"]
     page = context.user_data["current_page"]
+    if applications is None:
+        applications = await fetch_application_page(context, page)
     reply_markup = get_paginated_keyboard(applications, page, PAGE_SIZE)
 
     if hasattr(update, "callback_query") and update.callback_query:
@@ -133,7 +95,11 @@ async def navigate_pages(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     elif query.data == "next_page":
         context.user_data["current_page"] += 1
 
-    await display_application_page(update, context)
+    try:
+        await display_application_page(update, context)
+    except Exception as e:
+        await query.edit_message_text(f"❌ Сталася помилка: {str(e)}")
+        return ConversationHandler.END
     return CHOOSE_CANCEL_APPLICATION
 
 
@@ -142,13 +108,14 @@ async def choose_cancel_application(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     await query.answer()
 
-    if not query.data.startswith("app_"):
+    data = decode_callback(query.data)
+    if data is None:
         await query.edit_message_text(
             "⚠️ Неправильний вибір. Будь ласка, скористайтеся кнопками для вибору заявки."
         )
         return CHOOSE_CANCEL_APPLICATION
 
-    application_id = query.data.removeprefix("app_")
+    application_id = str(data.id)
 
     context.user_data["selected_application_id"] = application_id
 
@@ -173,17 +140,15 @@ async def confirm_cancel_application(update: Update, context: ContextTypes.DEFAU
     await query.answer()
 
     application_id = context.user_data.get("selected_application_id")
-    access_token = context.user_data.get("access_token")
-
     if not application_id:
         await query.edit_message_text("⚠️ Виберіть заявку перед підтвердженням скасування.")
         return ConversationHandler.END
 
     try:
-        access_token = await ensure_valid_token(context)
-
-        response = await cancel_application(access_token, int(application_id))
+        response = await call_with_token(
+            context, lambda token: cancel_application(token, int(application_id)))
         if response.get("status") == "Application cancelled successfully":
+            invalidate_application_lists(update.effective_user.id, shared_status="available")
             await query.edit_message_text(f"✅ Заявка з ID: {application_id} успішно скасована.")
         else:
             await query.edit_message_text(
@@ -204,12 +169,13 @@ async def cancel_cancel_application(update: Update, context: ContextTypes.DEFAUL
     return ConversationHandler.END
 
 
-
 cancel_application_handler = ConversationHandler(
+    name="cancel_application",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Скасувати заявку$"), start_cancel_application)],
     states={
         CHOOSE_CANCEL_APPLICATION: [
-            CallbackQueryHandler(choose_cancel_application, pattern="^app_\\d+$"),
+            CallbackQueryHandler(choose_cancel_application, pattern=callback_pattern(APPLICATION)),
             CallbackQueryHandler(navigate_pages, pattern="^(prev_page|next_page)$"),
         ],
         CONFIRM_CANCEL_APPLICATION: [
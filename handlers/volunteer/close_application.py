@@ -1,5 +1,6 @@
+import os
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram import KeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -8,66 +9,19 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from services.api_client import get_applications_by_status, close_application, refresh_token_log
+from services.api_client import get_application_records, close_application
+from services.application_cache import invalidate_application_lists
+from services.callback_data import APPLICATION, callback_pattern, decode_callback, encode_callback
+from services.image_processing import compress_path_async
+from services.keyboards import VOLUNTEER_MENU
+from services.token_manager import call_with_token
+from services.upload_spool import fits_quota, new_spool_path, remove_spool, spooled_size, UPLOAD_USER_QUOTA
 
 
 CHOOSE_APPLICATION, UPLOAD_FILES = range(2)
 PAGE_SIZE = 5
 
 MAX_FILE_SIZE = 5 * 1024 * 1024
-main_menu_buttons = [
-    [KeyboardButton("Список завдань")],
-    [KeyboardButton("Прийняти заявку в обробку")],
-    [KeyboardButton("Закрити заявку")],
-    [KeyboardButton("Скасувати заявку")],
-    [KeyboardButton("Редагувати профіль")],
-    [KeyboardButton("Деактивувати профіль волонтера")],
-    [KeyboardButton("Вихід")],
-]
-main_menu_markup = ReplyKeyboardMarkup(main_menu_buttons, resize_keyboard=True, one_time_keyboard=False)
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
 
 
 async def start_closing_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -77,19 +31,18 @@ async def start_closing_application(update: Update, context: ContextTypes.DEFAUL
         await update.message.reply_text("🚫 Ви не авторизовані. Спочатку виконайте вхід до системи.")
         return ConversationHandler.END
 
-    try:
+    discard_uploaded_files(update, context)
 
-        access_token = await ensure_valid_token(context)
+    try:
 
-        applications = await get_applications_by_status(access_token, status="in_progress")
+        applications = await fetch_application_page(context, 0)
         if not applications:
             await update.message.reply_text("❌ Немає заявок, доступних для закриття.")
             return ConversationHandler.END
 
-        context.user_data["applications_list"] = applications
         context.user_data["current_page"] = 0
 
-        await display_application_page(update, context)
+        await display_application_page(update, context, applications)
 
         return CHOOSE_APPLICATION
 
@@ -99,20 +52,18 @@ async def start_closing_application(update: Update, context: ContextTypes.DEFAUL
 
 
 def get_paginated_keyboard(applications, page, page_size):
-    """Створення клавіатури для пагінації."""
-    start = page * page_size
-    end = start + page_size
-    current_apps = applications[start:end]
+    """Клавіатура сторінки: `applications` — заявки сторінки і, якщо є, перша заявка наступної."""
+    current_apps = applications[:page_size]
 
     keyboard = [
-        [InlineKeyboardButton(f"🆔 ID: {app['id']} | 📝 {app['description']}", callback_data=f"app_{app['id']}")]
+        [InlineKeyboardButton(f"🆔 ID: {app.id} | 📝 {app.description}", callback_data=encode_callback(APPLICATION, id=app.id))]
         for app in current_apps
     ]
 
     nav_buttons = []
     if page > 0:
         nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data="prev_page"))
-    if end < len(applications):
+    if len(applications) > page_size:
         nav_buttons.append(InlineKeyboardButton("➡️ Вперед", callback_data="next_page"))
 
     if nav_buttons:
@@ -121,10 +72,20 @@ def get_paginated_keyboard(applications, page, page_size):
     return InlineKeyboardMarkup(keyboard)
 
 
-async def display_application_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def fetch_application_page(context: ContextTypes.DEFAULT_TYPE, page: int) -> list:
+    """Заявки в процесі виконання для сторінки `page` плюс одна наперед, щоб знати, чи є наступна."""
+    applications = await call_with_token(context, lambda token: get_application_records(
+        token, "in_progress", limit=PAGE_SIZE + 1, offset=page * PAGE_SIZE))
+    if not isinstance(applications, list):
+        raise RuntimeError(applications.get("detail", "Не вдалося отримати заявки"))
+    return applications
+
+
+async def display_application_page(update: Update, context: ContextTypes.DEFAULT_TYPE, applications=None):
     """Відображення сторінки заявок."""
-    applications = context.user_data["applications_list"]
     page = context.user_data["current_page"]
+    if applications is None:
+        applications = await fetch_application_page(context, page)
     reply_markup = get_paginated_keyboard(applications, page, PAGE_SIZE)
 
     if hasattr(update, "callback_query") and update.callback_query:
@@ -143,7 +104,11 @@ async def navigate_pages(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     elif query.data == "next_page":
         context.user_data["current_page"] += 1
 
-    await display_application_page(update, context)
+    try:
+        await display_application_page(update, context)
+    except Exception as e:
+        await query.edit_message_text(f"⚠️ Сталася помилка: {str(e)}")
+        return ConversationHandler.END
     return CHOOSE_APPLICATION
 
 
@@ -151,7 +116,11 @@ async def choose_application(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Обробка вибору заявки користувачем."""
     query = update.callback_query
     await query.answer()
-    application_id = query.data
+    data = decode_callback(query.data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    application_id = str(data.id)
 
     context.user_data["application_id"] = application_id
 
@@ -178,21 +147,36 @@ async def upload_files(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     if document.file_size > MAX_FILE_SIZE:
         await update.message.reply_text("⚠️ Файл занадто великий. Спробуємо його стиснути...")
 
+    files = context.user_data.setdefault("files", [])
+    if spooled_size(files) >= UPLOAD_USER_QUOTA:
+        await update.message.reply_text("🚫 Досягнуто ліміту на розмір файлів для однієї заявки. Натисніть 'Завершити'.")
+        return UPLOAD_FILES
+
     file = await document.get_file()
     file_name = document.file_name
-    file_data = await file.download_as_bytearray()
 
     await update.message.reply_text("🕒 Зачекайте, файл завантажується та стискається...")
 
-    compressed_file = compress_file(file_data)
-    if len(compressed_file) > MAX_FILE_SIZE:
+    # Файл одразу пишеться на диск і стискається там, щоб не тримати байти в пам'яті.
+    path = new_spool_path(update.effective_user.id, file_name)
+    await file.download_to_drive(path)
+    compressed_path = await compress_path_async(path)
+    if compressed_path is not None:
+        os.replace(compressed_path, path)
+        # Зображення перекодоване в JPEG — розширення має відповідати вмісту.
+        file_name = f"{os.path.splitext(file_name or 'photo')[0]}.jpg"
+
+    size = os.path.getsize(path)
+    if size > MAX_FILE_SIZE:
+        os.remove(path)
         await update.message.reply_text("🚫 Файл навіть після стиснення перевищує дозволений розмір 5 МБ.")
         return UPLOAD_FILES
+    if not fits_quota(files, size):
+        os.remove(path)
+        await update.message.reply_text("🚫 Досягнуто ліміту на розмір файлів для однієї заявки. Натисніть 'Завершити'.")
+        return UPLOAD_FILES
 
-    if not context.user_data.get("files"):
-        context.user_data["files"] = []
-
-    context.user_data["files"].append((file_name, compressed_file))
+    files.append({"name": file_name, "path": path, "size": size})
 
     keyboard = [
         [InlineKeyboardButton("Завершити", callback_data="done")],
@@ -230,15 +214,13 @@ async def confirm_close_application(update: Update, context: ContextTypes.DEFAUL
         return ConversationHandler.END
 
     try:
-        access_token = await ensure_valid_token(context)
+        uploaded_files = [(item["name"], item["path"]) for item in files]
 
-        uploaded_files = []
-        for file_name, file_data in files:
-            uploaded_files.append((file_name, file_data))
-
-        response = await close_application(access_token, application_id, uploaded_files)
+        response = await call_with_token(
+            context, lambda token: close_application(token, application_id, uploaded_files))
 
         if response and isinstance(response, dict) and 'application_id' in response:
+            invalidate_application_lists(update.effective_user.id)
             await message.reply_text(
                 f"✅ Заявка {response['application_id']} успішно закрита. Додано файлів: {len(response['files'])}."
             )
@@ -248,40 +230,37 @@ async def confirm_close_application(update: Update, context: ContextTypes.DEFAUL
 
     except Exception as e:
         await message.reply_text(f"⚠️ Сталася помилка: {str(e)}")
+    finally:
+        discard_uploaded_files(update, context)
 
     return ConversationHandler.END
 
 
-def compress_file(file_data: bytes) -> bytes:
-    """Стискання файлу перед відправкою. """
-    from io import BytesIO
-    from PIL import Image
-
-    try:
-        image = Image.open(BytesIO(file_data))
-        output = BytesIO()
-        image.save(output, format="JPEG", quality=30)  # Максимальне стиснення
-        return output.getvalue()
-    except Exception:
-        return file_data
+def discard_uploaded_files(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Видаляє тимчасові файли користувача та їх список з user_data."""
+    context.user_data.pop("files", None)
+    remove_spool(update.effective_user.id)
 
 
 async def cancel_closing(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Скасування закриття заявки та повернення до головного меню. """
+    discard_uploaded_files(update, context)
     query = update.callback_query
     await query.answer()
     await query.edit_message_reply_markup(reply_markup=None)
     await query.edit_message_text("❌ Закриття заявки скасовано.")
 
-    await update.callback_query.message.reply_text("🔙 Вас повернуто до головного меню.", reply_markup=main_menu_markup)
+    await update.callback_query.message.reply_text("🔙 Вас повернуто до головного меню.", reply_markup=VOLUNTEER_MENU)
     return ConversationHandler.END
 
 
 close_application_handler = ConversationHandler(
+    name="close_application",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Закрити заявку$"), start_closing_application)],
     states={
         CHOOSE_APPLICATION: [
-            CallbackQueryHandler(choose_application, pattern="^\d+$"),
+            CallbackQueryHandler(choose_application, pattern=callback_pattern(APPLICATION)),
             CallbackQueryHandler(navigate_pages, pattern="^(prev_page|next_page)$")
         ],
         UPLOAD_FILES: [
@@ -1,14 +1,17 @@
 import re
 
 import aiohttp
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CallbackQueryHandler, filters
 
-from handlers.beneficiary.create_application import reverse_geocode
-from services.api_client import edit_volunteer_location_and_categories, get_categories, refresh_token_log
-from decouple import config
-CLIENT_NAME = config('CLIENT_NAME')
-CLIENT_PASSWORD = config('CLIENT_PASSWORD')
+from handlers.volunteer.notifications import refresh_subscription
+from services.api_client import edit_volunteer_location_and_categories
+from services.callback_data import CATEGORY, decode_callback, encode_callback
+from services.category_cache import get_category_tree
+from services.geocoding import reverse_geocode
+from services.keyboards import CANCEL_CATEGORIES_KEYBOARD, CANCEL_EDIT_KEYBOARD, EDIT_DEVICE_KEYBOARD, \
+    EDIT_LOCATION_KEYBOARD, VOLUNTEER_MENU, YES_NO_KEYBOARD
+from services.token_manager import call_with_token
 
 # Константи для станів
 ENTER_LOCATION, ENTER_CATEGORIES, CONFIRM_EDIT = range(3)
@@ -19,16 +22,9 @@ async def start_edit_profile(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("❗ Ви не авторизовані. Спочатку виконайте вхід до системи.")
         return ConversationHandler.END
 
-    keyboard = [
-        [KeyboardButton("📱 Я на телефоні")],
-        [KeyboardButton("💻 Я використовую ПК")],
-        [KeyboardButton("🚫 Пропустити")],
-        [KeyboardButton("❌ Скасувати редагування")],
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
     await update.message.reply_text(
         "🔄 Поділіться вашою новою локацією, введіть адресу або оберіть спосіб введення:",
-        reply_markup=reply_markup
+        reply_markup=EDIT_DEVICE_KEYBOARD
     )
     return ENTER_LOCATION
 
@@ -51,11 +47,6 @@ async def enter_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             return await proceed_to_categories(update, context)
 
         if user_response == "📱 я на телефоні":
-            keyboard = [
-                [KeyboardButton("📍 Поділитися локацією", request_location=True)],
-                [KeyboardButton("❌ Скасувати редагування")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
             await update.message.reply_text(
                 "🔔 **Інструкція для користувача мобільного телефону:**\n\n"
                 "1. **Увімкніть місцезнаходження:**\n"
@@ -67,13 +58,11 @@ async def enter_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 "   - Натисніть кнопку \"📍 Поділитися локацією\".\n"
                 "   - З'явиться вікно з картою, де ви зможете вручну вибрати точку або перемістити маркер на правильне місце.\n"
                 "   - Після вибору потрібної точки, підтвердіть локацію і надішліть її.",
-                reply_markup=reply_markup, parse_mode="Markdown"
+                reply_markup=EDIT_LOCATION_KEYBOARD, parse_mode="Markdown"
             )
             return ENTER_LOCATION
 
         elif user_response == "💻 я використовую пк":
-            keyboard = [[KeyboardButton("❌ Скасувати редагування")]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
             await update.message.reply_text(
                 "💻 **Як знайти координати за допомогою Google Maps на ПК:**\n\n"
                 "1️⃣ Відкрийте [Google Maps](https://www.google.com/maps) у вашому браузері.\n"
@@ -83,7 +72,7 @@ async def enter_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 "5️⃣ Координати (широта та довгота) автоматично скопіюються в буфер обміну.\n"
                 "6️⃣ Поверніться до цього чату і натисніть праву кнопку миші (ПКМ) у текстовому полі чату, а потім виберіть **'Вставити'**.\n"
                 "   Також можна використати комбінацію клавіш **Ctrl + V** для вставлення.\n\n"
-                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=reply_markup
+                "📍 **Приклад координат:** `49.2827, -123.1216`", parse_mode="Markdown", reply_markup=CANCEL_EDIT_KEYBOARD
             )
             return ENTER_LOCATION
 
@@ -134,34 +123,30 @@ async def enter_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def proceed_to_categories(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Переходить до вибору категорій після введення локації."""
     try:
-        categories = await get_categories(CLIENT_NAME, CLIENT_PASSWORD)
+        tree = await get_category_tree()
 
-        if not categories:
+        if not tree:
             await update.message.reply_text("Категорії відсутні. Спробуйте пізніше.")
             return ConversationHandler.END
 
-        parent_categories = [cat for cat in categories if cat["parent_id"] is None]
+        parent_categories = tree.roots
 
         if not parent_categories:
             await update.message.reply_text("Категорії верхнього рівня відсутні.")
             return ConversationHandler.END
 
         keyboard = [
-            [InlineKeyboardButton(cat["name"], callback_data=f"parent_{cat['id']}")]
+            [InlineKeyboardButton(cat["name"], callback_data=encode_callback(CATEGORY, id=cat["id"]))]
             for cat in parent_categories
         ]
         keyboard.append([InlineKeyboardButton("Завершити вибір", callback_data="finish_selection")])
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        context.user_data["categories"] = categories
         context.user_data["selected_categories"] = []
         context.user_data["current_parent_id"] = None
 
-        cancel_keyboard = [[KeyboardButton("Скасувати редагування")]]
-        cancel_reply_markup = ReplyKeyboardMarkup(cancel_keyboard, resize_keyboard=True, one_time_keyboard=True)
-
         await update.message.reply_text("Оберіть категорії для редагування:", reply_markup=reply_markup)
-        await update.message.reply_text("Натисніть кнопку нижче, щоб скасувати редагування:", reply_markup=cancel_reply_markup)
+        await update.message.reply_text("Натисніть кнопку нижче, щоб скасувати редагування:", reply_markup=CANCEL_CATEGORIES_KEYBOARD)
 
         return ENTER_CATEGORIES
 
@@ -186,22 +171,19 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("✅ Категорії обрано.")
         await query.message.reply_text(
             "🔄 Підтвердити редагування профілю?",
-            reply_markup=ReplyKeyboardMarkup(
-                [[KeyboardButton("✅ Так"), KeyboardButton("❌ Ні")]],
-                resize_keyboard=True,
-            )
+            reply_markup=YES_NO_KEYBOARD
         )
         return CONFIRM_EDIT
 
     if callback_data == "back_to_parents":
-        categories = context.user_data.get("categories", [])
+        tree = await get_category_tree()
         selected_categories = context.user_data.get("selected_categories", [])
-        parent_categories = [cat for cat in categories if cat["parent_id"] is None]
+        parent_categories = tree.roots
 
         keyboard = [
             [InlineKeyboardButton(
                 f"{cat['name']} {'✅' if cat['id'] in selected_categories else ''}",
-                callback_data=f"parent_{cat['id']}"
+                callback_data=encode_callback(CATEGORY, id=cat["id"])
             )]
             for cat in parent_categories
         ]
@@ -216,8 +198,12 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return ENTER_CATEGORIES
 
 
-    category_id = int(callback_data.split("_")[1])
-    categories = context.user_data.get("categories", [])
+    data = decode_callback(callback_data)
+    if data is None:
+        await query.edit_message_text("⚠️ Неправильний вибір. Будь ласка, спробуйте ще раз.")
+        return ConversationHandler.END
+    category_id = data.id
+    tree = await get_category_tree()
     selected_categories = context.user_data.setdefault("selected_categories", [])
 
 
@@ -227,7 +213,7 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         selected_categories.append(category_id)
 
 
-    subcategories = [cat for cat in categories if cat["parent_id"] == category_id]
+    subcategories = tree.children(category_id)
 
     if subcategories:
         context.user_data["current_parent_id"] = category_id
@@ -235,7 +221,7 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         keyboard = [
             [InlineKeyboardButton(
                 f"{cat['name']} {'✅' if cat['id'] in selected_categories else ''}",
-                callback_data=f"category_{cat['id']}"
+                callback_data=encode_callback(CATEGORY, id=cat["id"])
             )]
             for cat in subcategories
         ]
@@ -248,12 +234,12 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     else:
 
         current_parent_id = context.user_data.get("current_parent_id")
-        subcategories = [cat for cat in categories if cat["parent_id"] == current_parent_id]
+        subcategories = tree.children(current_parent_id)
 
         keyboard = [
             [InlineKeyboardButton(
                 f"{cat['name']} {'✅' if cat['id'] in selected_categories else ''}",
-                callback_data=f"parent_{cat['id']}"
+                callback_data=encode_callback(CATEGORY, id=cat["id"])
             )]
             for cat in subcategories
         ]
@@ -270,48 +256,6 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     return ENTER_CATEGORIES
 
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
 
 async def confirm_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Підтвердження редагування профілю."""
@@ -320,7 +264,6 @@ async def confirm_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         return ConversationHandler.END
 
     if update.message.text.lower() == "✅ так":
-        access_token = context.user_data.get("access_token")
         location = context.user_data.get("edit_location")
         category_ids = context.user_data.get("selected_categories")
 
@@ -335,24 +278,14 @@ async def confirm_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 
         try:
 
-            access_token = await ensure_valid_token(context)
-
-            await edit_volunteer_location_and_categories(access_token, location, category_ids)
+            await call_with_token(
+                context, lambda token: edit_volunteer_location_and_categories(token, location, category_ids))
 
 
             await update.message.reply_text("✅ Ваш профіль було успішно відредаговано.")
+            await refresh_subscription(update, context.user_data)
 
-            main_menu_buttons = [
-                [KeyboardButton("Список завдань")],
-                [KeyboardButton("Прийняти заявку в обробку")],
-                [KeyboardButton("Закрити заявку")],
-                [KeyboardButton("Скасувати заявку")],
-                [KeyboardButton("Редагувати профіль")],
-                [KeyboardButton("Деактивувати профіль волонтера")],
-                [KeyboardButton("Вихід")],
-            ]
-            reply_markup = ReplyKeyboardMarkup(main_menu_buttons, resize_keyboard=True)
-            await update.message.reply_text("Головне меню:", reply_markup=reply_markup)
+            await update.message.reply_text("Головне меню:", reply_markup=VOLUNTEER_MENU)
 
         except ValueError as e:
             await update.message.reply_text(f"⚠️ Помилка: {str(e)}")
@@ -361,39 +294,19 @@ async def confirm_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     else:
         await update.message.reply_text("❌ Редагування профілю скасовано.")
 
-        main_menu_buttons = [
-            [KeyboardButton("Список завдань")],
-            [KeyboardButton("Прийняти заявку в обробку")],
-            [KeyboardButton("Закрити заявку")],
-            [KeyboardButton("Скасувати заявку")],
-            [KeyboardButton("Редагувати профіль")],
-            [KeyboardButton("Деактивувати профіль волонтера")],
-            [KeyboardButton("Вихід")],
-        ]
-        reply_markup = ReplyKeyboardMarkup(main_menu_buttons, resize_keyboard=True, one_time_keyboard=False)
-        await update.message.reply_text("Головне меню:", reply_markup=reply_markup)
+        await update.message.reply_text("Головне меню:", reply_markup=VOLUNTEER_MENU)
 
     return ConversationHandler.END
 
 async def cancel_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Скасування редагування профілю та повернення до меню."""
-    main_menu_buttons = [
-        [KeyboardButton("Список завдань")],
-        [KeyboardButton("Прийняти заявку в обробку")],
-        [KeyboardButton("Закрити заявку")],
-        [KeyboardButton("Скасувати заявку")],
-        [KeyboardButton("Редагувати профіль")],
-        [KeyboardButton("Деактивувати профіль волонтера")],
-        [KeyboardButton("Вихід")],
-    ]
-    reply_markup = ReplyKeyboardMarkup(main_menu_buttons, resize_keyboard=True, one_time_keyboard=False)
-
-    await update.message.reply_text("❌ Редагування профілю скасовано.", reply_markup=reply_markup)
+    await update.message.reply_text("❌ Редагування профілю скасовано.", reply_markup=VOLUNTEER_MENU)
     return ConversationHandler.END
 
 
-
 edit_profile_handler = ConversationHandler(
+    name="edit_profile",
+    persistent=True,
     entry_points=[MessageHandler(filters.Regex("^Редагувати профіль$"), start_edit_profile)],
     states={
         ENTER_LOCATION: [
@@ -1,62 +1,25 @@
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from services.api_client import get_applications_by_type, refresh_token_log
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import CallbackQueryHandler, MessageHandler, filters
+from services.api_client import get_application_records
+from services.application_cache import get_application_index
+from services.callback_data import APPLICATION_LIST, decode_callback, encode_callback
+from services.spatial_index import parse_radius, volunteer_origin
+from services.token_manager import call_with_token
 
 # Константи для пагінації та фільтрації
 ITEMS_PER_PAGE = 5
 DISTANCE_FILTERS = ["до 5 км", "до 10 км", "до 20 км", "до 50 км"]
-
-async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE) -> str:
-    user_data = context.user_data
-
-    refresh_token = user_data.get("refresh_token")
-    if not refresh_token:
-        await reset_to_start_menu(context)
-        raise Exception("Refresh token is missing. User needs to reauthenticate.")
-
-    try:
-        tokens = await refresh_token_log(refresh_token)
-        user_data["access_token"] = tokens["access_token"]
-        user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
-        return user_data["access_token"]
-    except Exception as e:
-
-        await reset_to_start_menu(context)
-        raise Exception(f"Failed to refresh access token: {e}")
-
-
-async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
-    """
-    Повертає користувача до початкового меню.
-    """
-    if "user_id" in context.user_data:
-        del context.user_data["user_id"]
-    if "access_token" in context.user_data:
-        del context.user_data["access_token"]
-    if "refresh_token" in context.user_data:
-        del context.user_data["refresh_token"]
-
-    await context.bot.send_message(
-        chat_id=context.user_data.get("chat_id"),
-        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
-        reply_markup=START_KEYBOARD
-    )
-START_KEYBOARD = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Стати волонтером")],
-        [KeyboardButton("Стати бенефіціаром")],
-    ],
-    resize_keyboard=True, one_time_keyboard=False
-)
+# Тип списку передається в callback_data індексом.
+APPLICATION_TYPES = ["available", "in_progress", "finished"]
 
 
 from datetime import datetime
 
 async def choose_application_type(update, context):
     keyboard = [
-        [InlineKeyboardButton("✅ Доступні", callback_data='available')],
-        [InlineKeyboardButton("⏳ Виконуються", callback_data='in_progress')],
-        [InlineKeyboardButton("✔️ Завершені", callback_data='finished')]
+        [InlineKeyboardButton("✅ Доступні", callback_data=encode_callback(APPLICATION_LIST, id=0))],
+        [InlineKeyboardButton("⏳ Виконуються", callback_data=encode_callback(APPLICATION_LIST, id=1))],
+        [InlineKeyboardButton("✔️ Завершені", callback_data=encode_callback(APPLICATION_LIST, id=2))]
     ]
 
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -68,17 +31,15 @@ async def choose_application_type(update, context):
 
 async def button(update, context):
     query = update.callback_query
-    data = query.data.split('|')
-    application_type = data[0]
-
-    current_page = int(data[1]) if len(data) > 1 else 0
-    distance_filter = data[2] if len(data) > 2 else None
-
-    try:
-        access_token = await ensure_valid_token(context)
-    except Exception as e:
-        await query.answer(text=f"❌ Помилка: {str(e)}")
+    data = decode_callback(query.data)
+    if data is None:
+        await query.answer(text="⚠️ Кнопка застаріла. Відкрийте список заявок ще раз.")
         return
+    application_type = APPLICATION_TYPES[data.id] if data.id < len(APPLICATION_TYPES) else None
+
+    current_page = data.page
+    # filter — номер фільтра відстані, починаючи з 1; 0 — фільтр ще не обрано.
+    distance_filter = DISTANCE_FILTERS[data.filter - 1] if 0 < data.filter <= len(DISTANCE_FILTERS) else None
 
     if application_type == "available":
         response_text = "🟢 **Доступні заявки**: Це заявки, які ще не були виконані або завершені."
@@ -90,27 +51,29 @@ async def button(update, context):
         response_text = "❓ Невідомий тип заявки"
 
     if application_type == "available" and not distance_filter:
-        keyboard = [[InlineKeyboardButton(f"{f} км", callback_data=f"available|0|{f}") for f in DISTANCE_FILTERS]]
+        keyboard = [[InlineKeyboardButton(f"{f} км", callback_data=encode_callback(APPLICATION_LIST, filter=i))
+                     for i, f in enumerate(DISTANCE_FILTERS, start=1)]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text("🗺️ **Оберіть фільтр за відстанню**:", reply_markup=reply_markup, parse_mode='Markdown')
         return
 
-    applications = await get_applications_by_type(
-        access_token, application_type, "volunteer"
-    )
+    max_distance = parse_radius(distance_filter)
+    try:
+        index = await get_application_index(
+            update.effective_user.id, application_type,
+            lambda: call_with_token(context, lambda token: get_application_records(token, application_type, "volunteer")),
+        )
+    except Exception as e:
+        await query.answer(text=f"❌ Помилка: {str(e)}")
+        return
 
-    if isinstance(applications, dict) and 'detail' in applications:
-        await query.answer(text=applications["detail"])
+    if isinstance(index, dict) and 'detail' in index:
+        await query.answer(text=index["detail"])
     else:
+        applications = index.nearest(volunteer_origin(context.user_data), max_distance)
         if not applications:
             await query.answer(text=f"⚠️ Немає заявок зі статусом *'{application_type}'*.", parse_mode='Markdown')
         else:
-            if distance_filter:
-                max_distance = int(distance_filter.split()[1])
-                applications = [app for app in applications if app.get("distance", float('inf')) <= max_distance]
-
-            applications.sort(key=lambda app: app['id'])
-
             total_pages = (len(applications) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
             start = current_page * ITEMS_PER_PAGE
             end = start + ITEMS_PER_PAGE
@@ -127,12 +90,11 @@ async def button(update, context):
                         return "Невірний формат дати"
                 return "Не вказано"
 
-            for app in paginated_apps:
-                description = app.get("description", "Немає опису")
-                distance = app.get("distance", None)
-                active_to = app.get("active_to", "Невідомо")
-                first_name = app.get("creator", {}).get("first_name", "Невідомо")
-                phone_num = app.get("creator", {}).get("phone_num", "Невідомо")
+            for distance, app in paginated_apps:
+                description = app.description
+                active_to = app.active_to
+                first_name = app.creator_name or "Невідомо"
+                phone_num = app.creator_phone or "Невідомо"
 
                 if distance is not None:
                     distance = round(distance, 1)
@@ -148,7 +110,7 @@ async def button(update, context):
                     creator_info = ""
 
                 response_text += (
-                    f"📝 Заявка {app['id']}:\n"
+                    f"📝 Заявка {app.id}:\n"
                     f"📄 Опис: {description}\n"
                     f"📍 Відстань: {distance_text}\n"
                     f"📅 Дійсна до: {active_to_formatted}\n"
@@ -160,10 +122,10 @@ async def button(update, context):
             nav_buttons = []
             if current_page > 0:
                 nav_buttons.append(InlineKeyboardButton("⬅️ Назад",
-                                                        callback_data=f"{application_type}|{current_page - 1}|{distance_filter}"))
+                                                        callback_data=encode_callback(APPLICATION_LIST, data.id, current_page - 1, data.filter)))
             if current_page < total_pages - 1:
                 nav_buttons.append(InlineKeyboardButton("Вперед ➡️",
-                                                        callback_data=f"{application_type}|{current_page + 1}|{distance_filter}"))
+                                                        callback_data=encode_callback(APPLICATION_LIST, data.id, current_page + 1, data.filter)))
 
             if nav_buttons:
                 keyboard.append(nav_buttons)
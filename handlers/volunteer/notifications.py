@@ -0,0 +1,81 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes
+
+from services.notifications import NOTIFY_DEFAULT_RADIUS, NOTIFY_MAX_RADIUS
+from services.spatial_index import parse_radius, volunteer_origin
+from services.subscriptions import Subscription, get_subscription, subscribe, unsubscribe
+
+
+def _subscription_from_profile(update: Update, user_data: dict, radius_km: float):
+    origin = volunteer_origin(user_data)
+    if origin is None:
+        return None
+    categories = user_data.get("selected_categories")
+    return Subscription(
+        id=update.effective_user.id,
+        chat_id=update.effective_chat.id,
+        latitude=origin[0],
+        longitude=origin[1],
+        radius_km=radius_km,
+        categories=frozenset(categories) if categories else None,
+    )
+
+
+async def refresh_subscription(update: Update, user_data: dict) -> None:
+    """Оновлює точку й категорії підписки після редагування профілю."""
+    current = await asyncio.to_thread(get_subscription, update.effective_user.id)
+    if current is None:
+        return
+    subscription = _subscription_from_profile(update, user_data, current.radius_km)
+    if subscription is not None:
+        await asyncio.to_thread(subscribe, subscription)
+
+
+async def toggle_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /notifications — стан підписки, /notifications 15 — підписатися з радіусом 15 км,
+    /notifications off — відписатися.
+    """
+    if context.user_data.get("role_id") != 2 or not context.user_data.get("access_token"):
+        await update.message.reply_text("❌ Сповіщення доступні лише авторизованим волонтерам.")
+        return
+
+    argument = context.args[0].lower() if context.args else None
+    if argument in ("off", "вимк"):
+        if await asyncio.to_thread(unsubscribe, update.effective_user.id):
+            await update.message.reply_text("🔕 Сповіщення про нові заявки вимкнено.")
+        else:
+            await update.message.reply_text("Ви не підписані на сповіщення.")
+        return
+
+    if argument is None:
+        current = await asyncio.to_thread(get_subscription, update.effective_user.id)
+        if current is not None:
+            await update.message.reply_text(
+                f"🔔 Ви отримуєте сповіщення про нові заявки в радіусі {current.radius_km:g} км.\n"
+                "Змінити радіус: /notifications 15, вимкнути: /notifications off")
+            return
+        radius_km = NOTIFY_DEFAULT_RADIUS
+    else:
+        radius_km = parse_radius(argument)
+        if radius_km is None:
+            await update.message.reply_text("⚠️ Вкажіть радіус числом кілометрів, наприклад: /notifications 15")
+            return
+        radius_km = min(radius_km, NOTIFY_MAX_RADIUS)
+
+    subscription = _subscription_from_profile(update, context.user_data, radius_km)
+    if subscription is None:
+        await update.message.reply_text(
+            "📍 Щоб отримувати сповіщення, вкажіть свою локацію координатами або геоміткою "
+            "в розділі «Редагувати профіль».")
+        return
+
+    await asyncio.to_thread(subscribe, subscription)
+    await update.message.reply_text(
+        f"🔔 Ви отримуватимете сповіщення про нові заявки в радіусі {radius_km:g} км.\n"
+        "Вимкнути: /notifications off")
+
+
+notifications_handler = CommandHandler("notifications", toggle_notifications)
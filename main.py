@@ -1,3 +1,6 @@
+import asyncio
+import logging
+
 from telegram import KeyboardButton, ReplyKeyboardMarkup, Update
 from telegram.ext import Application, CallbackQueryHandler, CallbackContext
 from telegram.ext import CommandHandler, MessageHandler, filters
@@ -21,14 +24,73 @@ from handlers.volunteer.delete_profile_volunteer import \
     deactivation_handler_vol
 from handlers.volunteer.edit_profile import edit_profile_handler
 from handlers.volunteer.get_applic_volunteer import choose_application_type, button
+from handlers.volunteer.notifications import notifications_handler
 from handlers.moderator.verify_user import verify_user_handler
+from services.http_session import init_http_session, close_http_session
+from services.callback_data import APPLICATION_LIST, callback_pattern
+from services.category_cache import warm_category_cache
+from services.geocoding import close_geocode_cache
+from services.image_processing import shutdown_image_pool
+from services.notifications import schedule_notifications
+from services.persistence import build_persistence
+from services.rate_limiter import RATE_LIMIT_GLOBAL, PriorityRateLimiter
+from services.routing import route_updates
+from services.shared_cache import close_shared_cache
+from services.subscriptions import close_subscriptions
+from services.update_processing import OrderedUpdateProcessor, instrument_handlers, \
+    start_metrics_logging, stop_metrics_logging
+from services.webhook import WEBHOOK_QUEUE_SIZE, run_webhook
+from services.upload_spool import sweep_spool
 from decouple import config
 
 TELEGRAM_TOKEN = config("TELEGRAM_TOKEN")
+TELEGRAM_API_URL = config("TELEGRAM_API_URL", default="https://api.telegram.org")
+# polling або webhook
+BOT_MODE = config("BOT_MODE", default="polling")
 
+logging.basicConfig(level=logging.INFO)
+
+
+async def post_init(application: Application) -> None:
+    route_updates(application)
+    await init_http_session(application)
+    await warm_category_cache(application)
+    sweep_spool(application)
+    start_metrics_logging(application)
+
+
+async def post_shutdown(application: Application) -> None:
+    stop_metrics_logging(application)
+    await close_http_session(application)
+    close_geocode_cache(application)
+    close_shared_cache(application)
+    close_subscriptions(application)
+    shutdown_image_pool(application)
 
-def main():
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+
+def build_application(update_queue: asyncio.Queue = None, notifications: bool = True,
+                      global_rate: float = RATE_LIMIT_GLOBAL) -> Application:
+    """
+    Створює Application з усіма обробниками бота.
+
+    `notifications=False` вимикає опитування нових заявок (у воркерах
+    супервізора його виконує лише один процес). `global_rate` — частка
+    загального ліміту Bot API, яку може використати цей процес.
+    """
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        .persistence(build_persistence())
+        .concurrent_updates(OrderedUpdateProcessor())
+        .rate_limiter(PriorityRateLimiter(global_rate=global_rate))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if update_queue is not None:
+        builder = builder.update_queue(update_queue)
+    application = builder.build()
 
     application.add_handler(registration_handler)
     application.add_handler(auth_handler)
@@ -58,9 +120,22 @@ def main():
     application.add_handler(cancel_application_handler)
     application.add_handler(edit_profile_handler)
     application.add_handler(MessageHandler(filters.Regex("^Список завдань$"), choose_application_type))
-    application.add_handler(CallbackQueryHandler(button, pattern="(available|in_progress|finished)"))
+    application.add_handler(CallbackQueryHandler(button, pattern=callback_pattern(APPLICATION_LIST)))
+    application.add_handler(notifications_handler)
+
+    if notifications:
+        schedule_notifications(application)
+    instrument_handlers(application)
+    return application
+
+
+def main():
+    if BOT_MODE == "webhook":
+        application = build_application(asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE))
+        asyncio.run(run_webhook(application))
+    else:
+        build_application().run_polling()
 
-    application.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
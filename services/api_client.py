@@ -1,670 +1,626 @@
-from lib2to3.fixes.fix_input import context
+import json
+import logging
+import os
+from contextlib import ExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
 import aiohttp
-import requests
 from decouple import config
 
-CLIENT_NAME = config('CLIENT_NAME')
-CLIENT_PASSWORD = config('CLIENT_PASSWORD')
-
-
-async def register_user(user_id, user_data):
-    """Реєстрація користувача через API"""
-    url = "https://bot.bckwdd.fun/auth/register/"
-    data = {
-        "phone_num": user_data["phone_num"],
-        "tg_id": str(user_id),
-        "firstname": user_data["firstname"],
-        "lastname": user_data["lastname"],
-        "patronymic": user_data["patronymic"],
-        "role_id": user_data["role_id"],
-        "client": CLIENT_NAME,
-        "password": CLIENT_PASSWORD,
-    }
-
-    if user_data["role_id"] == 2:
-        location = user_data.get("location", {})
-        if location:
-            data["location"] = location
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=data) as response:
-            if response.status != 201:
-                raise Exception(f"Помилка API: {response.status}, {await response.text()}")
+from services.http_session import get_session
+from services.json_stream import iter_json_array
+from services.records import to_records
 
+logger = logging.getLogger(__name__)
 
-import aiohttp
+API_URL = config("API_URL", default="https://bot.bckwdd.fun")
+API_TIMEOUT = config("API_TIMEOUT", default=30, cast=float)
+# Чи підтримує бекенд limit/offset у списках заявок.
+API_SERVER_PAGINATION = config("API_SERVER_PAGINATION", default=False, cast=bool)
+API_STREAM_CHUNK = 64 * 1024
 
-API_URL = "https://bot.bckwdd.fun"
+CLIENT_NAME = config('CLIENT_NAME')
+CLIENT_PASSWORD = config('CLIENT_PASSWORD')
 
 
-async def login_user(login_request):
-    """Відправка запиту на авторизацію користувача."""
-    url = f"{API_URL}/auth/login/"
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=login_request) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 400:
-                data = await response.json()
-                raise ValueError(data.get("detail", "Invalid request"))
-            elif response.status == 403:
-                data = await response.json()
-                raise PermissionError(data.get("detail", "Forbidden"))
-            else:
-                raise Exception(f"Unexpected error: {response.status}")
+class UnauthorizedError(PermissionError):
+    """Бекенд відхилив access token (HTTP 401)."""
 
 
-import logging
+class BackendClient:
+    """
+    Клієнт API бекенду.
 
-logging.basicConfig(level=logging.INFO)
+    Усі запити йдуть через один пул з'єднань, мають спільні тайм-аути,
+    серіалізацію JSON та розбір помилок. Для бенчмарків клієнт можна
+    створити з іншим `base_url` (наприклад, локальним stub-сервером)
+    і власною сесією.
+    """
 
+    def __init__(self, base_url: str = API_URL, timeout: float = API_TIMEOUT,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = session
+        self.server_pagination = API_SERVER_PAGINATION
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self._session or get_session()
+
+    def _url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}{path}"
+
+    @staticmethod
+    def _headers(access_token: Optional[str] = None) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+        return headers
+
+    @staticmethod
+    async def _read_body(response: aiohttp.ClientResponse) -> Any:
+        text = await response.text()
+        if not text:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    @staticmethod
+    def _detail(body: Any, default: str) -> str:
+        """Дістає поле `detail` з відповіді API або повертає значення за замовчуванням."""
+        if isinstance(body, dict):
+            return body.get("detail", default)
+        return default
+
+    @staticmethod
+    def _text(body: Any) -> str:
+        if body is None:
+            return ""
+        if isinstance(body, str):
+            return body
+        return json.dumps(body, ensure_ascii=False)
+
+    async def _request(self, method: str, path: str, access_token: Optional[str] = None,
+                       raise_unauthorized: bool = True, **kwargs) -> Tuple[int, Any]:
+        """
+        Виконує запит і повертає пару (статус, розібране тіло відповіді).
+
+        Для запитів з токеном відповідь 401 перетворюється на `UnauthorizedError`,
+        щоб менеджер токенів міг оновити токен і повторити запит.
+        """
+        headers = kwargs.pop("headers", None) or self._headers(access_token)
+        if "data" in kwargs:
+            headers.pop("Content-Type", None)
+        async with self.session.request(method, self._url(path), headers=headers,
+                                        timeout=self.timeout, **kwargs) as response:
+            body = await self._read_body(response)
+            if response.status == 401 and access_token and raise_unauthorized:
+                raise UnauthorizedError(self._detail(body, "Unauthorized"))
+            return response.status, body
+
+    @asynccontextmanager
+    async def _stream(self, method: str, path: str, access_token: Optional[str] = None,
+                      **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Як `_request`, але віддає відповідь непрочитаною — для потокового розбору тіла."""
+        async with self.session.request(method, self._url(path), headers=self._headers(access_token),
+                                        timeout=self.timeout, **kwargs) as response:
+            if response.status == 401 and access_token:
+                raise UnauthorizedError(self._detail(await self._read_body(response), "Unauthorized"))
+            yield response
+
+    # --- auth ---
+
+    async def register_user(self, user_id, user_data):
+        """Реєстрація користувача через API"""
+        data = {
+            "phone_num": user_data["phone_num"],
+            "tg_id": str(user_id),
+            "firstname": user_data["firstname"],
+            "lastname": user_data["lastname"],
+            "patronymic": user_data["patronymic"],
+            "role_id": user_data["role_id"],
+            "client": CLIENT_NAME,
+            "password": CLIENT_PASSWORD,
+        }
+
+        if user_data["role_id"] == 2:
+            location = user_data.get("location", {})
+            if location:
+                data["location"] = location
+
+        status, body = await self._request("POST", "/auth/register/", json=data)
+        if status != 201:
+            raise Exception(f"Помилка API: {status}, {self._text(body)}")
+
+    async def login_user(self, login_request):
+        """Відправка запиту на авторизацію користувача."""
+        status, body = await self._request("POST", "/auth/login/", json=login_request)
+        if status == 200:
+            return body
+        elif status == 400:
+            raise ValueError(self._detail(body, "Invalid request"))
+        elif status == 403:
+            raise PermissionError(self._detail(body, "Forbidden"))
+        raise Exception(f"Unexpected error: {status}")
+
+    async def refresh_token_log(self, refresh_token: str) -> dict:
+        status, body = await self._request("POST", "/auth/refresh/", json={"refresh_token": refresh_token})
+        if status == 200:
+            return body
+        raise Exception(f"Failed to refresh token: {self._text(body)}")
+
+    async def get_user_info(self, tg_id: str, role_id: int, client: str, password: str) -> Optional[Dict]:
+        """Функція для перевірки, чи є користувач в базі через API."""
+        body = {
+            "tg_id": tg_id,
+            "role_id": role_id,
+            "client": client,
+            "password": password
+        }
 
-async def edit_volunteer_location_and_categories(access_token, location, categories):
-    url = "https://bot.bckwdd.fun/volunteer/profile/"
+        try:
+            status, data = await self._request("POST", "/auth/user/", json=body)
+            if status == 200:
+                return data
+            elif status == 404:
+                return None
+            print(f"Error: {self._detail(data, 'Unknown error')}")
+            return None
+        except Exception as e:
+            print(f"Error during API request: {e}")
+            return None
 
-    payload = {
-        "location": location if location else None,
-        "categories": categories if categories else []
-    }
+    # --- volunteer ---
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
+    async def edit_volunteer_location_and_categories(self, access_token, location, categories):
+        payload = {
+            "location": location if location else None,
+            "categories": categories if categories else []
+        }
 
-    logging.info(f"URL: {url}")
-    logging.info(f"Headers: {headers}")
-    logging.info(f"Payload: {payload}")
+        logger.info(f"Payload: {payload}")
 
-    async with aiohttp.ClientSession() as session:
         try:
-            async with session.put(url, headers=headers, json=payload) as response:
-                response_text = await response.text()
-
-                logging.info(f"Response Status: {response.status}")
-                logging.info(f"Response Text: {response_text}")
-
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logging.error(f"Error: {response.status} - {response_text}")
-                    return None
+            status, body = await self._request("PUT", "/volunteer/profile/", access_token, json=payload)
         except aiohttp.ClientError as e:
-            logging.error(f"HTTP request error: {str(e)}")
+            logger.error(f"HTTP request error: {str(e)}")
             return None
 
+        logger.info(f"Response Status: {status}")
+        if status == 200:
+            return body
+        logger.error(f"Error: {status} - {self._text(body)}")
+        return None
 
-import logging
-import aiohttp
-
-logger = logging.getLogger(__name__)
-
-
-async def deactivate_volunteer_account(access_token: str) -> bool:
-    url = "https://bot.bckwdd.fun/volunteer/profile/"
-
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-
-    async with aiohttp.ClientSession() as session:
+    async def deactivate_volunteer_account(self, access_token: str) -> bool:
         try:
-            async with session.delete(url, headers=headers) as response:
-                if response.status == 204:
-                    return True
-                else:
-                    error_message = await response.json()
-                    detail = error_message.get("detail", "Unknown error occurred.")
-                    logging.error(f"Unexpected error in deactivate_volunteer_account: {detail}")
-
-                    # Handle specific backend errors
-                    if "Multiple rows were found" in detail:
-                        raise RuntimeError(
-                            "Database inconsistency detected: Multiple profiles found for your account. "
-                            "Please contact support."
-                        )
-                    else:
-                        raise RuntimeError(detail)
+            status, body = await self._request("DELETE", "/volunteer/profile/", access_token)
         except aiohttp.ClientError as e:
-            logging.error(f"HTTP request error: {str(e)}")
+            logger.error(f"HTTP request error: {str(e)}")
             raise RuntimeError("A network error occurred. Please try again later.")
-        except Exception as e:
-            logging.error(f"Unexpected error: {str(e)}")
-            raise
-
-
-import aiohttp
-import logging
-
-# Логування
-logging.basicConfig(level=logging.INFO)
-
-
-async def get_applications_by_status(access_token: str, status: str):
-    url = f"{API_URL}/volunteer/applications/?type={status}"
-
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-
-    logging.info(f"Sending request to: {url} with headers: {headers}")
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    applications = await response.json()
-                    return applications
-                else:
-                    logging.error(f"Error fetching applications: {response.status}")
-                    return {"detail": f"Error: {response.status}"}
-    except Exception as e:
-        logging.error(f"Request failed: {str(e)}")
-        return {"detail": "Error: Unable to fetch applications."}
-
-
-async def accept_application(access_token, application_id):
-    """
-    Прийняти заявку поточним волонтером.
-
-    :param access_token: Токен доступу для авторизації
-    :param application_id: ID заявки, яку волонтер приймає
-    :return: Інформація про оновлену заявку
-    """
-    url = f"{API_URL}/volunteer/applications/accept/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {"application_id": application_id}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 403:
-                raise PermissionError("Access denied. User not verified by moderator")
-            elif response.status == 404:
-                error_detail = await response.json()
-                raise ValueError(error_detail.get("detail", "Resource not found"))
-            elif response.status == 500:
-                error_detail = await response.json()
-                raise Exception(f"Server error: {error_detail.get('detail', 'Unknown error')}")
-            else:
-                response.raise_for_status()
-
-
-from aiohttp import FormData, ClientSession
-
-
-async def close_application(access_token, application_id, files):
-    """Закриття заявки із завантаженням файлів."""
-    url = f"https://bot.bckwdd.fun/volunteer/applications/close/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    form_data = aiohttp.FormData()
-    form_data.add_field("application_id", str(application_id))
-
-    for file_name, file_content in files:
-        form_data.add_field(
-            "files",
-            file_content,
-            filename=file_name,
-            content_type="application/octet-stream"
-        )
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, data=form_data) as response:
-            if response.status == 413:
-                logging.error("Помилка: Завеликий розмір даних (Payload Too Large)")
-            return await response.json()
-
-
-async def login_moderator(login_request):
-    """Відправка запиту на авторизацію модератора."""
-    url = f"{API_URL}/moderator/login/"
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=login_request) as response:
-            if response.status == 200:
-                return await response.json()  # Успішна авторизація
-            elif response.status == 400:
-                data = await response.json()
-                raise ValueError(data.get("detail", "Invalid request"))
-            elif response.status == 403:
-                data = await response.json()
-                raise PermissionError(data.get("detail", "Forbidden"))
-            else:
-                raise Exception(f"Unexpected error: {response.status}")
-
-
-async def create_or_activate_category(name: str, parent_id: int = None, access_token: str = "") -> dict:
-    """
-    Створює нову категорію або активує існуючу через API.
-
-    Args:
-        name (str): Назва категорії.
-        parent_id (int, optional): Ідентифікатор батьківської категорії.
-        access_token (str): Токен доступу модератора.
-
-    Returns:
-        dict: Дані категорії у разі успіху.
-    """
-    url = f"{API_URL}/moderator/categories/"  # Замініть на реальний URL
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {
-        "name": name,
-    }
-    if parent_id is not None:
-        payload["parent_id"] = parent_id
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status == 201:
-                    return await response.json()
-                elif response.status == 400:
-                    error_message = await response.json()
-                    raise ValueError(error_message.get("detail", "Unknown error"))
-                else:
-                    error_message = await response.json()
-                    raise RuntimeError(f"Unexpected error: {error_message.get('detail', 'Unknown error')}")
-    except Exception as e:
-        raise RuntimeError(f"Помилка при створенні категорії: {str(e)}")
-
-
-async def deactivate_category(category_id: int, access_token: str) -> dict:
-    url = f"{API_URL}/moderator/categories/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {"id": category_id}
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, json=payload, headers=headers) as response:
-                if response.status == 204:
-                    return {"detail": "Категорія успішно деактивована"}
-                elif response.status == 404:
-                    error_message = await response.json()
-                    raise ValueError(error_message.get("detail", "Категорія не знайдена"))
-                else:
-                    error_message = await response.json()
-                    raise RuntimeError(error_message.get("detail", "Невідома помилка"))
-    except Exception as e:
-        raise RuntimeError(f"Помилка при деактивації категорії: {str(e)}")
-
-
-async def deactivate_application(application_id: int, access_token: str):
-    """Деактивація заявки за її ID."""
-    url = f"{API_URL}/moderator/applications/"
-
-    if not access_token:
-        raise PermissionError("Не знайдено токен доступу. Будь ласка, авторизуйтесь.")
-
-    headers = {
-        'Authorization': f'Bearer {access_token}'
-    }
-
-    data = {
-        "application_id": application_id
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, json=data, headers=headers) as response:
-            if response.status == 204:
-                return {"detail": "Application deleted successfully"}
-            elif response.status == 404:
-                data = await response.json()
-                raise ValueError(data.get("detail", "Application not found"))
-            elif response.status == 401:
-                raise PermissionError("Помилка авторизації: Токен не є дійсним.")
-            else:
-                raise Exception(f"Unexpected error: {response.status}")
-
-
-async def verify_user(user_id: int, is_verified: bool, access_token: str, refresh_token: str, refresh_url: str):
-    """Оновлення статусу верифікації користувача з перевіркою токену."""
-    url = f"{API_URL}/moderator/verify_user/"
-
-    data = {
-        "user_id": user_id,
-        "is_verified": is_verified
-    }
-
-    try:
-        response_data = await make_authenticated_request_with_refresh(
-            url,
-            "POST",
-            access_token,
-            refresh_token,
-            refresh_url,
-            json=data
-        )
-        return response_data
-    except Exception as e:
-        print(f"Error in verify_user: {str(e)}")
-        raise
-
-
-async def refresh_access_token(refresh_token: str, refresh_url: str) -> str:
-    """
-    Оновлює токен доступу за допомогою `refresh_token`.
-
-    Args:
-        refresh_token (str): Токен для оновлення.
-        refresh_url (str): URL для оновлення токена.
 
-    Returns:
-        str: Новий `access_token`.
-    """
-    async with aiohttp.ClientSession() as session:
-        async with session.post(refresh_url, json={"refresh_token": refresh_token}) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data["access_token"]
-            else:
-                raise Exception(
-                    f"Помилка оновлення токена: {response.status}, {await response.text()}"
+        if status == 204:
+            return True
+
+        detail = self._detail(body, "Unknown error occurred.")
+        logger.error(f"Unexpected error in deactivate_volunteer_account: {detail}")
+
+        if "Multiple rows were found" in detail:
+            raise RuntimeError(
+                "Database inconsistency detected: Multiple profiles found for your account. "
+                "Please contact support."
+            )
+        raise RuntimeError(detail)
+
+    async def get_applications_by_status(self, access_token: str, status: str, **kwargs):
+        return await self.get_applications_by_type(access_token, status, "volunteer", **kwargs)
+
+    async def get_application_records(self, access_token: str, application_type: str,
+                                      role: str = "volunteer", **kwargs):
+        """Як `get_applications_by_type`, але список повертається як `ApplicationRecord`."""
+        return to_records(await self.get_applications_by_type(access_token, application_type, role, **kwargs))
+
+    async def accept_application(self, access_token, application_id):
+        """
+        Прийняти заявку поточним волонтером.
+
+        :param access_token: Токен доступу для авторизації
+        :param application_id: ID заявки, яку волонтер приймає
+        :return: Інформація про оновлену заявку
+        """
+        return await self._application_action("/volunteer/applications/accept/", access_token, application_id)
+
+    async def cancel_application(self, access_token, application_id):
+        """
+        Скасувати виконання заявки поточним волонтером.
+
+        :param access_token: Токен доступу для авторизації
+        :param application_id: ID заявки, яку волонтер скасовує
+        :return: Інформація про оновлену заявку
+        """
+        return await self._application_action("/volunteer/applications/cancel/", access_token, application_id)
+
+    async def _application_action(self, path, access_token, application_id):
+        status, body = await self._request("POST", path, access_token, json={"application_id": application_id})
+        if status == 200:
+            return body
+        elif status == 403:
+            raise PermissionError("Access denied. User not verified by moderator")
+        elif status == 404:
+            raise ValueError(self._detail(body, "Resource not found"))
+        elif status == 500:
+            raise Exception(f"Server error: {self._detail(body, 'Unknown error')}")
+        raise Exception(f"Unexpected error: {status}")
+
+    async def close_application(self, access_token, application_id, files):
+        """
+        Закриття заявки із завантаженням файлів.
+
+        `files` — пари (ім'я, вміст), де вміст — байти або шлях до файлу на диску.
+        Файли з диска передаються потоком, без читання в пам'ять повністю.
+        """
+        with ExitStack() as stack:
+            form_data = aiohttp.FormData()
+            form_data.add_field("application_id", str(application_id))
+
+            for file_name, file_content in files:
+                if isinstance(file_content, (str, os.PathLike)):
+                    file_content = stack.enter_context(open(file_content, "rb"))
+                form_data.add_field(
+                    "files",
+                    file_content,
+                    filename=file_name,
+                    content_type="application/octet-stream"
                 )
 
+            status, body = await self._request("POST", "/volunteer/applications/close/", access_token, data=form_data)
+        if status == 413:
+            logger.error("Помилка: Завеликий розмір даних (Payload Too Large)")
+        return body
+
+    # --- beneficiary ---
+
+    async def create_application(self, description: str, category_id: Optional[int], address: Optional[str],
+                                 latitude: Optional[float], longitude: Optional[float], active_to: str,
+                                 access_token: str):
+        """
+        Створення заявки через API.
+
+        :param description: Опис заявки.
+        :param category_id: ID категорії заявки (необов'язково).
+        :param address: Адреса заявки (необов'язково).
+        :param latitude: Широта локації заявки (необов'язково).
+        :param longitude: Довгота локації заявки (необов'язково).
+        :param active_to: Дата, до якої заявка буде активною (формат ISO 8601).
+        :param access_token: Токен доступу для бенефіціара.
+        :return: Інформація про створену заявку.
+        """
+        data = {
+            "description": description,
+            "category_id": category_id,
+            "address": address,
+            "latitude": latitude,
+            "longitude": longitude,
+            "active_to": active_to
+        }
 
-async def make_authenticated_request_with_refresh(
-        url: str,
-        method: str,
-        access_token: str,
-        refresh_token: str,
-        refresh_url: str,
-        **kwargs
-):
-    """Виконує запит з автоматичним оновленням токену, якщо термін дії access token минув."""
-
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.request(method, url, headers=headers, **kwargs) as response:
-            if response.status == 401:
-                try:
-
-                    access_token = await refresh_access_token(refresh_token, refresh_url)
-
-                    headers['Authorization'] = f'Bearer {access_token}'
-                    async with session.request(method, url, headers=headers, **kwargs) as retry_response:
-                        return await retry_response.json()
-                except Exception as e:
-                    raise PermissionError(f"Не вдалося оновити токен: {str(e)}")
-            elif response.status == 200:
-                return await response.json()
-            else:
-                raise Exception(f"Unexpected error: {response.status}")
-
-
-async def deactivate_beneficiary_profile(access_token: str) -> bool:
-    url = "https://bot.bckwdd.fun/beneficiary/profile/"
-
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=headers) as response:
-                if response.status == 200:
-
-                    return True
-                else:
-
-                    error_message = await response.json()
-                    raise RuntimeError(error_message.get("detail", "An unknown error occurred"))
-    except aiohttp.ClientError as e:
-        raise RuntimeError(f"HTTP error: {str(e)}")
-
-
-import httpx
-from typing import Optional, Dict
-
-
-async def create_application(description: str, category_id: Optional[int], address: Optional[str],
-                             latitude: Optional[float], longitude: Optional[float], active_to: str, access_token: str):
-    """
-    Створення заявки через API.
-
-    :param description: Опис заявки.
-    :param category_id: ID категорії заявки (необов'язково).
-    :param address: Адреса заявки (необов'язково).
-    :param latitude: Широта локації заявки (необов'язково).
-    :param longitude: Довгота локації заявки (необов'язково).
-    :param active_to: Дата, до якої заявка буде активною (формат ISO 8601).
-    :param access_token: Токен доступу для бенефіціара.
-    :return: Інформація про створену заявку.
-    """
-    url = "https://bot.bckwdd.fun/beneficiary/applications/"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "description": description,
-        "category_id": category_id,
-        "address": address,
-        "latitude": latitude,
-        "longitude": longitude,
-        "active_to": active_to
-    }
-
-    async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            raise ValueError(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
-        except httpx.RequestError as e:
+            status, body = await self._request("POST", "/beneficiary/applications/", access_token, json=data)
+        except aiohttp.ClientError as e:
             raise ValueError(f"Request error: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Unexpected error: {str(e)}")
-
-
-async def confirm_application(application_id: int, access_token: str):
-    url = f"{API_URL}/beneficiary/applications/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {"application_id": application_id}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.put(url, json=payload, headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 404:
-                raise ValueError("Заявку не знайдено.")
-            elif response.status == 400:
-                error_detail = await response.json()
-                raise ValueError(error_detail.get("detail", "Помилка виконання API."))
-            else:
-                raise ValueError("Невідома помилка API.")
-
-
-async def delete_application(application_id: int, access_token: str):
-    url = f"{API_URL}/beneficiary/applications/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {"application_id": application_id}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, json=payload, headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 404:
-                raise ValueError("Заявку не знайдено.")
-            else:
-                error_detail = await response.json()
-                raise ValueError(error_detail.get("detail", "Помилка виконання API."))
-
-
-import logging
-
-
-async def get_applications_by_type(access_token: str, application_type: str, role: str):
-    """Отримує список заявок за вказаним типом для бенефіціара (доступні, в процесі, завершені)."""
-
-    get_url = f"{API_URL}/{role}/applications/?type={application_type}"
-
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
 
-    logging.info(f"Sending request to: {get_url} with headers: {headers}")
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(get_url, headers=headers) as response:
-                if response.status == 200:
-                    applications = await response.json()
-                    return applications
-                else:
-                    logging.error(f"Error fetching applications: {response.status}")
-                    return {"detail": f"Error: {response.status}"}
-    except Exception as e:
-        logging.error(f"Request failed: {str(e)}")
-        return {"detail": "Error: Unable to fetch applications."}
-
-
-async def cancel_application(access_token, application_id):
-    """
-    Прийняти заявку поточним волонтером.
-
-    :param access_token: Токен доступу для авторизації
-    :param application_id: ID заявки, яку волонтер приймає
-    :return: Інформація про оновлену заявку
-    """
-    url = f"{API_URL}/volunteer/applications/cancel/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    payload = {"application_id": application_id}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 403:
-                raise PermissionError("Access denied. User not verified by moderator")
-            elif response.status == 404:
-                error_detail = await response.json()
-                raise ValueError(error_detail.get("detail", "Resource not found"))
-            elif response.status == 500:
-                error_detail = await response.json()
-                raise Exception(f"Server error: {error_detail.get('detail', 'Unknown error')}")
-            else:
-                response.raise_for_status()
-
-
-async def get_categories(client: str, password: str):
-    """Отримання списку категорій із API."""
-    url = "https://bot.bckwdd.fun/moderator/app/categories/"
-    payload = {
-        "for_developers": {"client": client, "password": password},
-        "client": client,
-        "password": password,
-    }
-    async with ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 400:
-                error = await response.json()
-                raise ValueError(f"Помилка запиту: {error.get('detail', 'Невідома помилка')}")
-            elif response.status == 500:
-                error = await response.json()
-                raise RuntimeError(f"Помилка сервера: {error.get('detail', 'Невідома помилка')}")
-            else:
-                raise Exception(f"Неочікувана помилка: {response.status} {await response.text()}")
-
-
-async def get_customers(base_url: str) -> list:
-    """
-    Отримати список користувачів для клієнта.
-
-    :param client: Назва клієнта
-    :param password: Пароль клієнта
-    :param base_url: Базовий URL API
-    :return: Список користувачів
-    :raises ValueError: У разі помилки запиту
-    """
-    url = f"{base_url}/moderator/app/customers/"
-    payload = {
-        "client": CLIENT_NAME,
-        "password": CLIENT_PASSWORD
-    }
+        if status >= 400:
+            raise ValueError(f"HTTP error occurred: {status} - {self._text(body)}")
+        return body
+
+    async def confirm_application(self, application_id: int, access_token: str):
+        status, body = await self._request("PUT", "/beneficiary/applications/", access_token,
+                                           json={"application_id": application_id})
+        if status == 200:
+            return body
+        elif status == 404:
+            raise ValueError("Заявку не знайдено.")
+        elif status == 400:
+            raise ValueError(self._detail(body, "Помилка виконання API."))
+        raise ValueError("Невідома помилка API.")
+
+    async def delete_application(self, application_id: int, access_token: str):
+        status, body = await self._request("DELETE", "/beneficiary/applications/", access_token,
+                                           json={"application_id": application_id})
+        if status == 200:
+            return body
+        elif status == 404:
+            raise ValueError("Заявку не знайдено.")
+        raise ValueError(self._detail(body, "Помилка виконання API."))
+
+    async def deactivate_beneficiary_profile(self, access_token: str) -> bool:
+        try:
+            status, body = await self._request("DELETE", "/beneficiary/profile/", access_token)
+        except aiohttp.ClientError as e:
+            raise RuntimeError(f"HTTP error: {str(e)}")
+
+        if status == 200:
+            return True
+        raise RuntimeError(self._detail(body, "An unknown error occurred"))
+
+    async def get_applications_by_type(self, access_token: str, application_type: str, role: str,
+                                       limit: Optional[int] = None, offset: int = 0):
+        """
+        Отримує список заявок за вказаним типом для волонтера або бенефіціара.
+
+        `limit`/`offset` передаються бекенду, якщо він їх підтримує
+        (`API_SERVER_PAGINATION`); інакше список ріжеться на сторінки тут. Якщо бекенд проігнорував `limit`,
+        клієнт переходить на локальну обробку до перезапуску. Щоб знати,
+        чи є наступна сторінка, викликач просить на одну заявку більше
+        (`limit=PAGE_SIZE + 1`): без пагінації на бекенді відповідь
+        перестає читатися, щойно ця заявка розібрана.
+        """
+        path = f"/{role}/applications/"
+        params = {"type": application_type}
+        if self.server_pagination and limit is not None:
+            params.update(limit=limit, offset=offset)
+        logger.info(f"Sending request to: {path}?type={application_type}")
+
+        if not self.server_pagination and limit is not None:
+            # Перестаємо читати, щойно сторінка (з заявкою наперед) заповнена.
+            try:
+                applications = [app async for app in self.stream_applications(
+                    access_token, application_type, role, offset + limit)]
+            except UnauthorizedError:
+                raise
+            except RuntimeError as e:
+                logger.error(f"Error fetching applications: {str(e)}")
+                return {"detail": str(e)}
+            except Exception as e:
+                logger.error(f"Request failed: {str(e)}")
+                return {"detail": "Error: Unable to fetch applications."}
+            return applications[offset:]
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload)
+        try:
+            status, body = await self._request("GET", path, access_token, params=params)
+        except UnauthorizedError:
+            raise
+        except Exception as e:
+            logger.error(f"Request failed: {str(e)}")
+            return {"detail": "Error: Unable to fetch applications."}
+
+        if status != 200:
+            logger.error(f"Error fetching applications: {status}")
+            return {"detail": f"Error: {status}"}
+        if isinstance(body, dict) and isinstance(body.get("items"), list):
+            body = body["items"]
+        if not isinstance(body, list):
+            return body
+
+        paginated_by_server = self.server_pagination and limit is not None
+        if paginated_by_server and len(body) > limit:
+            logger.warning("Backend ignored pagination parameters, falling back to client-side paging")
+            self.server_pagination = paginated_by_server = False
+        if limit is not None and not paginated_by_server:
+            return body[offset:offset + limit]
+        return body
+
+    async def stream_applications(self, access_token: str, application_type: str, role: str,
+                                  limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Віддає заявки в міру розбору відповіді бекенду (див. `iter_json_array`).
+
+        Після `limit` заявок з'єднання закривається, не дочитуючи тіло.
+        """
+        if limit is not None and limit <= 0:
+            return
+        path = f"/{role}/applications/"
+        count = 0
+        async with self._stream("GET", path, access_token, params={"type": application_type}) as response:
+            if response.status != 200:
+                raise RuntimeError(self._detail(await self._read_body(response), f"Error: {response.status}"))
+            async for application in iter_json_array(response.content.iter_chunked(API_STREAM_CHUNK)):
+                yield application
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+
+    # --- moderator ---
+
+    async def login_moderator(self, login_request):
+        """Відправка запиту на авторизацію модератора."""
+        status, body = await self._request("POST", "/moderator/login/", json=login_request)
+        if status == 200:
+            return body
+        elif status == 400:
+            raise ValueError(self._detail(body, "Invalid request"))
+        elif status == 403:
+            raise PermissionError(self._detail(body, "Forbidden"))
+        raise Exception(f"Unexpected error: {status}")
+
+    async def refresh_moderator_token(self, refresh_token: str) -> dict:
+        status, body = await self._request("POST", "/moderator/refresh-token/",
+                                           json={"refresh_token": refresh_token})
+        if status == 200:
+            return body
+        raise Exception(f"Failed to refresh token: {self._text(body)}")
+
+    async def get_categories(self, client: str, password: str):
+        """Отримання списку категорій із API."""
+        payload = {
+            "for_developers": {"client": client, "password": password},
+            "client": client,
+            "password": password,
+        }
+        status, body = await self._request("POST", "/moderator/app/categories/", json=payload)
+        if status == 200:
+            return body
+        elif status == 400:
+            raise ValueError(f"Помилка запиту: {self._detail(body, 'Невідома помилка')}")
+        elif status == 500:
+            raise RuntimeError(f"Помилка сервера: {self._detail(body, 'Невідома помилка')}")
+        raise Exception(f"Неочікувана помилка: {status} {self._text(body)}")
+
+    async def create_or_activate_category(self, name: str, parent_id: int = None, access_token: str = "") -> dict:
+        """
+        Створює нову категорію або активує існуючу через API.
+
+        Args:
+            name (str): Назва категорії.
+            parent_id (int, optional): Ідентифікатор батьківської категорії.
+            access_token (str): Токен доступу модератора.
+
+        Returns:
+            dict: Дані категорії у разі успіху.
+        """
+        payload = {"name": name}
+        if parent_id is not None:
+            payload["parent_id"] = parent_id
 
-        if response.status_code == 200:
-            return response.json()
+        try:
+            status, body = await self._request("POST", "/moderator/categories/", access_token, json=payload)
+            if status == 201:
+                return body
+            elif status == 400:
+                raise ValueError(self._detail(body, "Unknown error"))
+            raise RuntimeError(f"Unexpected error: {self._detail(body, 'Unknown error')}")
+        except UnauthorizedError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Помилка при створенні категорії: {str(e)}")
 
-        if response.status_code == 400:
+    async def deactivate_category(self, category_id: int, access_token: str) -> dict:
+        try:
+            status, body = await self._request("DELETE", "/moderator/categories/", access_token,
+                                               json={"id": category_id})
+            if status == 204:
+                return {"detail": "Категорія успішно деактивована"}
+            elif status == 404:
+                raise ValueError(self._detail(body, "Категорія не знайдена"))
+            raise RuntimeError(self._detail(body, "Невідома помилка"))
+        except UnauthorizedError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Помилка при деактивації категорії: {str(e)}")
+
+    async def deactivate_application(self, application_id: int, access_token: str):
+        """Деактивація заявки за її ID."""
+        if not access_token:
+            raise PermissionError("Не знайдено токен доступу. Будь ласка, авторизуйтесь.")
+
+        status, body = await self._request("DELETE", "/moderator/applications/", access_token,
+                                           json={"application_id": application_id})
+        if status == 204:
+            return {"detail": "Application deleted successfully"}
+        elif status == 404:
+            raise ValueError(self._detail(body, "Application not found"))
+        raise Exception(f"Unexpected error: {status}")
+
+    async def get_customers(self, base_url: str = None) -> list:
+        """
+        Отримати список користувачів для клієнта.
+
+        :param base_url: Базовий URL API (за замовчуванням - URL клієнта)
+        :return: Список користувачів
+        :raises ValueError: У разі помилки запиту
+        """
+        url = f"{(base_url or self.base_url).rstrip('/')}/moderator/app/customers/"
+        payload = {
+            "client": CLIENT_NAME,
+            "password": CLIENT_PASSWORD
+        }
+
+        status, body = await self._request("POST", url, json=payload)
+        if status == 200:
+            return body
+        if status == 400:
             raise ValueError("Invalid client type or incorrect password.")
-        elif response.status_code == 500:
+        elif status == 500:
             raise ValueError("Server or database error.")
-        else:
-            raise ValueError(f"Unexpected error: {response.text}")
+        raise ValueError(f"Unexpected error: {self._text(body)}")
 
+    async def verify_user(self, user_id: int, is_verified: bool, access_token: str, refresh_token: str,
+                          refresh_url: str):
+        """Оновлення статусу верифікації користувача з перевіркою токену."""
+        data = {
+            "user_id": user_id,
+            "is_verified": is_verified
+        }
 
-import aiohttp
-
+        try:
+            return await self.make_authenticated_request_with_refresh(
+                "/moderator/verify_user/",
+                "POST",
+                access_token,
+                refresh_token,
+                refresh_url,
+                json=data
+            )
+        except Exception as e:
+            print(f"Error in verify_user: {str(e)}")
+            raise
 
-async def refresh_token_log(refresh_token: str) -> dict:
-    url = "https://bot.bckwdd.fun/auth/refresh/"
-    payload = {"refresh_token": refresh_token}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                error_message = await response.text()
-                raise Exception(f"Failed to refresh token: {error_message}")
-
-
-async def refresh_moderator_token(refresh_token: str) -> dict:
-    url = "https://bot.bckwdd.fun/moderator/refresh-token/"
-    payload = {"refresh_token": refresh_token}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                error_message = await response.text()
-                raise Exception(f"Failed to refresh token: {error_message}")
-
-
-async def get_user_info(tg_id: str, role_id: int, client: str, password: str) -> Optional[Dict]:
-    """Функція для перевірки, чи є користувач в базі через API."""
-    url = "https://bot.bckwdd.fun/auth/user/"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    body = {
-        "tg_id": tg_id,
-        "role_id": role_id,
-        "client": client,
-        "password": password
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=body, headers=headers) as response:
-                if response.status == 200:
-                    user_data = await response.json()
-                    return user_data
-                elif response.status == 404:
-                    return None
-                else:
-                    error_message = await response.json()
-                    print(f"Error: {error_message.get('detail', 'Unknown error')}")
-                    return None
-    except Exception as e:
-        print(f"Error during API request: {e}")
-        return None
+    async def refresh_access_token(self, refresh_token: str, refresh_url: str) -> str:
+        """
+        Оновлює токен доступу за допомогою `refresh_token`.
+
+        Args:
+            refresh_token (str): Токен для оновлення.
+            refresh_url (str): URL для оновлення токена.
+
+        Returns:
+            str: Новий `access_token`.
+        """
+        status, body = await self._request("POST", refresh_url, json={"refresh_token": refresh_token})
+        if status == 200:
+            return body["access_token"]
+        raise Exception(f"Помилка оновлення токена: {status}, {self._text(body)}")
+
+    async def make_authenticated_request_with_refresh(self, url: str, method: str, access_token: str,
+                                                      refresh_token: str, refresh_url: str, **kwargs):
+        """Виконує запит з автоматичним оновленням токену, якщо термін дії access token минув."""
+        status, body = await self._request(method, url, access_token, raise_unauthorized=False, **kwargs)
+        if status == 401:
+            try:
+                access_token = await self.refresh_access_token(refresh_token, refresh_url)
+                _, body = await self._request(method, url, access_token, raise_unauthorized=False, **kwargs)
+                return body
+            except Exception as e:
+                raise PermissionError(f"Не вдалося оновити токен: {str(e)}")
+        elif status == 200:
+            return body
+        raise Exception(f"Unexpected error: {status}")
+
+
+backend = BackendClient()
+
+register_user = backend.register_user
+login_user = backend.login_user
+refresh_token_log = backend.refresh_token_log
+get_user_info = backend.get_user_info
+
+edit_volunteer_location_and_categories = backend.edit_volunteer_location_and_categories
+deactivate_volunteer_account = backend.deactivate_volunteer_account
+get_applications_by_status = backend.get_applications_by_status
+get_application_records = backend.get_application_records
+accept_application = backend.accept_application
+cancel_application = backend.cancel_application
+close_application = backend.close_application
+
+create_application = backend.create_application
+confirm_application = backend.confirm_application
+delete_application = backend.delete_application
+deactivate_beneficiary_profile = backend.deactivate_beneficiary_profile
+get_applications_by_type = backend.get_applications_by_type
+stream_applications = backend.stream_applications
+
+login_moderator = backend.login_moderator
+refresh_moderator_token = backend.refresh_moderator_token
+get_categories = backend.get_categories
+create_or_activate_category = backend.create_or_activate_category
+deactivate_category = backend.deactivate_category
+deactivate_application = backend.deactivate_application
+get_customers = backend.get_customers
+verify_user = backend.verify_user
+refresh_access_token = backend.refresh_access_token
+make_authenticated_request_with_refresh = backend.make_authenticated_request_with_refresh
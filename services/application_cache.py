@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from decouple import config
+
+from services.records import ApplicationRecord
+from services.spatial_index import ApplicationIndex
+
+# Скільки секунд список заявок користувача вважається актуальним.
+APPLICATION_LIST_TTL = config("APPLICATION_LIST_TTL", default=60, cast=int)
+# Скільки користувачів тримати в кеші одночасно.
+APPLICATION_LIST_CACHE_USERS = config("APPLICATION_LIST_CACHE_USERS", default=1000, cast=int)
+
+# tg_id -> {статус: (час завершення дії, індекс заявок)}
+_lists: "OrderedDict[Hashable, Dict[str, Tuple[float, ApplicationIndex]]]" = OrderedDict()
+
+
+def peek_application_index(user_id: Hashable, status: str) -> Optional[ApplicationIndex]:
+    """Свіжий індекс з кешу без звернення до бекенду."""
+    entries = _lists.get(user_id)
+    cached = entries.get(status) if entries is not None else None
+    if cached is None or cached[0] <= time.monotonic():
+        return None
+    _lists.move_to_end(user_id)
+    return cached[1]
+
+
+async def get_application_index(
+        user_id: Hashable, status: str,
+        fetch: Callable[[], Awaitable[Union[List[ApplicationRecord], dict]]],
+) -> Union[ApplicationIndex, dict]:
+    """
+    Просторовий індекс усіх заявок користувача зі статусом `status`.
+
+    Поки індекс свіжий, гортання сторінок і зміна радіуса не звертаються
+    до бекенду. Відповідь з помилкою (dict) повертається як є і не кешується.
+    Тому `fetch` бере повний список без `limit`: один індекс
+    обслуговує всі радіуси (зокрема довільний у «Прийняти заявку в
+    обробку») і сортує заявки від точки волонтера, а не в порядку бекенду.
+    """
+    index = peek_application_index(user_id, status)
+    if index is not None:
+        return index
+
+    applications = await fetch()
+    if not isinstance(applications, list):
+        return applications
+
+    index = ApplicationIndex(applications)
+    _lists.setdefault(user_id, {})[status] = (time.monotonic() + APPLICATION_LIST_TTL, index)
+    _lists.move_to_end(user_id)
+    while len(_lists) > APPLICATION_LIST_CACHE_USERS:
+        _lists.popitem(last=False)
+    return index
+
+
+def invalidate_application_lists(user_id: Hashable, shared_status: Optional[str] = None) -> None:
+    """
+    Скидає списки користувача після зміни заявки.
+
+    `shared_status` — статус, що спільний для всіх волонтерів (наприклад,
+    `available` після прийняття заявки): його списки скидаються у всіх.
+    """
+    _lists.pop(user_id, None)
+    if shared_status is not None:
+        for entries in _lists.values():
+            entries.pop(shared_status, None)
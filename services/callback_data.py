@@ -0,0 +1,86 @@
+"""
+Компактні callback_data для інлайн-кнопок.
+
+Кнопка несе дію та до трьох чисел: id, сторінку і фільтр. Рядок
+складається з літери дії, цифри версії формату і base64url без
+вирівнювання від varint-полів (нульові поля в кінці не записуються):
+вибір заявки 1234 — "a10gk", третя сторінка доступних заявок із
+другим фільтром відстані — "l1AAIC". Сталий префікс дії і версії дає
+змогу писати шаблони CallbackQueryHandler через callback_pattern(), а
+кнопки, створені старою версією формату, просто не збігаються з ними.
+Службові кнопки без параметрів ("cancel", "confirm", "prev_page")
+лишаються звичайними рядками. Розібрані значення кешуються: ті самі
+кнопки натискають багато разів.
+"""
+import base64
+import binascii
+import functools
+from typing import NamedTuple, Optional
+
+CALLBACK_VERSION = "1"
+
+# Дії
+APPLICATION = "a"  # заявка: id
+APPLICATION_LIST = "l"  # список заявок волонтера: id — тип списку, page, filter — фільтр відстані (0 — не обрано)
+CATEGORY = "c"  # категорія: id
+DISTANCE = "d"  # фільтр відстані: filter
+USER = "u"  # користувач: id
+
+ACTIONS = frozenset({APPLICATION, APPLICATION_LIST, CATEGORY, DISTANCE, USER})
+
+
+class CallbackData(NamedTuple):
+    action: str
+    id: int = 0
+    page: int = 0
+    filter: int = 0
+
+
+def _varint(value: int, out: bytearray) -> None:
+    if value < 0:
+        raise ValueError(f"callback_data fields must be non-negative, got {value}")
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_callback(action: str, id: int = 0, page: int = 0, filter: int = 0) -> str:
+    """Пакує дію та поля в callback_data (до 64 байтів, як вимагає Telegram)."""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown callback action {action!r}")
+    fields = [int(id), int(page), int(filter)]
+    while fields and not fields[-1]:
+        fields.pop()
+    payload = bytearray()
+    for value in fields:
+        _varint(value, payload)
+    return action + CALLBACK_VERSION + base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+@functools.lru_cache(maxsize=4096)
+def decode_callback(data: Optional[str]) -> Optional[CallbackData]:
+    """Розбирає callback_data; None — чужий рядок, інша версія або пошкоджені дані."""
+    if not data or len(data) < 2 or data[0] not in ACTIONS or data[1] != CALLBACK_VERSION:
+        return None
+    try:
+        body = data[2:]
+        payload = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    fields = []
+    value = shift = 0
+    for byte in payload:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            fields.append(value)
+            value = shift = 0
+    if shift or len(fields) > 3:
+        return None
+    return CallbackData(data[0], *fields)
+
+
+def callback_pattern(action: str) -> str:
+    """Шаблон для CallbackQueryHandler, що збігається з кнопками цієї дії."""
+    return f"^{action}{CALLBACK_VERSION}"
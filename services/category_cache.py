@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from decouple import config
+
+from services.api_client import CLIENT_NAME, CLIENT_PASSWORD, get_categories
+from services.shared_cache import shared_cache_enabled, shared_delete, shared_get, shared_put, shared_version
+
+logger = logging.getLogger(__name__)
+
+# Скільки секунд список категорій вважається свіжим.
+CATEGORY_CACHE_TTL = config("CATEGORY_CACHE_TTL", default=300, cast=int)
+# Скільки секунд після закінчення TTL ще можна віддавати старий список,
+# поки у фоні завантажується новий.
+CATEGORY_CACHE_STALE_TTL = config("CATEGORY_CACHE_STALE_TTL", default=3600, cast=int)
+# Як часто процес перевіряє, чи не оновив список інший воркер.
+CATEGORY_SHARED_CHECK_INTERVAL = config("CATEGORY_SHARED_CHECK_INTERVAL", default=5, cast=float)
+
+SHARED_KEY = "categories"
+
+
+class CategoryTree:
+    """
+    Індекс плоского списку категорій: пошук за id, діти за батьком,
+    глибина та шлях від кореня. Будується один раз на кожне оновлення кешу
+    і спільний для всіх користувачів.
+    """
+
+    def __init__(self, categories: List[dict]):
+        self.categories = categories
+        self.by_id: Dict[int, dict] = {cat["id"]: cat for cat in categories}
+        self._children: Dict[Optional[int], List[dict]] = {}
+        for cat in categories:
+            self._children.setdefault(cat.get("parent_id"), []).append(cat)
+
+        self._paths: Dict[int, List[dict]] = {}
+        for cat in categories:
+            self._paths[cat["id"]] = self._build_path(cat)
+
+    def _build_path(self, cat: dict) -> List[dict]:
+        path = [cat]
+        seen = {cat["id"]}
+        parent = self.by_id.get(cat.get("parent_id"))
+        while parent is not None and parent["id"] not in seen:
+            path.append(parent)
+            seen.add(parent["id"])
+            parent = self.by_id.get(parent.get("parent_id"))
+        path.reverse()
+        return path
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def get(self, category_id: int) -> Optional[dict]:
+        return self.by_id.get(category_id)
+
+    @property
+    def roots(self) -> List[dict]:
+        return self._children.get(None, [])
+
+    def children(self, parent_id: Optional[int]) -> List[dict]:
+        return self._children.get(parent_id, [])
+
+    def depth(self, category_id: int) -> int:
+        """Глибина категорії (0 для кореневої)."""
+        return len(self._paths.get(category_id, [None])) - 1
+
+    def breadcrumb(self, category_id: int, separator: str = " › ") -> str:
+        """Назви категорій від кореня до заданої, наприклад `Їжа › Крупи`."""
+        return separator.join(cat["name"] for cat in self._paths.get(category_id, []))
+
+
+_tree: Optional[CategoryTree] = None
+_loaded_at: float = 0.0
+_generation = 0
+_refresh_task: Optional[asyncio.Task] = None
+# Версія (час запису) спільного кешу, з якої завантажено `_tree`.
+_shared_version: Optional[float] = None
+_shared_checked_at: float = 0.0
+# Видалення спільного запису, яке ще виконується в потоці.
+_shared_delete_task: Optional[asyncio.Task] = None
+
+
+async def _fetch_categories() -> tuple:
+    """
+    Повертає (категорії, вік у секундах, версія спільного кешу).
+
+    Спочатку дивиться в спільний кеш, куди їх міг покласти інший воркер,
+    і лише потім іде на бекенд.
+    """
+    if shared_cache_enabled():
+        if _shared_delete_task is not None:
+            # Не читаємо запис, який саме зараз видаляє invalidate_categories.
+            await asyncio.wait([_shared_delete_task])
+        try:
+            stored = await asyncio.to_thread(shared_get, SHARED_KEY)
+            if stored is not None:
+                age = max(0.0, time.time() - stored[0])
+                if age < CATEGORY_CACHE_TTL:
+                    return stored[1], age, stored[0]
+        except sqlite3.Error as e:
+            logger.warning("Shared category cache unavailable: %s", e)
+
+    categories = await get_categories(CLIENT_NAME, CLIENT_PASSWORD) or []
+    version = None
+    if shared_cache_enabled():
+        try:
+            version = await asyncio.to_thread(shared_put, SHARED_KEY, categories)
+        except sqlite3.Error as e:
+            logger.warning("Could not share category cache: %s", e)
+    return categories, 0.0, version
+
+
+async def _load(generation: int) -> CategoryTree:
+    global _tree, _loaded_at, _shared_version, _shared_checked_at
+    categories, age, version = await _fetch_categories()
+    tree = CategoryTree(categories)
+    if generation == _generation:
+        _tree = tree
+        _loaded_at = time.monotonic() - age
+        _shared_version = version
+        _shared_checked_at = time.monotonic()
+    return tree
+
+
+async def _shared_changed() -> bool:
+    """Чи змінив (або скинув) список категорій інший процес."""
+    global _shared_checked_at
+    if not shared_cache_enabled() or time.monotonic() - _shared_checked_at < CATEGORY_SHARED_CHECK_INTERVAL:
+        return False
+    _shared_checked_at = time.monotonic()
+    try:
+        return await asyncio.to_thread(shared_version, SHARED_KEY) != _shared_version
+    except sqlite3.Error:
+        return False
+
+
+def _start_refresh() -> asyncio.Task:
+    """Запускає завантаження категорій, якщо воно ще не виконується."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_load(_generation))
+        _refresh_task.add_done_callback(_log_refresh_error)
+    return _refresh_task
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Category refresh failed: %s", task.exception())
+
+
+async def get_category_tree() -> CategoryTree:
+    """
+    Повертає дерево категорій з кешу процесу.
+
+    Свіжий кеш віддається без запиту до бекенду. Застарілий (але не старший за
+    `CATEGORY_CACHE_STALE_TTL`) віддається одразу, а оновлення йде у фоні.
+    Дерево спільне для всіх користувачів, тому його не можна змінювати.
+    Якщо інший воркер оновив чи скинув спільний кеш, список перечитується.
+    """
+    if _tree is not None and await _shared_changed():
+        await invalidate_categories(shared=False)
+    if _tree is not None:
+        age = time.monotonic() - _loaded_at
+        if age < CATEGORY_CACHE_TTL:
+            return _tree
+        if age < CATEGORY_CACHE_TTL + CATEGORY_CACHE_STALE_TTL:
+            _start_refresh()
+            return _tree
+
+    return await asyncio.shield(_start_refresh())
+
+
+async def get_cached_categories() -> List[dict]:
+    """Плоский список категорій з кешу (див. `get_category_tree`)."""
+    return (await get_category_tree()).categories
+
+
+async def invalidate_categories(shared: bool = True) -> None:
+    """Скидає кеш після створення, активації чи деактивації категорії."""
+    global _tree, _loaded_at, _generation, _refresh_task, _shared_version, _shared_delete_task
+    # Поколінням позначаємо кеш застарілим ще до очікування на SQLite: результат
+    # запиту, що вже виконується, міг бути отриманий до змін.
+    _generation += 1
+    _tree = None
+    _loaded_at = 0.0
+    _shared_version = None
+    _refresh_task = None
+    if shared and shared_cache_enabled():
+        # DELETE може чекати на блокування запису іншого воркера, тому виконується в потоці;
+        # нові завантаження тим часом чекають на нього (див. `_fetch_categories`).
+        task = _shared_delete_task = asyncio.ensure_future(asyncio.to_thread(shared_delete, SHARED_KEY))
+        task.add_done_callback(_shared_delete_done)
+        try:
+            await asyncio.shield(task)
+        except sqlite3.Error as e:
+            logger.warning("Could not invalidate shared category cache: %s", e)
+
+
+def _shared_delete_done(task: asyncio.Task) -> None:
+    global _shared_delete_task
+    if _shared_delete_task is task:
+        _shared_delete_task = None
+    if not task.cancelled():
+        task.exception()  # помилку вже записав у лог той, хто чекав
+
+
+async def warm_category_cache(application=None) -> None:
+    """Завантажує категорії під час старту, щоб перші меню не чекали на бекенд."""
+    try:
+        tree = await get_category_tree()
+        logger.info("Category cache warmed: %d categories", len(tree))
+    except Exception as e:
+        logger.warning("Could not warm category cache: %s", e)
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from decouple import config
+
+from services.http_session import get_session
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_GEOCODING_API_KEY = config("GOOGLE_GEOCODING_API_KEY")
+GEOCODING_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+# Кількість знаків після коми для ключа кешу: 4 знаки ≈ 11 м.
+GEOCODE_PRECISION = config("GEOCODE_PRECISION", default=4, cast=int)
+GEOCODE_CACHE_SIZE = config("GEOCODE_CACHE_SIZE", default=2048, cast=int)
+GEOCODE_CACHE_TTL = config("GEOCODE_CACHE_TTL", default=30 * 24 * 3600, cast=int)
+# Скільки пам'ятати, що за координатами адреси немає (помилки запиту не кешуються).
+GEOCODE_NEGATIVE_TTL = config("GEOCODE_NEGATIVE_TTL", default=600, cast=int)
+# Порожнє значення вимикає кеш на диску.
+GEOCODE_CACHE_PATH = config("GEOCODE_CACHE_PATH", default="geocode_cache.sqlite3")
+
+ADDRESS_NOT_FOUND = "Адресу не вдалося знайти 😔"
+
+CacheKey = Tuple[float, float]
+
+_memory: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+_pending: Dict[CacheKey, asyncio.Future] = {}
+# Фонові запити, запущені щойно користувач надіслав локацію: власник -> (ключ, задача).
+_prefetched: Dict[object, Tuple[CacheKey, asyncio.Task]] = {}
+
+_db: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+
+def cache_key(latitude: float, longitude: float) -> CacheKey:
+    """Округлює координати, щоб сусідні точки мали спільний запис у кеші."""
+    return round(float(latitude), GEOCODE_PRECISION), round(float(longitude), GEOCODE_PRECISION)
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _db
+    if _db is None and GEOCODE_CACHE_PATH:
+        directory = os.path.dirname(GEOCODE_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _db = sqlite3.connect(GEOCODE_CACHE_PATH, check_same_thread=False)
+        # Кеш спільний для всіх воркерів супервізора.
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " lat REAL NOT NULL, lon REAL NOT NULL, address TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, PRIMARY KEY (lat, lon))"
+        )
+        _db.commit()
+    return _db
+
+
+def _disk_get(key: CacheKey) -> Optional[Tuple[float, str]]:
+    with _db_lock:
+        db = _connect()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT expires_at, address FROM geocode WHERE lat = ? AND lon = ?", key
+        ).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _disk_put(key: CacheKey, expires_at: float, address: str) -> None:
+    with _db_lock:
+        db = _connect()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO geocode (lat, lon, address, expires_at) VALUES (?, ?, ?, ?)",
+            (*key, address, expires_at),
+        )
+        db.execute("DELETE FROM geocode WHERE expires_at < ?", (time.time(),))
+        db.commit()
+
+
+def _memory_get(key: CacheKey) -> Optional[str]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    expires_at, address = entry
+    if expires_at < time.time():
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return address
+
+
+def _memory_put(key: CacheKey, expires_at: float, address: str) -> None:
+    _memory[key] = (expires_at, address)
+    _memory.move_to_end(key)
+    while len(_memory) > GEOCODE_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+async def _fetch(latitude: float, longitude: float) -> Optional[str]:
+    """
+    Запит до Google Geocoding API.
+
+    Повертає адресу, ADDRESS_NOT_FOUND, якщо за координатами нічого немає,
+    або None, якщо запит не вдався (мережа, HTTP-помилка, квота).
+    """
+    params = {"latlng": f"{latitude},{longitude}", "key": GOOGLE_GEOCODING_API_KEY}
+    try:
+        async with get_session().get(GEOCODING_URL, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+    except Exception as e:
+        logger.warning("Geocoding request failed: %s", e)
+        return None
+
+    logger.debug("Geocoding API Response: %s", data)
+    status = data.get("status")
+    if status == "OK" and data.get("results"):
+        return data["results"][0]["formatted_address"]
+    if status in ("OK", "ZERO_RESULTS"):
+        return ADDRESS_NOT_FOUND
+    logger.warning("Geocoding failed with status %s: %s", status, data.get("error_message"))
+    return None
+
+
+async def _resolve(key: CacheKey, latitude: float, longitude: float) -> str:
+    stored = await asyncio.to_thread(_disk_get, key) if GEOCODE_CACHE_PATH else None
+    if stored is not None and stored[0] >= time.time():
+        _memory_put(key, *stored)
+        return stored[1]
+
+    address = await _fetch(latitude, longitude)
+    if address is None:
+        # Помилку не кешуємо: наступний запит із цими координатами спробує ще раз.
+        return ADDRESS_NOT_FOUND
+    expires_at = time.time() + (GEOCODE_NEGATIVE_TTL if address == ADDRESS_NOT_FOUND else GEOCODE_CACHE_TTL)
+    _memory_put(key, expires_at, address)
+    try:
+        await asyncio.to_thread(_disk_put, key, expires_at, address)
+    except sqlite3.Error as e:
+        logger.warning("Could not persist geocoding result: %s", e)
+    return address
+
+
+async def reverse_geocode(latitude: float, longitude: float) -> str:
+    """
+    Перетворює координати в адресу за допомогою Google Maps Geocoding API.
+
+    Результати кешуються за округленими координатами: спочатку в LRU в пам'яті,
+    потім у SQLite на диску. «Адресу не знайдено» кешується на `GEOCODE_NEGATIVE_TTL`;
+    якщо запит не вдався, повертається ADDRESS_NOT_FOUND без кешування.
+    """
+    key = cache_key(latitude, longitude)
+    address = _memory_get(key)
+    if address is not None:
+        return address
+
+    pending = _pending.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_resolve(key, latitude, longitude))
+        _pending[key] = pending
+        pending.add_done_callback(lambda _: _pending.pop(key, None))
+    try:
+        return await asyncio.shield(pending)
+    except sqlite3.Error as e:
+        logger.warning("Geocoding cache unavailable: %s", e)
+        return await _fetch(latitude, longitude) or ADDRESS_NOT_FOUND
+
+
+def prefetch_address(owner, latitude: float, longitude: float) -> None:
+    """
+    Починає геокодування у фоні, щоб адреса була готова до моменту,
+    коли її треба показати. `owner` — ідентифікатор користувача.
+    """
+    key = cache_key(latitude, longitude)
+    previous = _prefetched.get(owner)
+    if previous is not None and previous[0] == key:
+        return
+    discard_prefetched_address(owner)
+
+    task = asyncio.ensure_future(reverse_geocode(latitude, longitude))
+    _prefetched[owner] = (key, task)
+
+    def _done(t: asyncio.Task):
+        # Готовий результат уже лежить у кеші, тримати задачу далі не потрібно.
+        entry = _prefetched.get(owner)
+        if entry is not None and entry[1] is t:
+            del _prefetched[owner]
+        if not t.cancelled():
+            t.exception()
+
+    task.add_done_callback(_done)
+
+
+async def get_prefetched_address(owner, latitude: float, longitude: float) -> str:
+    """Чекає на фоновий запит з `prefetch_address` або бере адресу з кешу."""
+    entry = _prefetched.get(owner)
+    if entry is not None and entry[0] == cache_key(latitude, longitude):
+        return await asyncio.shield(entry[1])
+    return await reverse_geocode(latitude, longitude)
+
+
+def discard_prefetched_address(owner) -> None:
+    """Скасовує фоновий запит користувача, якщо він ще виконується."""
+    entry = _prefetched.pop(owner, None)
+    if entry is not None:
+        entry[1].cancel()
+
+
+def close_geocode_cache(application=None) -> None:
+    """Закриває з'єднання з кешем на диску."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
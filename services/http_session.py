@@ -0,0 +1,52 @@
+import logging
+from typing import Optional
+
+import aiohttp
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_LIMIT = config("HTTP_POOL_LIMIT", default=100, cast=int)
+HTTP_POOL_LIMIT_PER_HOST = config("HTTP_POOL_LIMIT_PER_HOST", default=30, cast=int)
+HTTP_DNS_CACHE_TTL = config("HTTP_DNS_CACHE_TTL", default=300, cast=int)
+HTTP_KEEPALIVE_TIMEOUT = config("HTTP_KEEPALIVE_TIMEOUT", default=30, cast=float)
+HTTP_TIMEOUT = config("HTTP_TIMEOUT", default=30, cast=float)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+    )
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Повертає спільну HTTP-сесію бота (створює її за потреби)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+async def init_http_session(application=None) -> None:
+    """Створює пул з'єднань під час старту Application."""
+    get_session()
+    logger.info("HTTP session pool initialized")
+
+
+async def close_http_session(application=None) -> None:
+    """Закриває пул з'єднань під час зупинки Application."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("HTTP session pool closed")
+    _session = None
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
+
+from decouple import config
+
+from services.update_processing import register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Pillow відпускає GIL під час декодування та кодування, тому пулу потоків
+# достатньо і не треба копіювати мегабайти байтів між процесами.
+IMAGE_WORKERS = config("IMAGE_WORKERS", default=min(4, os.cpu_count() or 1), cast=int)
+IMAGE_COMPRESS_TIMEOUT = config("IMAGE_COMPRESS_TIMEOUT", default=20, cast=float)
+
+IMAGE_MAX_EDGE = config("IMAGE_MAX_EDGE", default=2560, cast=int)
+IMAGE_TARGET_BYTES = config("IMAGE_TARGET_BYTES", default=1024 * 1024, cast=int)
+# JPEG, менші за цей розмір, не перекодовуються.
+IMAGE_SKIP_BYTES = config("IMAGE_SKIP_BYTES", default=512 * 1024, cast=int)
+IMAGE_MIN_QUALITY = config("IMAGE_MIN_QUALITY", default=30, cast=int)
+IMAGE_MAX_QUALITY = config("IMAGE_MAX_QUALITY", default=85, cast=int)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_stats = {"waiting": 0, "running": 0, "completed": 0, "failed": 0, "timeouts": 0}
+
+
+def _encode_jpeg(image, quality: int) -> bytes:
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _to_rgb(image):
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+def _compress_image(source, original_size: int) -> Optional[bytes]:
+    """
+    Стискання фото перед відправкою.
+
+    Зменшує зображення до `IMAGE_MAX_EDGE` по довшій стороні (для JPEG — ще під
+    час декодування через `draft`), повертає за EXIF-орієнтацією і підбирає
+    найвищу якість progressive JPEG, що вкладається в `IMAGE_TARGET_BYTES`.
+    Повертає None для невеликих JPEG, не-зображень та файлів, які не вдалося
+    зменшити, — їх треба відправити без змін.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(source)
+        source_format = image.format
+        width, height = image.size
+        if (source_format == "JPEG" and original_size <= IMAGE_SKIP_BYTES
+                and max(width, height) <= IMAGE_MAX_EDGE):
+            return None
+
+        image.draft("RGB", (IMAGE_MAX_EDGE, IMAGE_MAX_EDGE))
+        image = ImageOps.exif_transpose(image)
+        image = _to_rgb(image)
+        image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS, reducing_gap=3.0)
+
+        low, high = IMAGE_MIN_QUALITY, IMAGE_MAX_QUALITY
+        best = _encode_jpeg(image, low)
+        if len(best) <= IMAGE_TARGET_BYTES:
+            while low < high:
+                quality = (low + high + 1) // 2
+                candidate = _encode_jpeg(image, quality)
+                if len(candidate) <= IMAGE_TARGET_BYTES:
+                    best, low = candidate, quality
+                else:
+                    high = quality - 1
+    except Exception:
+        return None
+
+    if len(best) >= original_size:
+        return None
+    logger.info(
+        "Compressed %s %dx%d -> %dx%d q=%d: %d -> %d bytes (saved %d)",
+        source_format, width, height, image.width, image.height, low,
+        original_size, len(best), original_size - len(best),
+    )
+    return best
+
+
+def compress_path(path: str) -> Optional[str]:
+    """
+    Стискає фото з диска в окремий файл поруч з оригіналом.
+
+    Оригінал не змінюється: повертається шлях до стиснутої копії або None,
+    якщо стискати не варто. Замінити оригінал копією має той, хто викликав.
+    """
+    compressed = _compress_image(path, os.path.getsize(path))
+    if compressed is None:
+        return None
+    output_path = f"{path}.compressed"
+    with open(output_path, "wb") as f:
+        f.write(compressed)
+    return output_path
+
+
+def _discard_output(output_path: Optional[str]) -> None:
+    if output_path is not None:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _slots
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+        _slots = asyncio.Semaphore(IMAGE_WORKERS)
+        register_gauge("image_compression", compression_stats)
+    return _executor
+
+
+def compression_stats() -> dict:
+    """Поточна черга та лічильники стискання (показник `image_compression` у метриках)."""
+    return dict(_stats)
+
+
+async def _run_in_pool(func, argument, fallback, discard=None):
+    """
+    Виконує `func(argument)` у пулі потоків, не блокуючи цикл подій бота.
+
+    Одночасно виконується не більше `IMAGE_WORKERS` завдань, решта чекає в черзі.
+    Якщо робота не вклалася в `IMAGE_COMPRESS_TIMEOUT`, повертається `fallback`,
+    а запізнілий результат потоку передається в `discard`.
+    """
+    executor = _get_executor()
+    slots = _slots
+    loop = asyncio.get_running_loop()
+
+    _stats["waiting"] += 1
+    if _stats["waiting"] > 1:
+        logger.info("Image compression queue depth: %d", _stats["waiting"])
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+
+    _stats["running"] += 1
+    future = loop.run_in_executor(executor, func, argument)
+
+    def _release(f: asyncio.Future):
+        # Слот звільняється лише коли потік справді завершив роботу,
+        # навіть якщо той, хто чекав, уже відмовився через тайм-аут.
+        _stats["running"] -= 1
+        slots.release()
+        if f.cancelled() or f.exception() is not None:
+            _stats["failed"] += 1
+        else:
+            _stats["completed"] += 1
+
+    future.add_done_callback(_release)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), IMAGE_COMPRESS_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        if discard is not None:
+            def _discard_late(f: asyncio.Future):
+                if not f.cancelled() and f.exception() is None:
+                    discard(f.result())
+
+            future.add_done_callback(_discard_late)
+        logger.warning("Image compression timed out after %ss, sending original file", IMAGE_COMPRESS_TIMEOUT)
+        return fallback
+
+
+async def compress_path_async(path: str) -> Optional[str]:
+    """
+    Асинхронна обгортка над `compress_path` (див. `_run_in_pool`).
+
+    Після тайм-ауту повертає None, а стиснута копія, записана потоком
+    пізніше, видаляється — оригінал тим часом уже може відправлятися.
+    """
+    return await _run_in_pool(compress_path, path, None, discard=_discard_output)
+
+
+def shutdown_image_pool(application=None) -> None:
+    """Зупиняє пул потоків стискання під час зупинки бота."""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _slots = None
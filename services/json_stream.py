@@ -0,0 +1,93 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, List, Tuple
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r"[\s,]*")
+_WHITESPACE = " \t\r\n"
+# Після скількох розібраних символів відкидати оброблений початок буфера.
+_COMPACT_AFTER = 64 * 1024
+
+
+def _parse_items(buffer: str, pos: int, final: bool) -> Tuple[List[Any], int, bool]:
+    """
+    Розбирає всі повні елементи масиву, що вже є в буфері.
+
+    Повертає (елементи, нова позиція, чи досягнуто `]`).
+    """
+    items = []
+    size = len(buffer)
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos >= size:
+            return items, pos, False
+        if buffer[pos] == "]":
+            return items, pos + 1, True
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if final:
+                raise
+            return items, pos, False
+        # Число або літерал міг обірватися на межі частин (`12` з `123`, `1.5` з `1.5e3`),
+        # тому приймаємо його лише коли вже видно роздільник.
+        if (not final and buffer[end - 1] not in '}]"'
+                and (end == size or buffer[end] not in _WHITESPACE + ",]")):
+            return items, pos, False
+        items.append(item)
+        pos = end
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Розбирає JSON-масив частинами, віддаючи елементи в міру надходження байтів.
+
+    У пам'яті тримається лише нерозібраний залишок відповіді, а не весь текст.
+    Якщо споживач зупиниться, решта відповіді не читається. Відповідь-об'єкт
+    з полем `items` (обгортка пагінації) розбирається повністю, і
+    віддаються її елементи; інший об'єкт спричиняє ValueError.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    final = False
+    iterator = chunks.__aiter__()
+
+    while not final:
+        try:
+            text = text_decoder.decode(await iterator.__anext__())
+            if pos > _COMPACT_AFTER:
+                buffer, pos = buffer[pos:], 0
+            buffer += text
+        except StopAsyncIteration:
+            buffer += text_decoder.decode(b"", final=True)
+            final = True
+
+        if not started:
+            stripped = buffer.lstrip()
+            if not stripped and not final:
+                continue
+            if not stripped.startswith("["):
+                parts = [buffer]
+                async for chunk in iterator:
+                    parts.append(text_decoder.decode(chunk))
+                parts.append(text_decoder.decode(b"", final=True))
+                text = "".join(parts)
+                document = json.loads(text) if text.strip() else None
+                if isinstance(document, dict) and isinstance(document.get("items"), list):
+                    for item in document["items"]:
+                        yield item
+                    return
+                raise ValueError(f"Expected a JSON array, got {type(document).__name__}")
+            pos = len(buffer) - len(stripped) + 1
+            started = True
+
+        items, pos, closed = _parse_items(buffer, pos, final)
+        for item in items:
+            yield item
+        if closed:
+            return
+
+    raise ValueError("Unexpected end of JSON array")
@@ -0,0 +1,134 @@
+"""
+Готові reply-клавіатури бота.
+
+Усі постійні клавіатури створюються один раз під час імпорту, а хендлери
+передають ті самі об'єкти в reply_markup. PTB перетворює розмітку на
+словник через to_dict() перед кожним запитом, тому PrebuiltKeyboard
+обчислює цей словник одразу і надалі повертає його без обходу кнопок.
+"""
+from typing import Any, Dict, Optional, Sequence, Union
+
+from telegram import KeyboardButton, ReplyKeyboardMarkup
+
+
+class PrebuiltKeyboard(ReplyKeyboardMarkup):
+    """Незмінна ReplyKeyboardMarkup з кешованим to_dict()."""
+
+    __slots__ = ("_wire",)
+
+    def __init__(self, *rows: Sequence[Union[str, KeyboardButton]], one_time_keyboard: bool = True):
+        super().__init__(
+            [[button if isinstance(button, KeyboardButton) else KeyboardButton(button) for button in row]
+             for row in rows],
+            resize_keyboard=True,
+            one_time_keyboard=one_time_keyboard,
+        )
+        with self._unfrozen():
+            self._wire = super().to_dict()
+
+    def to_dict(self, recursive: bool = True) -> Dict[str, Any]:
+        # Словник спільний для всіх запитів — PTB лише серіалізує його в JSON.
+        return self._wire if recursive else super().to_dict(recursive=False)
+
+
+# Стартові меню
+START_KEYBOARD = PrebuiltKeyboard(["Стати волонтером", "Стати бенефіціаром"], one_time_keyboard=False)
+MODERATOR_START_KEYBOARD = PrebuiltKeyboard(
+    ["Стати волонтером", "Стати бенефіціаром"],
+    ["Авторизація модератора"],
+    one_time_keyboard=False,
+)
+LOGIN_KEYBOARD = PrebuiltKeyboard(["Зареєструватися", "Авторизація"], ["Авторизація модератора"])
+
+# Головні меню ролей
+VOLUNTEER_MENU = PrebuiltKeyboard(
+    ["Список завдань"],
+    ["Прийняти заявку в обробку"],
+    ["Закрити заявку"],
+    ["Скасувати заявку"],
+    ["Редагувати профіль"],
+    ["Деактивувати профіль волонтера"],
+    ["Вихід"],
+    one_time_keyboard=False,
+)
+BENEFICIARY_MENU = PrebuiltKeyboard(
+    ["Деактивувати профіль бенефіціара"],
+    ["Подати заявку"],
+    ["Підтвердити заявку"],
+    ["Деактивувати заявку"],
+    ["Переглянути мої заявки"],
+    ["Вихід"],
+    one_time_keyboard=False,
+)
+MODERATOR_MENU = PrebuiltKeyboard(
+    ["Додати категорію"],
+    ["Видалити категорію"],
+    ["Видалити заявку"],
+    ["Перевірити користувача"],
+    ["Вихід"],
+    one_time_keyboard=False,
+)
+MAIN_MENUS = {1: BENEFICIARY_MENU, 2: VOLUNTEER_MENU}
+
+# Авторизація
+ROLE_CHOICE_KEYBOARD = PrebuiltKeyboard(["Бенефіціар", "Волонтер"], ["Скасувати авторизацію"])
+CANCEL_AUTH_KEYBOARD = PrebuiltKeyboard(["Скасувати авторизацію"])
+
+# Реєстрація
+CANCEL_KEYBOARD = PrebuiltKeyboard(["❌ Скасувати"])
+SHARE_CONTACT_KEYBOARD = PrebuiltKeyboard(
+    [KeyboardButton("📱 Надіслати номер телефону", request_contact=True)],
+    ["❌ Скасувати"],
+)
+DEVICE_KEYBOARD = PrebuiltKeyboard(["📱 Я на телефоні"], ["💻 Я використовую ПК"], ["❌ Скасувати"])
+SHARE_LOCATION_KEYBOARD = PrebuiltKeyboard(
+    [KeyboardButton("📍 Поділитися локацією", request_location=True)],
+    ["❌ Скасувати"],
+)
+CONFIRM_KEYBOARD = PrebuiltKeyboard(["✅ Підтвердити"], ["❌ Скасувати"])
+CONFIRM_OR_EDIT_KEYBOARD = PrebuiltKeyboard(["✅ Підтвердити"], ["✏️ Редагувати"], ["❌ Скасувати"])
+EXECUTE_APPLICATION_KEYBOARD = PrebuiltKeyboard(["🟢 Виконати заявку"], ["❌ Скасувати"])
+CHECK_VOLUNTEER_STATUS_KEYBOARD = PrebuiltKeyboard(["🔍 Перевірити статус волонтера"], ["❌ Скасувати"])
+CHECK_BENEFICIARY_STATUS_KEYBOARD = PrebuiltKeyboard(["🔍 Перевірити статус бенефіціара"], ["❌ Скасувати"])
+
+# Деактивація профілю
+DEACTIVATION_KEYBOARD = PrebuiltKeyboard(["Так, деактивувати мій профіль"], ["Ні, скасувати деактивацію"])
+
+# Подача заявки бенефіціаром
+CANCEL_APPLICATION_KEYBOARD = PrebuiltKeyboard(["❌ Скасувати подачу заявки"], one_time_keyboard=False)
+APPLICATION_DEVICE_KEYBOARD = PrebuiltKeyboard(
+    ["📱 Я на телефоні"], ["💻 Я використовую ПК"], ["❌ Скасувати подачу заявки"])
+APPLICATION_LOCATION_KEYBOARD = PrebuiltKeyboard(
+    [KeyboardButton("📍 Поділитися локацією", request_location=True)],
+    ["❌ Скасувати подачу заявки"],
+    one_time_keyboard=False,
+)
+
+# Редагування профілю волонтера
+EDIT_DEVICE_KEYBOARD = PrebuiltKeyboard(
+    ["📱 Я на телефоні"],
+    ["💻 Я використовую ПК"],
+    ["🚫 Пропустити"],
+    ["❌ Скасувати редагування"],
+    one_time_keyboard=False,
+)
+EDIT_LOCATION_KEYBOARD = PrebuiltKeyboard(
+    [KeyboardButton("📍 Поділитися локацією", request_location=True)],
+    ["❌ Скасувати редагування"],
+)
+CANCEL_EDIT_KEYBOARD = PrebuiltKeyboard(["❌ Скасувати редагування"], one_time_keyboard=False)
+CANCEL_CATEGORIES_KEYBOARD = PrebuiltKeyboard(["Скасувати редагування"])
+YES_NO_KEYBOARD = PrebuiltKeyboard(["✅ Так", "❌ Ні"], one_time_keyboard=False)
+
+# Модератор
+CANCEL_CATEGORY_KEYBOARD = PrebuiltKeyboard(["Скасувати додавання"], one_time_keyboard=False)
+VERIFY_ROLE_KEYBOARD = PrebuiltKeyboard(["Верифікувати волонтерів"], ["Верифікувати бенефіціарів"], ["Скасувати"])
+
+
+def main_menu_keyboard(role_id: Optional[int]) -> PrebuiltKeyboard:
+    """Головне меню ролі; бенефіціарське — для невідомої ролі, як і раніше."""
+    return MAIN_MENUS.get(role_id, BENEFICIARY_MENU)
+
+
+def check_status_keyboard(role_id: Optional[int]) -> PrebuiltKeyboard:
+    return CHECK_VOLUNTEER_STATUS_KEYBOARD if role_id == 2 else CHECK_BENEFICIARY_STATUS_KEYBOARD
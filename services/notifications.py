@@ -0,0 +1,172 @@
+"""
+Сповіщення волонтерів про нові заявки поруч.
+
+Одна повторювана задача JobQueue раз на NOTIFY_POLL_INTERVAL секунд бере
+список доступних заявок одним запитом від службового акаунта волонтера
+(NOTIFY_POLL_TG_ID), знаходить нові заявки і для кожної шукає підписників
+у просторовому індексі підписок. Кожен волонтер отримує одне повідомлення
+з усіма новими заявками в його радіусі та категоріях; повідомлення
+стають у чергу обмежувача швидкості з пріоритетом PRIORITY_BULK, тож
+відповіді користувачам ідуть першими. Службовий акаунт має бачити
+заявки всіх категорій.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from decouple import config
+from telegram import Bot
+from telegram.error import Forbidden, TelegramError
+from telegram.ext import Application, ContextTypes
+
+from services.api_client import CLIENT_NAME, CLIENT_PASSWORD, get_application_records, login_user, refresh_token_log
+from services.rate_limiter import PRIORITY_BULK
+from services.records import ApplicationRecord
+from services.spatial_index import ApplicationIndex
+from services.subscriptions import Subscription, load_subscriptions, unsubscribe
+from services.token_manager import is_token_fresh
+
+logger = logging.getLogger(__name__)
+
+# tg_id службового волонтера, від імені якого опитуються заявки; порожнє — сповіщення вимкнено.
+NOTIFY_POLL_TG_ID = config("NOTIFY_POLL_TG_ID", default="")
+NOTIFY_POLL_INTERVAL = config("NOTIFY_POLL_INTERVAL", default=60, cast=float)
+NOTIFY_DEFAULT_RADIUS = config("NOTIFY_DEFAULT_RADIUS", default=10, cast=float)
+NOTIFY_MAX_RADIUS = config("NOTIFY_MAX_RADIUS", default=50, cast=float)
+# Скільки повідомлень розсилки одночасно чекають у черзі обмежувача.
+NOTIFY_SEND_CONCURRENCY = config("NOTIFY_SEND_CONCURRENCY", default=10, cast=int)
+# Скільки заявок показувати в одному повідомленні.
+NOTIFY_MAX_ITEMS = config("NOTIFY_MAX_ITEMS", default=5, cast=int)
+
+JOB_NAME = "notify_new_applications"
+
+# Токени службового акаунта.
+_poller: Dict[str, Optional[str]] = {"access_token": None, "refresh_token": None}
+# id доступних заявок з попереднього опитування; None — ще не опитували.
+_seen_ids: Optional[Set[int]] = None
+
+
+async def _poller_token() -> str:
+    access_token = _poller["access_token"]
+    if is_token_fresh(access_token):
+        return access_token
+    if _poller["refresh_token"]:
+        try:
+            tokens = await refresh_token_log(_poller["refresh_token"])
+            _poller["access_token"] = tokens["access_token"]
+            _poller["refresh_token"] = tokens.get("refresh_token", _poller["refresh_token"])
+            return _poller["access_token"]
+        except Exception as e:
+            logger.info("Poller token refresh failed, logging in again: %s", e)
+    tokens = await login_user({
+        "tg_id": str(NOTIFY_POLL_TG_ID),
+        "role_id": 2,
+        "client": CLIENT_NAME,
+        "password": CLIENT_PASSWORD,
+    })
+    _poller["access_token"] = tokens["access_token"]
+    _poller["refresh_token"] = tokens.get("refresh_token")
+    return _poller["access_token"]
+
+
+Matches = Dict[Subscription, List[Tuple[float, ApplicationRecord]]]
+
+
+def match_subscribers(applications: Iterable[ApplicationRecord], subscriptions: List[Subscription]) -> Matches:
+    """
+    Розподіляє заявки між підписниками: підписка -> [(відстань, заявка)], від найближчої.
+
+    Для кожної заявки індекс підписок повертає волонтерів у межах
+    найбільшого радіуса, після чого перевіряється власний радіус і
+    категорії кожного. Заявки без координат пропускаються.
+    """
+    index = ApplicationIndex(subscriptions)
+    max_radius = max((s.radius_km for s in subscriptions), default=0)
+    matches: Matches = defaultdict(list)
+    for application in applications:
+        if application.latitude is None or application.longitude is None:
+            continue
+        origin = (application.latitude, application.longitude)
+        for distance, subscription in index.nearest(origin, max_radius):
+            if distance <= subscription.radius_km and subscription.wants(application.category_id):
+                matches[subscription].append((distance, application))
+    for found in matches.values():
+        found.sort(key=lambda match: (match[0], match[1].id))
+    return matches
+
+
+def format_notification(found: List[Tuple[float, ApplicationRecord]]) -> str:
+    lines = ["🔔 Нові заявки поруч з вами:", ""]
+    for distance, application in found[:NOTIFY_MAX_ITEMS]:
+        lines.append(f"🆔 {application.id} | 📍 {distance:.1f} км | 📝 {application.description}")
+    if len(found) > NOTIFY_MAX_ITEMS:
+        lines.append(f"…і ще {len(found) - NOTIFY_MAX_ITEMS}")
+    lines += ["", "Щоб узяти заявку, натисніть «Прийняти заявку в обробку»."]
+    return "\n".join(lines)
+
+
+async def send_notifications(bot: Bot, matches: Matches, concurrency: int = NOTIFY_SEND_CONCURRENCY) -> int:
+    """
+    Надсилає по одному повідомленню на підписника; повертає кількість надісланих.
+
+    Темп задає обмежувач швидкості бота (PRIORITY_BULK), а `concurrency`
+    лише обмежує, скільки повідомлень одночасно чекають у його черзі.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def notify(subscription: Subscription, found) -> bool:
+        async with slots:
+            try:
+                await bot.send_message(chat_id=subscription.chat_id, text=format_notification(found),
+                                       rate_limit_args=PRIORITY_BULK)
+                return True
+            except Forbidden:
+                # Користувач заблокував бота — розсилка йому більше не потрібна.
+                await asyncio.to_thread(unsubscribe, subscription.id)
+            except TelegramError as e:
+                logger.warning("Failed to notify chat %s: %s", subscription.chat_id, e)
+            return False
+
+    results = await asyncio.gather(*(notify(s, found) for s, found in matches.items()))
+    return sum(results)
+
+
+async def poll_new_applications(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: одне опитування бекенду і розсилка за всіма підписками."""
+    global _seen_ids
+    try:
+        token = await _poller_token()
+        applications = await get_application_records(token, "available")
+    except Exception as e:
+        logger.warning("Polling applications for notifications failed: %s", e)
+        return
+    if not isinstance(applications, list):
+        logger.warning("Polling applications for notifications failed: %s", applications)
+        return
+
+    current = {application.id for application in applications}
+    if _seen_ids is None:
+        # Після запуску лише запам'ятовуємо наявні заявки, щоб не розсилати їх повторно.
+        _seen_ids = current
+        return
+    new = [application for application in applications if application.id not in _seen_ids]
+    _seen_ids = current
+    if not new:
+        return
+
+    subscriptions = await asyncio.to_thread(load_subscriptions)
+    matches = match_subscribers(new, subscriptions)
+    sent = await send_notifications(context.bot, matches)
+    logger.info("Notified %d volunteers about %d new applications", sent, len(new))
+
+
+def schedule_notifications(application: Application) -> None:
+    """Реєструє задачу опитування, якщо сповіщення налаштовані."""
+    if not NOTIFY_POLL_TG_ID:
+        return
+    if application.job_queue is None:
+        logger.warning("NOTIFY_POLL_TG_ID is set, but JobQueue is unavailable (install APScheduler)")
+        return
+    application.job_queue.run_repeating(
+        poll_new_applications, interval=NOTIFY_POLL_INTERVAL, first=0, name=JOB_NAME)
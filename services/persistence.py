@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from decouple import config
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+from telegram.ext._utils.types import ConversationDict
+
+logger = logging.getLogger(__name__)
+
+# sqlite (за замовчуванням) або pickle — стандартний PicklePersistence з PTB.
+PERSISTENCE_BACKEND = config("PERSISTENCE_BACKEND", default="sqlite")
+PERSISTENCE_PATH = config(
+    "PERSISTENCE_PATH", default="bot_state.pickle" if PERSISTENCE_BACKEND == "pickle" else "bot_state.sqlite3"
+)
+# Як часто (у секундах) Application скидає змінені дані у сховище.
+PERSISTENCE_UPDATE_INTERVAL = config("PERSISTENCE_UPDATE_INTERVAL", default=30, cast=float)
+
+ConversationKey = Tuple[int, ...]
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Зберігає user_data та стани ConversationHandler у SQLite.
+
+    Кожен користувач і кожна розмова — окремий рядок, тому записуються лише
+    змінені дані, а всі зміни одного проходу Application йдуть однією транзакцією.
+    user_data не читається цілком під час старту: дані користувача
+    підвантажуються з бази при першому його оновленні (`refresh_user_data`).
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = PERSISTENCE_UPDATE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._loaded_users: Set[int] = set()
+        self._pending_users: Dict[int, Optional[bytes]] = {}
+        self._pending_conversations: Dict[Tuple[str, str], Optional[bytes]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # --- sqlite ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " name TEXT NOT NULL, key TEXT NOT NULL, state BLOB NOT NULL,"
+                " PRIMARY KEY (name, key))"
+            )
+            self._db.commit()
+        return self._db
+
+    def _fetch_user(self, user_id: int) -> Optional[bytes]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT data FROM user_data WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _fetch_conversations(self, name: str) -> ConversationDict:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT key, state FROM conversations WHERE name = ?", (name,)
+            ).fetchall()
+        return {tuple(int(part) for part in key.split(",")): pickle.loads(state) for key, state in rows}
+
+    def _write(self, users: Dict[int, Optional[bytes]], conversations: Dict[Tuple[str, str], Optional[bytes]]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                    [(user_id, data) for user_id, data in users.items() if data is not None],
+                )
+                db.executemany(
+                    "DELETE FROM user_data WHERE user_id = ?",
+                    [(user_id,) for user_id, data in users.items() if data is None],
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                    [(name, key, state) for (name, key), state in conversations.items() if state is not None],
+                )
+                db.executemany(
+                    "DELETE FROM conversations WHERE name = ? AND key = ?",
+                    [(name, key) for (name, key), state in conversations.items() if state is None],
+                )
+
+    # --- пакетний запис ---
+
+    def _schedule_flush(self) -> None:
+        # Application викликає update_* для всіх змінених користувачів одночасно,
+        # тож запис, відкладений на наступну ітерацію циклу, збирає їх в одну транзакцію.
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_pending())
+
+    async def _flush_pending(self) -> None:
+        await asyncio.sleep(0)
+        users, self._pending_users = self._pending_users, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        if not users and not conversations:
+            return
+        try:
+            await asyncio.to_thread(self._write, users, conversations)
+            logger.debug("Persisted %d users, %d conversation states", len(users), len(conversations))
+        except sqlite3.Error:
+            logger.exception("Failed to persist bot state")
+            # Повертаємо незаписане, щоб спробувати ще раз наступного проходу.
+            self._pending_users = {**users, **self._pending_users}
+            self._pending_conversations = {**conversations, **self._pending_conversations}
+
+    # --- user_data ---
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        if user_id in self._pending_users:
+            return
+        data = await asyncio.to_thread(self._fetch_user, user_id)
+        if data is not None:
+            stored = pickle.loads(data)
+            # Значення, встановлені вже в цьому процесі, новіші за збережені.
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._loaded_users.add(user_id)
+        self._pending_users[user_id] = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded_users.discard(user_id)
+        self._pending_users[user_id] = None
+        self._schedule_flush()
+
+    # --- conversations ---
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        return await asyncio.to_thread(self._fetch_conversations, name)
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: Optional[object]) -> None:
+        # Стани зберігаються через pickle: деякі розмови використовують `range(1)` як стан.
+        state = None if new_state is None else pickle.dumps(new_state, protocol=pickle.HIGHEST_PROTOCOL)
+        self._pending_conversations[(name, ",".join(str(part) for part in key))] = state
+        self._schedule_flush()
+
+    # --- не використовується ---
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._flush_pending()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def build_persistence() -> BasePersistence:
+    """Створює сховище стану бота відповідно до `PERSISTENCE_BACKEND`."""
+    if PERSISTENCE_BACKEND == "pickle":
+        return PicklePersistence(
+            PERSISTENCE_PATH,
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=PERSISTENCE_UPDATE_INTERVAL,
+        )
+    if PERSISTENCE_BACKEND != "sqlite":
+        raise ValueError(f"Unknown PERSISTENCE_BACKEND: {PERSISTENCE_BACKEND}")
+    return SQLitePersistence()
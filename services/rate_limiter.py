@@ -0,0 +1,263 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import math
+import time
+from typing import Any, Callable, Coroutine, Dict, Hashable, List, Optional, Union
+
+from decouple import config
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from services.update_processing import record_timing, register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Загальний ліміт Telegram — близько 30 повідомлень на секунду.
+RATE_LIMIT_GLOBAL = config("RATE_LIMIT_GLOBAL", default=30, cast=float)
+# Особистий чат: не більше одного повідомлення на секунду з невеликим запасом.
+RATE_LIMIT_CHAT = config("RATE_LIMIT_CHAT", default=1, cast=float)
+RATE_LIMIT_CHAT_BURST = config("RATE_LIMIT_CHAT_BURST", default=3, cast=int)
+# Групи й канали: 20 повідомлень на хвилину.
+RATE_LIMIT_GROUP_PER_MINUTE = config("RATE_LIMIT_GROUP_PER_MINUTE", default=20, cast=float)
+# Скільки разів повторювати запит після RetryAfter.
+RATE_LIMIT_MAX_RETRIES = config("RATE_LIMIT_MAX_RETRIES", default=1, cast=int)
+
+# Пріоритети (rate_limit_args): відповіді користувачам ідуть раніше за розсилки.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+_LANES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+# Редагування одного повідомлення, що ще чекають у черзі, замінюються останнім.
+COALESCED_ENDPOINTS = frozenset({"editMessageText", "editMessageReplyMarkup", "editMessageCaption"})
+# Після скількох відер чатів прибирати ті, що вже повністю відновилися.
+_PRUNE_BUCKETS_AFTER = 4096
+
+JSONResult = Union[bool, Dict[str, Any], List[Dict[str, Any]]]
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def ready_in(self, now: float) -> float:
+        """Через скільки секунд з'явиться токен (0 — вже є)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class _Request:
+    __slots__ = ("priority", "seq", "chat_id", "edit_key", "enqueued", "granted", "result")
+
+    def __init__(self, priority: int, seq: int, chat_id: Hashable, edit_key: Optional[tuple],
+                 result: Optional[asyncio.Future] = None):
+        loop = asyncio.get_running_loop()
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.edit_key = edit_key
+        self.enqueued = time.monotonic()
+        # None — можна надсилати; інший _Request — цей запит замінено новішим редагуванням.
+        self.granted: asyncio.Future = loop.create_future()
+        if result is None:
+            result = loop.create_future()
+            result.add_done_callback(_consume)
+        # Остаточний результат виклику (спільний для повторних спроб після RetryAfter).
+        self.result: asyncio.Future = result
+
+    def __lt__(self, other: "_Request") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _consume(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()  # результат забирають ті, хто чекав; прибираємо попередження asyncio
+
+
+class PriorityRateLimiter(BaseRateLimiter[int]):
+    """
+    Черга вихідних запитів до Bot API з обмеженням швидкості.
+
+    Запити з `chat_id` проходять через загальне відро токенів і відро
+    свого чату; запити без чату (answerCallbackQuery, getMe) не
+    обмежуються. Серед готових до відправки першими йдуть запити з
+    меншим пріоритетом (`rate_limit_args`, за замовчуванням
+    PRIORITY_INTERACTIVE), тож розсилки не затримують відповіді. Кілька
+    редагувань одного повідомлення, що ще чекають у черзі, зливаються в
+    останнє. Після RetryAfter відправка зупиняється на вказаний час, і
+    запит повторюється до RATE_LIMIT_MAX_RETRIES разів.
+    """
+
+    def __init__(self, global_rate: float = RATE_LIMIT_GLOBAL, chat_rate: float = RATE_LIMIT_CHAT,
+                 chat_burst: int = RATE_LIMIT_CHAT_BURST, group_per_minute: float = RATE_LIMIT_GROUP_PER_MINUTE,
+                 max_retries: int = RATE_LIMIT_MAX_RETRIES):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.max_retries = max_retries
+        self._global: Optional[_Bucket] = None
+        self._chats: Dict[Hashable, _Bucket] = {}
+        self._queue: List[_Request] = []
+        self._edits: Dict[tuple, _Request] = {}
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.retry_after_count = 0
+
+    async def initialize(self) -> None:
+        # Application і Updater ініціалізують того самого бота двічі.
+        if self._dispatcher is not None:
+            return
+        self._global = _Bucket(self.global_rate, max(self.global_rate, 1))
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        register_gauge("outbound_queue", self.queue_depth)
+        register_gauge("outbound_retry_after", lambda: self.retry_after_count)
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        # Запити, що лишилися, відправляються без обмеження, щоб ніхто не чекав вічно.
+        for request in self._queue:
+            if not request.granted.done():
+                request.granted.set_result(None)
+        self._queue.clear()
+        self._edits.clear()
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {lane: 0 for lane in _LANES.values()}
+        for request in self._queue:
+            depth[_LANES.get(request.priority, "bulk")] += 1
+        return depth
+
+    def _chat_bucket(self, chat_id: Hashable) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > _PRUNE_BUCKETS_AFTER:
+                now = time.monotonic()
+                waiting = {request.chat_id for request in self._queue}
+                for key in [k for k, b in self._chats.items()
+                            if k not in waiting and b.ready_in(now) == 0 and b.tokens >= b.capacity]:
+                    del self._chats[key]
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self._chats[chat_id] = (
+                _Bucket(self.group_rate, 1) if group else _Bucket(self.chat_rate, self.chat_burst))
+        return bucket
+
+    def _enqueue(self, priority: int, chat_id: Hashable, edit_key: Optional[tuple],
+                 result: Optional[asyncio.Future] = None) -> _Request:
+        previous = self._edits.get(edit_key) if edit_key is not None else None
+        if previous is not None and not previous.granted.done():
+            # Нове редагування займає місце попереднього в черзі, а попереднє чекає на його результат.
+            self._queue.remove(previous)
+            request = _Request(min(priority, previous.priority), previous.seq, chat_id, edit_key, result)
+            request.enqueued = previous.enqueued
+            previous.granted.set_result(request)
+        else:
+            request = _Request(priority, next(self._seq), chat_id, edit_key, result)
+        bisect.insort(self._queue, request)
+        if edit_key is not None:
+            self._edits[edit_key] = request
+        self._wakeup.set()
+        return request
+
+    def _grant(self, request: _Request) -> None:
+        if self._edits.get(request.edit_key) is request:
+            del self._edits[request.edit_key]
+        request.granted.set_result(None)
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = math.inf
+            if self._queue:
+                now = time.monotonic()
+                delay = max(self._paused_until - now, self._global.ready_in(now))
+                if delay <= 0:
+                    delay = math.inf
+                    for i, request in enumerate(self._queue):
+                        bucket = self._chat_bucket(request.chat_id)
+                        wait = bucket.ready_in(now)
+                        if wait <= 0:
+                            del self._queue[i]
+                            self._global.take()
+                            bucket.take()
+                            self._grant(request)
+                            delay = 0
+                            break
+                        delay = min(delay, wait)
+            if delay <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if delay == math.inf else delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, request: _Request, callback, args, kwargs) -> JSONResult:
+        try:
+            successor = await request.granted
+        except asyncio.CancelledError:
+            if request in self._queue:
+                self._queue.remove(request)
+                if self._edits.get(request.edit_key) is request:
+                    del self._edits[request.edit_key]
+            raise
+        if successor is not None:
+            # Замінено новішим редагуванням того самого повідомлення.
+            return await asyncio.shield(successor.result)
+        record_timing("outbound_wait", _LANES.get(request.priority, "bulk"), time.monotonic() - request.enqueued)
+        return await callback(*args, **kwargs)
+
+    async def process_request(
+            self,
+            callback: Callable[..., Coroutine[Any, Any, JSONResult]],
+            args: Any,
+            kwargs: Dict[str, Any],
+            endpoint: str,
+            data: Dict[str, Any],
+            rate_limit_args: Optional[int],
+    ) -> JSONResult:
+        chat_id = data.get("chat_id")
+        if chat_id is None or self._dispatcher is None:
+            return await callback(*args, **kwargs)
+
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else PRIORITY_INTERACTIVE
+        edit_key = (endpoint, chat_id, data.get("message_id")) if endpoint in COALESCED_ENDPOINTS else None
+        # Спільний для всіх спроб результат: на нього чекають замінені редагування.
+        result: Optional[asyncio.Future] = None
+        for attempt in itertools.count():
+            request = self._enqueue(priority, chat_id, edit_key, result)
+            result = request.result
+            try:
+                outcome = await self._send(request, callback, args, kwargs)
+            except RetryAfter as e:
+                # Повторює лише той, хто сам надсилав запит.
+                if request.granted.result() is None and attempt < self.max_retries:
+                    self.retry_after_count += 1
+                    logger.warning("Flood limit on %s, pausing outbound requests for %ss", endpoint, e.retry_after)
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after + 0.1)
+                    self._wakeup.set()
+                    continue
+                result.set_exception(e)
+                raise
+            except asyncio.CancelledError:
+                result.cancel()
+                raise
+            except Exception as e:
+                result.set_exception(e)
+                raise
+            result.set_result(outcome)
+            return outcome
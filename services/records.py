@@ -0,0 +1,72 @@
+from itertools import zip_longest
+from typing import Any, List, Optional
+
+
+class ApplicationRecord:
+    """
+    Компактний запис заявки для списків і клавіатур.
+
+    Зберігає лише поля, які показує бот, і координати заявки без вкладених
+    словників creator, location тощо. Списки таких записів лежать у user_data і кеші
+    процесу, тому `__slots__` помітно зменшує пам'ять на користувача.
+    """
+
+    __slots__ = ("id", "description", "distance", "active_to", "status", "creator_name", "creator_phone",
+                 "latitude", "longitude", "category_id")
+
+    def __init__(self, id: int, description: str = "", distance: Optional[float] = None,
+                 active_to: Optional[str] = None, status: Optional[str] = None,
+                 creator_name: Optional[str] = None, creator_phone: Optional[str] = None,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None,
+                 category_id: Optional[int] = None):
+        self.id = id
+        self.description = description
+        self.distance = distance
+        self.active_to = active_to
+        self.status = status
+        self.creator_name = creator_name
+        self.creator_phone = creator_phone
+        self.latitude = latitude
+        self.longitude = longitude
+        self.category_id = category_id
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ApplicationRecord":
+        creator = data.get("creator") or {}
+        location = data.get("location") or {}
+        return cls(
+            id=data["id"],
+            description=data.get("description", "Немає опису"),
+            distance=data.get("distance"),
+            active_to=data.get("active_to"),
+            status=data.get("status"),
+            creator_name=creator.get("first_name"),
+            creator_phone=creator.get("phone_num"),
+            latitude=location.get("latitude"),
+            longitude=location.get("longitude"),
+            category_id=data.get("category_id") or (data.get("category") or {}).get("id"),
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # Записи, збережені до появи нових полів, отримують для них None.
+        for name, value in zip_longest(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        return f"ApplicationRecord(id={self.id!r}, distance={self.distance!r}, status={self.status!r})"
+
+
+def to_records(body: Any) -> Any:
+    """Перетворює список заявок з API на записи; відповіді з помилкою повертає як є."""
+    if isinstance(body, list):
+        return [ApplicationRecord.from_dict(item) for item in body]
+    return body
+
+
+def find_record(records: List[ApplicationRecord], application_id) -> Optional[ApplicationRecord]:
+    """Пошук запису за id (id з callback_data приходить рядком)."""
+    application_id = str(application_id)
+    return next((record for record in records if str(record.id) == application_id), None)
@@ -0,0 +1,271 @@
+"""
+Таблиця маршрутизації оновлень.
+
+PTB перебирає обробники групи по черзі й для кожного викликає
+check_update, тож натискання кнопки «Список завдань» проходить крізь
+усі ConversationHandler і регулярні вирази, зареєстровані раніше.
+DispatchTable один раз розбирає обробники групи: точні тексти кнопок
+(`^...$`), команди й callback_data потрапляють у словники, префікси
+(`^...` без `$`) — у словник префіксів. Для кожного оновлення
+check_update викликається лише для обробників, знайдених у таблиці,
+розмов, що вже тривають для цього чату, і тих, чий фільтр не вдалося
+розібрати (довільний текст, геолокація, складні шаблони) — у
+початковому порядку, тож перший збіг лишається тим самим.
+"""
+import logging
+import re
+from collections.abc import Mapping
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+from telegram import Update
+from telegram.ext import Application, BaseHandler, CallbackQueryHandler, CommandHandler, ConversationHandler, \
+    MessageHandler, filters
+
+logger = logging.getLogger(__name__)
+
+# Маршрут обробника: (точні значення, префікси); шаблон — перевіряється завжди; None — збігається з будь-чим.
+Routes = Union[Tuple[FrozenSet[str], FrozenSet[str]], re.Pattern, None]
+NEVER: Routes = (frozenset(), frozenset())
+
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+
+def _pattern_routes(pattern: re.Pattern) -> Routes:
+    """Розбирає `^текст$`, `^(а|б)$` і `^префікс`; інші шаблони повертає як є."""
+    source = pattern.pattern
+    if not isinstance(source, str) or pattern.flags & ~re.UNICODE or not source.startswith("^"):
+        return pattern
+    body = source[1:]
+    exact = body.endswith("$") and not body.endswith("\\$")
+    if exact:
+        body = body[:-1]
+    if body.startswith("(") and body.endswith(")"):
+        body = body[3:-1] if body.startswith("(?:") else body[1:-1]
+        alternatives = body.split("|")
+    else:
+        alternatives = [body]
+    if any(not alternative or _REGEX_META.intersection(alternative) for alternative in alternatives):
+        return pattern
+    return (frozenset(alternatives), frozenset()) if exact else (frozenset(), frozenset(alternatives))
+
+
+def _filter_routes(message_filter: filters.BaseFilter) -> Routes:
+    if isinstance(message_filter, filters.Regex):
+        return _pattern_routes(message_filter.pattern)
+    base = getattr(message_filter, "base_filter", None)
+    if base is None:
+        return None
+    and_filter = getattr(message_filter, "and_filter", None)
+    or_filter = getattr(message_filter, "or_filter", None)
+    if and_filter is not None:
+        # Для «і» досить маршрутів однієї зі сторін: вони ширші за спільний збіг.
+        left = _filter_routes(base)
+        return left if isinstance(left, tuple) else _filter_routes(and_filter)
+    if or_filter is not None:
+        return _merge(_filter_routes(base), _filter_routes(or_filter))
+    return None
+
+
+def _handler_routes(handler: BaseHandler) -> Tuple[Routes, Routes, Routes]:
+    """Маршрути обробника для (тексту, команди, callback_data)."""
+    if isinstance(handler, MessageHandler):
+        return _filter_routes(handler.filters), NEVER, NEVER
+    if isinstance(handler, CommandHandler):
+        return NEVER, (frozenset(handler.commands), frozenset()), NEVER
+    if isinstance(handler, CallbackQueryHandler):
+        if handler.game_pattern is not None or handler.pattern is None:
+            return NEVER, NEVER, None
+        if isinstance(handler.pattern, str):
+            return NEVER, NEVER, _pattern_routes(re.compile(handler.pattern))
+        if isinstance(handler.pattern, re.Pattern):
+            return NEVER, NEVER, _pattern_routes(handler.pattern)
+        return NEVER, NEVER, None
+    if isinstance(handler, ConversationHandler):
+        # Поки розмова не почалася, обробник реагує лише на точки входу.
+        merged = [NEVER, NEVER, NEVER]
+        for entry_point in handler.entry_points:
+            for i, routes in enumerate(_handler_routes(entry_point)):
+                merged[i] = _merge(merged[i], routes)
+        return merged[0], merged[1], merged[2]
+    return None, None, None
+
+
+def _merge(left: Routes, right: Routes) -> Routes:
+    if left is None or right is None:
+        return None
+    if isinstance(left, re.Pattern):
+        return left
+    if isinstance(right, re.Pattern):
+        return right
+    return left[0] | right[0], left[1] | right[1]
+
+
+def _describe(handler: BaseHandler) -> str:
+    if isinstance(handler, ConversationHandler):
+        return f"conversation {handler.name}"
+    callback = getattr(handler, "callback", None)
+    return f"{type(handler).__name__}({getattr(callback, '__qualname__', callback)})"
+
+
+class _Index:
+    """Словник точних значень і префіксів -> позиції обробників."""
+
+    __slots__ = ("exact", "prefixes", "lengths", "fallback", "patterns")
+
+    def __init__(self):
+        self.exact: Dict[str, List[int]] = {}
+        self.prefixes: Dict[str, List[int]] = {}
+        self.lengths: List[int] = []
+        # Обробники, які перевіряються для будь-якого значення.
+        self.fallback: List[int] = []
+        self.patterns: List[Tuple[int, re.Pattern]] = []
+
+    def add(self, position: int, routes: Routes) -> None:
+        if isinstance(routes, tuple):
+            for value in routes[0]:
+                self.exact.setdefault(value, []).append(position)
+            for prefix in routes[1]:
+                self.prefixes.setdefault(prefix, []).append(position)
+            self.lengths = sorted({len(prefix) for prefix in self.prefixes})
+            return
+        self.fallback.append(position)
+        if routes is not None:
+            self.patterns.append((position, routes))
+
+    def lookup(self, value: Optional[str]) -> List[int]:
+        if value is None:
+            return self.fallback
+        # `$` у регулярному виразі допускає один кінцевий перенос рядка.
+        found = self.exact.get(value[:-1] if value.endswith("\n") else value, [])
+        for length in self.lengths:
+            if length > len(value):
+                break
+            found = found + self.prefixes.get(value[:length], [])
+        return found + self.fallback if self.fallback else found
+
+    def claims(self, value: str) -> List[int]:
+        """Усі обробники, що можуть прийняти значення (для перевірки конфліктів)."""
+        positions = set(self.exact.get(value, []))
+        positions.update(p for prefix, found in self.prefixes.items() if value.startswith(prefix) for p in found)
+        positions.update(p for p, pattern in self.patterns if pattern.search(value))
+        return sorted(positions)
+
+
+def _command(text: str) -> Optional[str]:
+    parts = text[1:].split(None, 1) if text.startswith("/") else None
+    return parts[0].split("@", 1)[0].lower() if parts else None
+
+
+def _conversation_key(handler: ConversationHandler, update: Update) -> Optional[tuple]:
+    try:
+        return handler._get_key(update)  # pylint: disable=protected-access
+    except RuntimeError:
+        return None
+
+
+def _tracks_conversations(handler: ConversationHandler) -> bool:
+    # Ключ і стани розмов ConversationHandler зберігає в приватних полях
+    # (requirements.txt фіксує PTB 21.7); для збережених розмов initialize
+    # підміняє словник на TrackingDict. Якщо в іншій версії полів немає,
+    # таблиця перевіряє всі обробники, як це робить сам PTB.
+    return callable(getattr(handler, "_get_key", None)) and isinstance(getattr(handler, "_conversations", None), Mapping)
+
+
+async def _delegated(update: object, context) -> None:
+    """Колбек DispatchTable ніколи не викликається: handle_update передає оновлення обраному обробнику."""
+
+
+class DispatchTable(BaseHandler):
+    """
+    Один обробник замість групи: знаходить кандидатів за таблицею і
+    передає оновлення першому з них, чий check_update спрацював.
+    """
+
+    __slots__ = ("handlers", "texts", "commands", "callbacks", "conversations")
+
+    def __init__(self, handlers: Sequence[BaseHandler]):
+        # BaseHandler вимагає колбек, хоча handle_update його не використовує.
+        super().__init__(_delegated)
+        self.handlers = list(handlers)
+        self.texts, self.commands, self.callbacks = _Index(), _Index(), _Index()
+        # Розмови, згруповані за налаштуваннями ключа (per_chat, per_user, per_message);
+        # None — стан розмов недоступний, і перевіряються всі обробники.
+        self.conversations: Optional[Dict[tuple, List[int]]] = {}
+        for position, handler in enumerate(self.handlers):
+            text_routes, command_routes, callback_routes = _handler_routes(handler)
+            self.texts.add(position, text_routes)
+            self.commands.add(position, command_routes)
+            self.callbacks.add(position, callback_routes)
+            if isinstance(handler, ConversationHandler):
+                if not _tracks_conversations(handler):
+                    logger.warning("Routing disabled: %s does not expose conversation state", _describe(handler))
+                    self.conversations = None
+                if self.conversations is None:
+                    continue
+                key_kind = (handler.per_chat, handler.per_user, handler.per_message)
+                self.conversations.setdefault(key_kind, []).append(position)
+        logger.info("Routing %d handlers: %d texts, %d prefixes, %d commands, %d callbacks, %d fallbacks",
+                    len(self.handlers), len(self.texts.exact), len(self.texts.prefixes) + len(self.callbacks.prefixes),
+                    len(self.commands.exact), len(self.callbacks.exact),
+                    len(set(self.texts.fallback) | set(self.callbacks.fallback)))
+        self.warn_collisions()
+
+    def warn_collisions(self) -> None:
+        """Пише в лог значення, на які претендує кілька обробників: спрацює лише перший."""
+        for kind, index in (("text", self.texts), ("command", self.commands), ("callback_data", self.callbacks)):
+            for value in index.exact:
+                positions = index.claims(value)
+                if len(positions) > 1:
+                    logger.warning("Routing collision: %s %r is claimed by %s; only %s will receive it",
+                                   kind, value, ", ".join(_describe(self.handlers[p]) for p in positions),
+                                   _describe(self.handlers[positions[0]]))
+
+    def candidates(self, update: object) -> Sequence[int]:
+        if self.conversations is None or not isinstance(update, Update):
+            return range(len(self.handlers))
+        if update.callback_query is not None:
+            found = self.callbacks.lookup(update.callback_query.data)
+        elif update.effective_message is not None:
+            text = update.effective_message.text
+            found = self.texts.lookup(text)
+            command = _command(text) if text else None
+            if command is not None:
+                found = found + self.commands.lookup(command)
+        else:
+            return range(len(self.handlers))
+        active = []
+        for positions in self.conversations.values():
+            key = _conversation_key(self.handlers[positions[0]], update)
+            if key is not None:
+                active += [p for p in positions if key in self.handlers[p]._conversations]
+        return sorted(set(found).union(active)) if active or len(found) > 1 else found
+
+    def check_update(self, update: object):
+        for position in self.candidates(update):
+            handler = self.handlers[position]
+            check = handler.check_update(update)
+            if check is not None and check is not False:
+                return handler, check
+        return None
+
+    async def handle_update(self, update, application, check_result, context):
+        handler, check = check_result
+        coroutine = handler.handle_update(update, application, check, context)
+        if handler.block is False:
+            application.create_task(coroutine, update=update, name=f"DispatchTable:non_blocking:{handler}")
+            return None
+        return await coroutine
+
+
+def route_updates(application: Application, group: int = 0) -> None:
+    """
+    Замінює обробники групи на DispatchTable.
+
+    Викликається з post_init: Application.initialize відновлює стани
+    збережених розмов лише для ConversationHandler, видимих у
+    application.handlers, тому таблиця з'являється вже після цього.
+    """
+    handlers = application.handlers.get(group)
+    if not handlers or isinstance(handlers[0], DispatchTable):
+        return
+    application.handlers[group] = [DispatchTable(handlers)]
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+# Локальне сховище, спільне для всіх процесів бота на одній машині
+# (воркери супервізора). Порожнє значення вимикає його.
+SHARED_CACHE_PATH = config("SHARED_CACHE_PATH", default="shared_cache.sqlite3")
+SHARED_CACHE_BUSY_TIMEOUT = config("SHARED_CACHE_BUSY_TIMEOUT", default=1.0, cast=float)
+
+_db: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+
+def shared_cache_enabled() -> bool:
+    return bool(SHARED_CACHE_PATH)
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _db
+    if _db is None and SHARED_CACHE_PATH:
+        directory = os.path.dirname(SHARED_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _db = sqlite3.connect(SHARED_CACHE_PATH, timeout=SHARED_CACHE_BUSY_TIMEOUT, check_same_thread=False)
+        # WAL дозволяє іншим процесам читати, поки один пише.
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        _db.commit()
+    return _db
+
+
+def shared_get(key: str) -> Optional[Tuple[float, Any]]:
+    """Повертає (час запису, значення) або None."""
+    with _db_lock:
+        db = _connect()
+        if db is None:
+            return None
+        row = db.execute("SELECT updated_at, value FROM cache WHERE key = ?", (key,)).fetchone()
+    return (row[0], json.loads(row[1])) if row else None
+
+
+def shared_version(key: str) -> Optional[float]:
+    """Час останнього запису ключа — дешевий спосіб дізнатися, чи змінилося значення."""
+    with _db_lock:
+        db = _connect()
+        if db is None:
+            return None
+        row = db.execute("SELECT updated_at FROM cache WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def shared_put(key: str, value: Any) -> float:
+    updated_at = time.time()
+    with _db_lock:
+        db = _connect()
+        if db is not None:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), updated_at),
+            )
+            db.commit()
+    return updated_at
+
+
+def shared_delete(key: str) -> None:
+    with _db_lock:
+        db = _connect()
+        if db is not None:
+            db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            db.commit()
+
+
+def close_shared_cache(application=None) -> None:
+    """Закриває з'єднання зі спільним кешем."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
@@ -0,0 +1,144 @@
+import bisect
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from decouple import config
+
+from services.records import ApplicationRecord
+
+# Розмір комірки сітки в кілометрах: запит перебирає лише комірки, що
+# перетинають квадрат навколо точки волонтера.
+SPATIAL_CELL_KM = config("SPATIAL_CELL_KM", default=5.0, cast=float)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+Origin = Tuple[float, float]
+Match = Tuple[Optional[float], ApplicationRecord]
+# Точка на одиничній сфері та заявка: порівняння хорд не потребує тригонометрії.
+Placed = Tuple[float, float, float, ApplicationRecord]
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def volunteer_origin(user_data: dict) -> Optional[Origin]:
+    """Координати волонтера, якщо бот їх знає (після реєстрації або редагування профілю)."""
+    for key in ("edit_location", "location"):
+        location = user_data.get(key) or {}
+        latitude, longitude = location.get("latitude"), location.get("longitude")
+        if isinstance(latitude, (int, float)) and isinstance(longitude, (int, float)):
+            return float(latitude), float(longitude)
+    return None
+
+
+class ApplicationIndex:
+    """
+    Індекс заявок для запитів «у радіусі N км, найближчі першими».
+
+    Якщо відома точка волонтера, заявки з координатами шукаються в сітці
+    комірок по SPATIAL_CELL_KM, а відстань рахується локально. Інакше
+    використовується відстань, яку повернув бекенд: заявки відсортовані
+    за нею, і радіус відсікається бінарним пошуком. Заявки, відстань до яких
+    невідома, потрапляють у результат лише без обмеження радіуса.
+    """
+
+    def __init__(self, records: Iterable[ApplicationRecord], cell_km: float = SPATIAL_CELL_KM):
+        self.records: List[ApplicationRecord] = list(records)
+        self._cell = cell_km / KM_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], List[Placed]] = defaultdict(list)
+        self._unplaced: List[ApplicationRecord] = []
+        for record in self.records:
+            if record.latitude is None or record.longitude is None:
+                self._unplaced.append(record)
+            else:
+                self._cells[self._cell_of(record.latitude, record.longitude)].append(
+                    (*_unit_vector(record.latitude, record.longitude), record))
+
+        known = sorted((r for r in self.records if r.distance is not None), key=lambda r: (r.distance, r.id))
+        self._by_distance = known
+        self._distances = [r.distance for r in known]
+        self._no_distance = sorted((r for r in self.records if r.distance is None), key=lambda r: r.id)
+        # Останній запит: гортання сторінок повторює його з тими самими параметрами.
+        self._last: Optional[Tuple[Tuple[Optional[Origin], Optional[float]], List[Match]]] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self._cell), math.floor(longitude / self._cell)
+
+    def nearest(self, origin: Optional[Origin] = None, radius_km: Optional[float] = None) -> List[Match]:
+        """
+        Пари (відстань, заявка) у радіусі `radius_km`, від найближчої.
+
+        `radius_km=None` — без обмеження; невідома відстань тоді None і йде в кінці.
+        Список спільний для повторних запитів, тому його не можна змінювати.
+        """
+        key = (origin, radius_km)
+        if self._last is not None and self._last[0] == key:
+            return self._last[1]
+        if origin is None:
+            matches = self._nearest_by_backend(radius_km)
+        else:
+            matches = self._nearest_by_grid(origin, radius_km)
+        self._last = (key, matches)
+        return matches
+
+    def _nearest_by_backend(self, radius_km: Optional[float]) -> List[Match]:
+        end = len(self._by_distance) if radius_km is None else bisect.bisect_right(self._distances, radius_km)
+        matches = [(r.distance, r) for r in self._by_distance[:end]]
+        if radius_km is None:
+            matches.extend((None, r) for r in self._no_distance)
+        return matches
+
+    def _candidates(self, origin: Origin, radius_km: Optional[float]) -> Iterable[Placed]:
+        if radius_km is None:
+            return (p for bucket in self._cells.values() for p in bucket)
+        latitude, longitude = origin
+        d_lat = radius_km / KM_PER_DEGREE
+        d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        (row_min, col_min), (row_max, col_max) = (
+            self._cell_of(latitude - d_lat, longitude - d_lon), self._cell_of(latitude + d_lat, longitude + d_lon))
+        cells = (row_max - row_min + 1) * (col_max - col_min + 1)
+        # Для великих радіусів (і біля антимеридіана) дешевше пройти зайняті комірки.
+        if cells > len(self._cells) or longitude - d_lon < -180 or longitude + d_lon > 180:
+            return (p for bucket in self._cells.values() for p in bucket)
+        return (
+            p
+            for row in range(row_min, row_max + 1)
+            for col in range(col_min, col_max + 1)
+            for p in self._cells.get((row, col), ())
+        )
+
+    def _nearest_by_grid(self, origin: Origin, radius_km: Optional[float]) -> List[Match]:
+        x0, y0, z0 = _unit_vector(*origin)
+        # Квадрат хорди, що відповідає дузі radius_km (для радіусів понад півкулю — 4).
+        limit = 4.0 if radius_km is None else (2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+        chords = []
+        for x, y, z, record in self._candidates(origin, radius_km):
+            chord = (x - x0) ** 2 + (y - y0) ** 2 + (z - z0) ** 2
+            if chord <= limit:
+                chords.append((chord, record.id, record))
+        chords.sort()
+        matches = [(2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(c) / 2)), r) for c, _, r in chords]
+        # Для заявок без координат лишається відстань від бекенду.
+        unplaced = [(r.distance, r) for r in self._unplaced
+                    if radius_km is None or (r.distance is not None and r.distance <= radius_km)]
+        if unplaced:
+            matches.extend(unplaced)
+            matches.sort(key=lambda match: (math.inf if match[0] is None else match[0], match[1].id))
+        return matches
+
+
+def parse_radius(text: Optional[str]) -> Optional[float]:
+    """Радіус у км з тексту на кшталт `до 5 км` або `7,5`; None, якщо числа немає."""
+    match = re.search(r"\d+(?:[.,]\d+)?", text or "")
+    if match is None:
+        return None
+    radius = float(match.group().replace(",", "."))
+    return radius if radius > 0 else None
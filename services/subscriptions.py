@@ -0,0 +1,114 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import FrozenSet, List, Optional
+
+from decouple import config
+
+# Підписки волонтерів на сповіщення про нові заявки поруч. Файл спільний
+# для всіх процесів бота, щоб розсилку міг робити будь-який із них.
+SUBSCRIPTIONS_PATH = config("SUBSCRIPTIONS_PATH", default="subscriptions.sqlite3")
+
+_db: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    Підписка волонтера: точка, радіус і категорії (None — усі категорії).
+
+    Має ті самі поля id/latitude/longitude/distance, що й ApplicationRecord,
+    тому підписки індексуються тим самим ApplicationIndex.
+    """
+
+    __slots__ = ("id", "chat_id", "latitude", "longitude", "radius_km", "categories", "distance")
+
+    def __init__(self, id: int, chat_id: int, latitude: float, longitude: float, radius_km: float,
+                 categories: Optional[FrozenSet[int]] = None):
+        self.id = id
+        self.chat_id = chat_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km
+        self.categories = categories
+        self.distance = None
+
+    def wants(self, category_id: Optional[int]) -> bool:
+        return not self.categories or category_id is None or category_id in self.categories
+
+    def __repr__(self) -> str:
+        return f"Subscription(id={self.id!r}, radius_km={self.radius_km!r})"
+
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        directory = os.path.dirname(SUBSCRIPTIONS_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _db = sqlite3.connect(SUBSCRIPTIONS_PATH, timeout=5, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " tg_id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL,"
+            " latitude REAL NOT NULL, longitude REAL NOT NULL, radius_km REAL NOT NULL,"
+            " categories TEXT)"
+        )
+        _db.commit()
+    return _db
+
+
+def _from_row(row) -> Subscription:
+    tg_id, chat_id, latitude, longitude, radius_km, categories = row
+    return Subscription(tg_id, chat_id, latitude, longitude, radius_km,
+                        frozenset(json.loads(categories)) if categories else None)
+
+
+def subscribe(subscription: Subscription) -> None:
+    """Додає або оновлює підписку."""
+    categories = json.dumps(sorted(subscription.categories)) if subscription.categories else None
+    with _db_lock:
+        db = _connect()
+        db.execute(
+            "INSERT OR REPLACE INTO subscriptions (tg_id, chat_id, latitude, longitude, radius_km, categories)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (subscription.id, subscription.chat_id, subscription.latitude, subscription.longitude,
+             subscription.radius_km, categories),
+        )
+        db.commit()
+
+
+def unsubscribe(tg_id: int) -> bool:
+    """Видаляє підписку; повертає, чи вона була."""
+    with _db_lock:
+        db = _connect()
+        deleted = db.execute("DELETE FROM subscriptions WHERE tg_id = ?", (tg_id,)).rowcount
+        db.commit()
+    return deleted > 0
+
+
+def get_subscription(tg_id: int) -> Optional[Subscription]:
+    with _db_lock:
+        row = _connect().execute(
+            "SELECT tg_id, chat_id, latitude, longitude, radius_km, categories FROM subscriptions WHERE tg_id = ?",
+            (tg_id,),
+        ).fetchone()
+    return _from_row(row) if row else None
+
+
+def load_subscriptions() -> List[Subscription]:
+    with _db_lock:
+        rows = _connect().execute(
+            "SELECT tg_id, chat_id, latitude, longitude, radius_km, categories FROM subscriptions"
+        ).fetchall()
+    return [_from_row(row) for row in rows]
+
+
+def close_subscriptions(application=None) -> None:
+    """Закриває з'єднання зі сховищем підписок."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
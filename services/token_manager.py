@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from decouple import config
+from jwt import JWT
+from telegram.ext import ContextTypes
+
+from services.api_client import UnauthorizedError, refresh_moderator_token, refresh_token_log
+from services.keyboards import MODERATOR_START_KEYBOARD, START_KEYBOARD
+
+logger = logging.getLogger(__name__)
+
+# За скільки секунд до закінчення `exp` токен вважається простроченим.
+TOKEN_REFRESH_MARGIN = config("TOKEN_REFRESH_MARGIN", default=60, cast=int)
+
+T = TypeVar("T")
+
+
+_jwt = JWT()
+# Поточні запити оновлення токенів, по одному на користувача (tg_id).
+_refresh_flights: Dict[object, asyncio.Future] = {}
+
+
+def token_expires_at(token: Optional[str]) -> Optional[float]:
+    """Повертає `exp` з JWT (без перевірки підпису) або None, якщо його не вдалося прочитати."""
+    if not token:
+        return None
+    try:
+        claims = _jwt.decode(token, do_verify=False, do_time_check=False)
+    except Exception:
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    try:
+        return float(exp) if exp is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_token_fresh(token: Optional[str], margin: int = TOKEN_REFRESH_MARGIN) -> bool:
+    """Чи можна ще використовувати токен. Токен без `exp` вважаємо простроченим."""
+    expires_at = token_expires_at(token)
+    return expires_at is not None and expires_at - margin > time.time()
+
+
+def _user_key(context: ContextTypes.DEFAULT_TYPE) -> object:
+    user_id = getattr(context, "_user_id", None)
+    return user_id if user_id is not None else id(context.user_data)
+
+
+def _chat_id(context: ContextTypes.DEFAULT_TYPE):
+    return context.user_data.get("chat_id") or getattr(context, "_chat_id", None)
+
+
+async def reset_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Повертає користувача до початкового меню.
+    """
+    for key in ("user_id", "access_token", "refresh_token"):
+        context.user_data.pop(key, None)
+
+    await context.bot.send_message(
+        chat_id=_chat_id(context),
+        text="Термін дії вашого сеансу закінчився. Повертаємось до головного меню.",
+        reply_markup=START_KEYBOARD
+    )
+
+
+async def reset_moderator_to_start_menu(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Повертає модератора до початкового меню.
+    """
+    for key in ("moderator_user_id", "access_token", "refresh_token"):
+        context.user_data.pop(key, None)
+
+    await context.bot.send_message(
+        chat_id=_chat_id(context),
+        text="Термін дії вашого сеансу модератора закінчився. Повертаємось до головного меню.",
+        reply_markup=MODERATOR_START_KEYBOARD
+    )
+
+
+async def _refresh_tokens(user_data: dict, refresh: Callable[[str], Awaitable[dict]]) -> str:
+    refresh_token = user_data["refresh_token"]
+    tokens = await refresh(refresh_token)
+    user_data["access_token"] = tokens["access_token"]
+    user_data["refresh_token"] = tokens.get("refresh_token", refresh_token)
+    return user_data["access_token"]
+
+
+def _start_refresh(key, user_data: dict, refresh: Callable[[str], Awaitable[dict]]) -> asyncio.Future:
+    """Запускає оновлення токенів для користувача, якщо воно ще не виконується."""
+    flight = _refresh_flights.get(key)
+    if flight is not None:
+        return flight
+
+    flight = asyncio.ensure_future(_refresh_tokens(user_data, refresh))
+    _refresh_flights[key] = flight
+
+    def _done(f: asyncio.Future):
+        if _refresh_flights.get(key) is f:
+            del _refresh_flights[key]
+        if not f.cancelled():
+            f.exception()  # результат уже отримали ті, хто чекав; прибираємо попередження asyncio
+
+    flight.add_done_callback(_done)
+    return flight
+
+
+async def _ensure_token(context, refresh: Callable[[str], Awaitable[dict]],
+                        on_expired: Callable, missing_message: str, failed_message: str,
+                        force_refresh: bool) -> str:
+    user_data = context.user_data
+    access_token = user_data.get("access_token")
+    if not force_refresh and is_token_fresh(access_token):
+        return access_token
+
+    if not user_data.get("refresh_token"):
+        await on_expired(context)
+        raise Exception(missing_message)
+
+    # Усі одночасні виклики для одного користувача чекають на один і той самий запит
+    # оновлення: інакше кожен з них надсилав би старий refresh token і перезаписував
+    # ротований токен, отриманий іншим викликом.
+    key = _user_key(context)
+    owner = key not in _refresh_flights
+    flight = _start_refresh(key, user_data, refresh)
+    try:
+        return await asyncio.shield(flight)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        current = user_data.get("access_token")
+        if current and current != access_token and is_token_fresh(current):
+            # Токен уже оновив інший запит (наприклад, refresh token встиг ротуватися).
+            return current
+        if owner:
+            await on_expired(context)
+        raise Exception(f"{failed_message}: {e}")
+
+
+async def ensure_valid_token(context: ContextTypes.DEFAULT_TYPE, force_refresh: bool = False) -> str:
+    """
+    Повертає дійсний access_token користувача.
+
+    Токен оновлюється лише тоді, коли до закінчення `exp` лишилося менше
+    `TOKEN_REFRESH_MARGIN` секунд (або якщо `force_refresh`).
+    """
+    return await _ensure_token(
+        context, refresh_token_log, reset_to_start_menu,
+        "Refresh token is missing. User needs to reauthenticate.",
+        "Failed to refresh access token",
+        force_refresh,
+    )
+
+
+async def ensure_valid_moderator_token(context: ContextTypes.DEFAULT_TYPE, force_refresh: bool = False) -> str:
+    """Те саме, що `ensure_valid_token`, але для сеансу модератора."""
+    return await _ensure_token(
+        context, refresh_moderator_token, reset_moderator_to_start_menu,
+        "Refresh token for moderator is missing. Moderator needs to reauthenticate.",
+        "Failed to refresh moderator access token",
+        force_refresh,
+    )
+
+
+async def call_with_token(context: ContextTypes.DEFAULT_TYPE, request: Callable[[str], Awaitable[T]],
+                          moderator: bool = False) -> T:
+    """
+    Виконує `request(access_token)` з дійсним токеном.
+
+    Якщо бекенд все ж відповів 401 (токен відкликали раніше `exp`),
+    токен примусово оновлюється і запит повторюється один раз.
+    """
+    ensure = ensure_valid_moderator_token if moderator else ensure_valid_token
+    access_token = await ensure(context)
+    try:
+        return await request(access_token)
+    except UnauthorizedError:
+        logger.info("Access token rejected by backend, refreshing and retrying once")
+        current = context.user_data.get("access_token")
+        if current and current != access_token and is_token_fresh(current):
+            # Паралельний запит уже отримав новий токен.
+            access_token = current
+        else:
+            access_token = await ensure(context, force_refresh=True)
+        return await request(access_token)
@@ -0,0 +1,208 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from decouple import config
+from telegram import Update
+from telegram.ext import Application, BaseHandler, BaseUpdateProcessor, ConversationHandler
+
+logger = logging.getLogger(__name__)
+
+# Скільки оновлень обробляється одночасно (1 — послідовна обробка).
+UPDATE_CONCURRENCY = config("UPDATE_CONCURRENCY", default=16, cast=int)
+# Скільки оновлень може бути взято з черги і чекати на обробку.
+UPDATE_MAX_PENDING = config("UPDATE_MAX_PENDING", default=1000, cast=int)
+UPDATE_METRICS_INTERVAL = config("UPDATE_METRICS_INTERVAL", default=300, cast=float)
+UPDATE_METRICS_SAMPLES = config("UPDATE_METRICS_SAMPLES", default=500, cast=int)
+
+
+class _Timing:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=UPDATE_METRICS_SAMPLES)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 1) if samples else 0.0
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+_timings: Dict[str, Dict[str, _Timing]] = {"queue_wait": {}, "handler": {}, "outbound_wait": {}}
+# Поточні значення (наприклад, глибина черги вихідних запитів), що читаються під час знімка.
+_gauges: Dict[str, Callable[[], Any]] = {}
+_metrics_task: Optional[asyncio.Task] = None
+
+
+def record_timing(kind: str, name: str, seconds: float) -> None:
+    timing = _timings[kind].get(name)
+    if timing is None:
+        timing = _timings[kind][name] = _Timing()
+    timing.add(seconds)
+
+
+def register_gauge(name: str, read: Callable[[], Any]) -> None:
+    _gauges[name] = read
+
+
+def metrics_snapshot() -> dict:
+    """Час очікування в черзі, роботи кожного обробника і відправки відповідей (мс) та поточні значення."""
+    snapshot = {kind: {name: t.summary() for name, t in sorted(items.items())}
+                for kind, items in _timings.items()}
+    snapshot["gauges"] = {name: read() for name, read in sorted(_gauges.items())}
+    return snapshot
+
+
+def _ordering_key(update: object) -> Optional[Hashable]:
+    if isinstance(update, Update):
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+    return None
+
+
+class _UserLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class OrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Паралельна обробка оновлень зі збереженням порядку для кожного користувача.
+
+    Оновлення різних користувачів обробляються одночасно (не більше
+    `concurrency`), а оновлення одного користувача — строго по черзі, тому
+    стани ConversationHandler не переплутуються. Очікування своєї черги
+    користувачем не займає глобальний слот.
+    """
+
+    def __init__(self, concurrency: int = UPDATE_CONCURRENCY, max_pending: int = UPDATE_MAX_PENDING):
+        # Семафор базового класу обмежує кількість взятих з черги оновлень,
+        # а власний `_slots` — кількість тих, що реально виконуються.
+        super().__init__(max(max_pending, concurrency, 2))
+        self.concurrency = concurrency
+        self.pending = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._locks: Dict[Hashable, _UserLock] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        arrived = time.perf_counter()
+        key = _ordering_key(update)
+        user_lock = None
+        if key is not None:
+            # Lock створюється і займається без проміжних await, тому черговість
+            # оновлень користувача збігається з порядком їх надходження.
+            user_lock = self._locks.get(key)
+            if user_lock is None:
+                user_lock = self._locks[key] = _UserLock()
+            user_lock.users += 1
+        self.pending += 1
+        try:
+            if user_lock is not None:
+                await user_lock.lock.acquire()
+            try:
+                async with self._slots:
+                    record_timing("queue_wait", "update", time.perf_counter() - arrived)
+                    await coroutine
+            finally:
+                if user_lock is not None:
+                    user_lock.lock.release()
+        finally:
+            self.pending -= 1
+            if user_lock is not None:
+                user_lock.users -= 1
+                if user_lock.users == 0:
+                    del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+def _handler_name(callback) -> str:
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+def _timed(callback):
+    name = _handler_name(callback)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            record_timing("handler", name, time.perf_counter() - started)
+
+    wrapper._timed = True
+    return wrapper
+
+
+def _instrument(handler: BaseHandler) -> None:
+    if isinstance(handler, ConversationHandler):
+        for child in handler.entry_points + handler.fallbacks:
+            _instrument(child)
+        for handlers in handler.states.values():
+            for child in handlers:
+                _instrument(child)
+        return
+    callback = getattr(handler, "callback", None)
+    if asyncio.iscoroutinefunction(callback) and not getattr(callback, "_timed", False):
+        handler.callback = _timed(callback)
+
+
+def instrument_handlers(application: Application) -> None:
+    """Додає вимірювання часу до колбеків усіх зареєстрованих обробників."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument(handler)
+
+
+async def _log_metrics_forever() -> None:
+    while True:
+        await asyncio.sleep(UPDATE_METRICS_INTERVAL)
+        snapshot = metrics_snapshot()
+        if snapshot["handler"]:
+            logger.info("Update metrics: %s", snapshot)
+
+
+def start_metrics_logging(application: Application = None) -> None:
+    """Періодично пише метрики обробки в лог (кожні `UPDATE_METRICS_INTERVAL` с)."""
+    global _metrics_task
+    if UPDATE_METRICS_INTERVAL > 0 and _metrics_task is None:
+        _metrics_task = asyncio.ensure_future(_log_metrics_forever())
+
+
+def stop_metrics_logging(application: Application = None) -> None:
+    global _metrics_task
+    if _metrics_task is not None:
+        _metrics_task.cancel()
+        _metrics_task = None
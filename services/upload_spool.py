@@ -0,0 +1,57 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import List
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SPOOL_DIR = config("UPLOAD_SPOOL_DIR", default=os.path.join(tempfile.gettempdir(), "tg_bot_uploads"))
+# Скільки байтів файлів один користувач може тримати до закриття заявки.
+UPLOAD_USER_QUOTA = config("UPLOAD_USER_QUOTA", default=25 * 1024 * 1024, cast=int)
+# Файли покинутих розмов видаляються під час старту бота.
+UPLOAD_SPOOL_MAX_AGE = config("UPLOAD_SPOOL_MAX_AGE", default=24 * 3600, cast=int)
+
+
+def user_spool_dir(user_id) -> str:
+    return os.path.join(UPLOAD_SPOOL_DIR, str(user_id))
+
+
+def new_spool_path(user_id, file_name: str) -> str:
+    """Шлях для нового файлу користувача (каталог створюється за потреби)."""
+    directory = user_spool_dir(user_id)
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(file_name or "")[1][:16]
+    return os.path.join(directory, f"{uuid.uuid4().hex}{extension}")
+
+
+def spooled_size(files: List[dict]) -> int:
+    """Сумарний розмір файлів, збережених для користувача."""
+    return sum(item.get("size", 0) for item in files)
+
+
+def fits_quota(files: List[dict], extra_bytes: int) -> bool:
+    return spooled_size(files) + (extra_bytes or 0) <= UPLOAD_USER_QUOTA
+
+
+def remove_spool(user_id) -> None:
+    """Видаляє всі тимчасові файли користувача."""
+    shutil.rmtree(user_spool_dir(user_id), ignore_errors=True)
+
+
+def sweep_spool(application=None) -> None:
+    """Прибирає каталоги, що залишилися від перерваних розмов."""
+    if not os.path.isdir(UPLOAD_SPOOL_DIR):
+        return
+    deadline = time.time() - UPLOAD_SPOOL_MAX_AGE
+    for entry in os.scandir(UPLOAD_SPOOL_DIR):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < deadline:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logger.info("Removed stale upload spool %s", entry.path)
+        except OSError:
+            continue
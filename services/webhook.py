@@ -0,0 +1,194 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+from decouple import config
+from telegram import Bot, Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_LISTEN = config("WEBHOOK_LISTEN", default="0.0.0.0")
+WEBHOOK_PORT = config("WEBHOOK_PORT", default=8443, cast=int)
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/telegram")
+# Публічна адреса, яку бот реєструє через setWebhook. Якщо порожня —
+# вебхук вважається налаштованим зовні (reverse proxy, тестовий стенд).
+WEBHOOK_URL = config("WEBHOOK_URL", default="")
+# Обов'язковий, якщо сервер доступний не лише з localhost: без нього будь-хто
+# може надіслати вигадане оновлення від імені будь-якого користувача.
+WEBHOOK_SECRET_TOKEN = config("WEBHOOK_SECRET_TOKEN", default="")
+# Скільки оновлень може чекати на обробку, перш ніж сервер почне відповідати 503.
+WEBHOOK_QUEUE_SIZE = config("WEBHOOK_QUEUE_SIZE", default=1000, cast=int)
+# Скільки секунд запит чекає на місце в черзі.
+WEBHOOK_ENQUEUE_TIMEOUT = config("WEBHOOK_ENQUEUE_TIMEOUT", default=1.0, cast=float)
+WEBHOOK_MAX_CONNECTIONS = config("WEBHOOK_MAX_CONNECTIONS", default=40, cast=int)
+WEBHOOK_MAX_BODY = config("WEBHOOK_MAX_BODY", default=1024 * 1024, cast=int)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+LOOPBACK_HOSTS = frozenset({"127.0.0.1", "::1", "localhost"})
+
+# Приймає JSON оновлення; повертає False, якщо черга переповнена.
+UpdateSink = Callable[[dict], Awaitable[bool]]
+
+
+def create_webhook_app(sink: UpdateSink, path: str = WEBHOOK_PATH,
+                       secret_token: str = WEBHOOK_SECRET_TOKEN,
+                       health: Optional[Callable[[], dict]] = None) -> web.Application:
+    """
+    HTTP-застосунок, що приймає оновлення від Telegram.
+
+    Перевіряє секретний заголовок, розбирає JSON і передає оновлення в `sink`.
+    Коли `sink` не може прийняти оновлення, відповідає 503 з `Retry-After`:
+    Telegram повторить доставку пізніше, і бот не накопичує необмежену чергу.
+    """
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret_token and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ""), secret_token):
+            logger.warning("Webhook request with invalid secret token from %s", request.remote)
+            return web.Response(status=403)
+        try:
+            data = json.loads(await request.read())
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+        if not isinstance(data, dict) or "update_id" not in data:
+            return web.Response(status=400, text="Not an update")
+
+        if not await sink(data):
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.Response()
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.json_response(health() if health else {"status": "ok"})
+
+    app = web.Application(client_max_size=WEBHOOK_MAX_BODY)
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/healthz", handle_health)
+    return app
+
+
+def application_sink(application: Application,
+                     timeout: float = WEBHOOK_ENQUEUE_TIMEOUT) -> UpdateSink:
+    """
+    Sink, що кладе оновлення в `update_queue` застосунку бота.
+
+    При паралельній обробці Application одразу забирає оновлення з черги,
+    тому до її розміру додаються оновлення, що вже чекають в update processor.
+    """
+    queue = application.update_queue
+
+    def backlog() -> int:
+        return queue.qsize() + getattr(application.update_processor, "pending", 0)
+
+    async def sink(data: dict) -> bool:
+        if queue.maxsize > 0 and backlog() >= queue.maxsize:
+            deadline = time.monotonic() + timeout
+            while backlog() >= queue.maxsize:
+                if time.monotonic() >= deadline:
+                    logger.warning("Update backlog is full (%d), rejecting update %s",
+                                   backlog(), data.get("update_id"))
+                    return False
+                await asyncio.sleep(0.05)
+        await queue.put(Update.de_json(data, application.bot))
+        return True
+
+    return sink
+
+
+def require_secret_token(host: str = WEBHOOK_LISTEN, unix_path: Optional[str] = None,
+                         secret_token: str = WEBHOOK_SECRET_TOKEN) -> None:
+    """Не дає запустити доступний ззовні вебхук без WEBHOOK_SECRET_TOKEN."""
+    if secret_token or unix_path or host in LOOPBACK_HOSTS:
+        return
+    raise RuntimeError(
+        f"WEBHOOK_SECRET_TOKEN must be set when the webhook listens on {host!r}; "
+        "otherwise anyone who can reach the port can forge updates")
+
+
+async def start_site(app: web.Application, host: str = WEBHOOK_LISTEN,
+                     port: int = WEBHOOK_PORT, unix_path: Optional[str] = None) -> web.AppRunner:
+    """Запускає HTTP-сервер на TCP-порту або, якщо задано `unix_path`, на Unix-сокеті."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        await web.UnixSite(runner, unix_path).start()
+        logger.info("Webhook server listening on %s", unix_path)
+    else:
+        await web.TCPSite(runner, host, port).start()
+        logger.info("Webhook server listening on %s:%s", host, port)
+    return runner
+
+
+async def register_webhook(bot: Bot, url: str = WEBHOOK_URL,
+                           path: str = WEBHOOK_PATH,
+                           secret_token: str = WEBHOOK_SECRET_TOKEN) -> None:
+    """Реєструє адресу вебхука в Telegram, якщо задано `WEBHOOK_URL`."""
+    if not url:
+        return
+    await bot.set_webhook(
+        url=url.rstrip("/") + path,
+        secret_token=secret_token or None,
+        allowed_updates=Update.ALL_TYPES,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+    logger.info("Webhook registered at %s%s", url.rstrip("/"), path)
+
+
+def stop_on_signals(stop_event: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+
+async def run_webhook(application: Application, stop_event: Optional[asyncio.Event] = None,
+                      host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT,
+                      unix_path: Optional[str] = None, register: bool = True) -> None:
+    """
+    Запускає бота в режимі вебхука на вбудованому aiohttp-сервері.
+
+    Повторює життєвий цикл `run_polling`: initialize → post_init → start,
+    а при зупинці — stop → post_stop → shutdown → post_shutdown.
+    Воркери супервізора запускаються з `unix_path` і `register=False`.
+    """
+    require_secret_token(host, unix_path)
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        stop_on_signals(stop_event)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if register:
+        await register_webhook(application.bot)
+    await application.start()
+
+    queue = application.update_queue
+    runner = await start_site(
+        create_webhook_app(
+            application_sink(application),
+            health=lambda: {"status": "ok", "queue": queue.qsize(), "queue_size": queue.maxsize,
+                            "pending": getattr(application.update_processor, "pending", 0)},
+        ),
+        host, port, unix_path,
+    )
+    try:
+        await stop_event.wait()
+    finally:
+        await runner.cleanup()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -0,0 +1,192 @@
+"""
+Запуск бота в кількох процесах.
+
+Супервізор приймає вебхук від Telegram і пересилає кожне оновлення одному з
+`SHARD_WORKERS` воркерів, обираючи його консистентним хешем за tg_id
+користувача. Тому user_data, стани розмов і черговість оновлень
+користувача лишаються в одному процесі, а обробка (JSON, Pillow, розмітка)
+розподіляється між ядрами. Воркери — звичайні `main.build_application`
+у режимі вебхука на Unix-сокетах; категорії та геокодування вони
+беруть зі спільних SQLite-кешів.
+
+    python supervisor.py
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from typing import List, Optional
+
+import aiohttp
+from decouple import config
+from telegram import Bot
+
+from main import TELEGRAM_API_URL, TELEGRAM_TOKEN, build_application
+from services.rate_limiter import RATE_LIMIT_GLOBAL
+from services.webhook import (
+    SECRET_HEADER, WEBHOOK_LISTEN, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_QUEUE_SIZE, WEBHOOK_SECRET_TOKEN,
+    create_webhook_app, register_webhook, require_secret_token, run_webhook, start_site, stop_on_signals,
+)
+
+logger = logging.getLogger(__name__)
+
+SHARD_WORKERS = config("SHARD_WORKERS", default=os.cpu_count() or 1, cast=int)
+SHARD_SOCKET_DIR = config("SHARD_SOCKET_DIR", default=os.path.join(tempfile.gettempdir(), "tg_bot_shards"))
+# Кількість віртуальних вузлів на воркер: рівномірніший розподіл користувачів.
+SHARD_VIRTUAL_NODES = config("SHARD_VIRTUAL_NODES", default=64, cast=int)
+SHARD_FORWARD_TIMEOUT = config("SHARD_FORWARD_TIMEOUT", default=10, cast=float)
+SHARD_CHECK_INTERVAL = config("SHARD_CHECK_INTERVAL", default=1.0, cast=float)
+SHARD_START_TIMEOUT = config("SHARD_START_TIMEOUT", default=60, cast=float)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Консистентне хешування: при зміні кількості воркерів переїжджає лише частина користувачів."""
+
+    def __init__(self, nodes: int, virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        points = sorted((_hash(f"{node}:{i}"), node) for node in range(nodes) for i in range(virtual_nodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key) -> int:
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+def update_user_id(data: dict) -> Optional[int]:
+    """tg_id автора оновлення з сирого JSON (без побудови об'єкта Update)."""
+    for key, value in data.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user")
+        if isinstance(user, dict) and "id" in user:
+            return user["id"]
+        chat = value.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return None
+
+
+def worker_socket(index: int) -> str:
+    return os.path.join(SHARD_SOCKET_DIR, f"worker-{index}.sock")
+
+
+def run_worker(index: int, workers: int) -> None:
+    """Точка входу процесу-воркера."""
+    logger.info("Shard worker %d starting (pid %d)", index, os.getpid())
+    # RATE_LIMIT_GLOBAL діє на токен бота, а обмежувач у кожного воркера свій,
+    # тому ліміт ділиться порівну. Ліміти чатів не діляться: чат завжди в одному воркері.
+    # Нові заявки опитує і розсилає лише перший воркер: підписки спільні для всіх.
+    application = build_application(asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE), notifications=index == 0,
+                                    global_rate=RATE_LIMIT_GLOBAL / workers)
+    asyncio.run(run_webhook(application, unix_path=worker_socket(index), register=False))
+
+
+class Supervisor:
+    def __init__(self, workers: int = SHARD_WORKERS):
+        self.workers = workers
+        self.ring = HashRing(workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._sessions: List[aiohttp.ClientSession] = []
+        self._stopping = False
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(target=run_worker, args=(index, self.workers), name=f"shard-{index}")
+        process.start()
+        self._processes[index] = process
+
+    async def _watch(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(SHARD_CHECK_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if not self._stopping and (process is None or not process.is_alive()):
+                    logger.warning("Shard worker %d exited (%s), restarting",
+                                   index, process.exitcode if process else None)
+                    self._spawn(index)
+
+    async def forward(self, data: dict) -> bool:
+        user_id = update_user_id(data)
+        index = self.ring.node_for(user_id if user_id is not None else data["update_id"])
+        headers = {SECRET_HEADER: WEBHOOK_SECRET_TOKEN} if WEBHOOK_SECRET_TOKEN else None
+        try:
+            async with self._sessions[index].post(f"http://shard{WEBHOOK_PATH}", json=data,
+                                                  headers=headers) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Воркер перезапускається: Telegram доставить оновлення повторно.
+            logger.warning("Shard worker %d unavailable: %s", index, e)
+            return False
+
+    async def _wait_ready(self) -> None:
+        """Чекає, поки всі воркери почнуть приймати оновлення."""
+        deadline = asyncio.get_running_loop().time() + SHARD_START_TIMEOUT
+        for index, session in enumerate(self._sessions):
+            while True:
+                try:
+                    async with session.get("http://shard/healthz") as response:
+                        if response.status == 200:
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+                if asyncio.get_running_loop().time() > deadline:
+                    raise RuntimeError(f"Shard worker {index} did not start in {SHARD_START_TIMEOUT}s")
+                await asyncio.sleep(0.1)
+
+    def health(self) -> dict:
+        alive = [bool(p and p.is_alive()) for p in self._processes]
+        return {"status": "ok" if all(alive) else "degraded", "workers": alive}
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None,
+                  host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT) -> None:
+        require_secret_token(host)
+        if stop_event is None:
+            stop_event = asyncio.Event()
+            stop_on_signals(stop_event)
+
+        os.makedirs(SHARD_SOCKET_DIR, exist_ok=True)
+        for index in range(self.workers):
+            self._spawn(index)
+        timeout = aiohttp.ClientTimeout(total=SHARD_FORWARD_TIMEOUT)
+        self._sessions = [
+            aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=worker_socket(i)), timeout=timeout)
+            for i in range(self.workers)
+        ]
+
+        watcher = asyncio.ensure_future(self._watch())
+        runner = None
+        try:
+            await self._wait_ready()
+            runner = await start_site(create_webhook_app(self.forward, health=self.health), host, port)
+            async with Bot(TELEGRAM_TOKEN, base_url=f"{TELEGRAM_API_URL}/bot") as bot:
+                await register_webhook(bot)
+            logger.info("Supervisor routing updates to %d workers", self.workers)
+            await stop_event.wait()
+        finally:
+            self._stopping = True
+            watcher.cancel()
+            if runner is not None:
+                await runner.cleanup()
+            for session in self._sessions:
+                await session.close()
+            for process in self._processes:
+                if process is not None and process.is_alive():
+                    process.terminate()
+            for process in self._processes:
+                if process is not None:
+                    await asyncio.to_thread(process.join, 30)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Supervisor().run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import tempfile
+
+_state_dir = tempfile.mkdtemp(prefix="tg_bot_test_")
+for name, value in {
+    "TELEGRAM_TOKEN": "123:abc",
+    "CLIENT_NAME": "client",
+    "CLIENT_PASSWORD": "password",
+    "GOOGLE_GEOCODING_API_KEY": "key",
+    "PERSISTENCE_BACKEND": "sqlite",
+    "PERSISTENCE_PATH": os.path.join(_state_dir, "bot_state.sqlite3"),
+    "SHARED_CACHE_PATH": os.path.join(_state_dir, "shared_cache.sqlite3"),
+    "GEOCODE_CACHE_PATH": os.path.join(_state_dir, "geocode_cache.sqlite3"),
+    "SUBSCRIPTIONS_PATH": os.path.join(_state_dir, "subscriptions.sqlite3"),
+}.items():
+    os.environ.setdefault(name, value)
+
+from telegram import Update, User  # noqa: E402
+from telegram.ext import ConversationHandler  # noqa: E402
+
+import main  # noqa: E402
+from services.persistence import SQLitePersistence  # noqa: E402
+from services.routing import DispatchTable, route_updates  # noqa: E402
+
+
+def _message(bot, text: str) -> Update:
+    return Update.de_json({"update_id": 1, "message": {
+        "message_id": 1, "date": 0, "text": text,
+        "chat": {"id": 7, "type": "private"},
+        "from": {"id": 7, "is_bot": False, "first_name": "Test"},
+    }}, bot)
+
+
+def test_routing_is_enabled_for_persistent_conversations():
+    async def run():
+        application = main.build_application(notifications=False)
+        assert isinstance(application.persistence, SQLitePersistence)
+        # Без мережі: initialize не повинен викликати getMe.
+        application.bot._bot_user = User(123, "Bot", True, username="test_bot")
+        application.bot._initialized = True
+        await application.initialize()
+        try:
+            handlers = list(application.handlers[0])
+            assert any(isinstance(h, ConversationHandler) and h.persistent for h in handlers)
+
+            route_updates(application)
+            table = application.handlers[0][0]
+            assert isinstance(table, DispatchTable)
+            assert table.conversations is not None
+
+            candidates = table.candidates(_message(application.bot, "Вихід"))
+            assert 0 < len(candidates) < len(handlers)
+        finally:
+            await application.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,232 @@
+"""
+Локальний стенд для перевірки режиму вебхука без доступу до мережі.
+
+Піднімає фейковий Bot API (відповідає на getMe, setWebhook, sendMessage тощо
+і записує всі виклики), запускає бота з `main.build_application` у режимі
+вебхука і надсилає йому пачку оновлень `/start` від різних користувачів.
+У кінці друкує пропускну здатність, затримку до першої відповіді та
+кількість відхилених (503) запитів.
+
+    python -m tools.fake_telegram --updates 2000 --users 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_TOKEN = "123456:TEST-TOKEN"
+BOT_ID = 123456
+SECRET = "harness-secret"
+
+
+class FakeTelegram:
+    """Мінімальна імітація Bot API, достатня для обробників бота."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[tuple] = []
+        self.first_reply_at: Dict[int, float] = {}
+        self.replies = defaultdict(int)
+        self._message_id = 0
+
+    @staticmethod
+    async def _params(request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+
+    def _message(self, chat_id, text="") -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bot"},
+            "text": text,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls.append((method, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = {"id": BOT_ID, "is_bot": True, "first_name": "Bot", "username": "fake_bot",
+                      "can_join_groups": False, "can_read_all_group_messages": False,
+                      "supports_inline_queries": False}
+        elif method in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument", "sendLocation"):
+            chat_id = int(params.get("chat_id", 0))
+            self.replies[chat_id] += 1
+            self.first_reply_at.setdefault(chat_id, time.perf_counter())
+            result = self._message(chat_id, params.get("text", ""))
+        elif method == "getWebhookInfo":
+            result = {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        # Усе інше (наприклад, запити до бекенду) — 404.
+        return app
+
+
+def start_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(args) -> None:
+    fake = FakeTelegram(args.api_latency / 1000)
+    fake_runner = web.AppRunner(fake.app(), access_log=None)
+    await fake_runner.setup()
+    await web.TCPSite(fake_runner, "127.0.0.1", args.api_port).start()
+    api_url = f"http://127.0.0.1:{args.api_port}"
+
+    state_dir = tempfile.mkdtemp(prefix="tg_bot_harness_")
+    os.environ.update({
+        "TELEGRAM_TOKEN": FAKE_TOKEN,
+        "TELEGRAM_API_URL": api_url,
+        "API_URL": api_url,
+        "CLIENT_NAME": os.environ.get("CLIENT_NAME", "harness"),
+        "CLIENT_PASSWORD": os.environ.get("CLIENT_PASSWORD", "harness"),
+        "GOOGLE_GEOCODING_API_KEY": os.environ.get("GOOGLE_GEOCODING_API_KEY", "harness"),
+        "GEOCODE_CACHE_PATH": "",
+        "SHARED_CACHE_PATH": os.path.join(state_dir, "shared_cache.sqlite3"),
+        "SHARD_SOCKET_DIR": state_dir,
+        "PERSISTENCE_PATH": os.path.join(state_dir, "bot_state.sqlite3"),
+        "WEBHOOK_URL": f"http://127.0.0.1:{args.port}",
+        "WEBHOOK_SECRET_TOKEN": SECRET,
+        "WEBHOOK_QUEUE_SIZE": str(args.queue_size),
+        "SUBSCRIPTIONS_PATH": os.path.join(state_dir, "subscriptions.sqlite3"),
+        # Фейковий API не має лімітів Telegram; справжні можна задати через змінні оточення.
+        "RATE_LIMIT_GLOBAL": os.environ.get("RATE_LIMIT_GLOBAL", "100000"),
+        "RATE_LIMIT_CHAT": os.environ.get("RATE_LIMIT_CHAT", "100000"),
+        "RATE_LIMIT_CHAT_BURST": os.environ.get("RATE_LIMIT_CHAT_BURST", "100000"),
+    })
+
+    import main
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from services.update_processing import metrics_snapshot
+    from services.webhook import WEBHOOK_PATH, run_webhook
+
+    stop_event = asyncio.Event()
+    if args.workers:
+        from supervisor import Supervisor
+
+        bot_task = asyncio.create_task(Supervisor(args.workers).run(stop_event, "127.0.0.1", args.port))
+    else:
+        application = main.build_application(asyncio.Queue(maxsize=args.queue_size))
+        bot_task = asyncio.create_task(run_webhook(application, stop_event, "127.0.0.1", args.port))
+
+    url = f"http://127.0.0.1:{args.port}{WEBHOOK_PATH}"
+    async with ClientSession() as session:
+        for _ in range(600):
+            try:
+                async with session.get(f"http://127.0.0.1:{args.port}/healthz") as r:
+                    if (await r.json())["status"] == "ok":
+                        break
+            except OSError:
+                pass
+            await asyncio.sleep(0.05)
+
+        async with session.post(url, json=start_update(0, 1), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as r:
+            assert r.status == 403, f"secret token was not checked: {r.status}"
+
+        sent_at: Dict[int, float] = {}
+        rejected = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def deliver(update_id: int) -> None:
+            nonlocal rejected
+            user_id = 1000 + update_id % args.users
+            async with semaphore:
+                while True:
+                    sent_at.setdefault(user_id, time.perf_counter())
+                    async with session.post(url, json=start_update(update_id, user_id),
+                                            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as response:
+                        if response.status != 503:
+                            return
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)) / 10)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(deliver(i) for i in range(1, args.updates + 1)))
+        delivered = time.perf_counter() - started
+
+        deadline = time.perf_counter() + args.timeout
+        while sum(fake.replies.values()) < args.updates and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    await bot_task
+    await fake_runner.cleanup()
+
+    replies = sum(fake.replies.values())
+    latencies = [fake.first_reply_at[u] - sent_at[u] for u in sent_at if u in fake.first_reply_at]
+    print(f"updates sent:     {args.updates} in {delivered:.2f}s")
+    print(f"replies received: {replies} in {elapsed:.2f}s ({replies / elapsed:.0f}/s)")
+    print(f"rejected (503):   {rejected}")
+    print(f"first reply p50:  {percentile(latencies, 0.5) * 1000:.1f} ms")
+    print(f"first reply p95:  {percentile(latencies, 0.95) * 1000:.1f} ms")
+    print(f"setWebhook calls: {sum(1 for m, _ in fake.calls if m == 'setWebhook')}")
+    for kind, timings in metrics_snapshot().items():
+        for name, summary in timings.items():
+            print(f"{kind} {name}: {summary}")
+    if replies < args.updates:
+        sys.exit(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--api-port", type=int, default=18081)
+    parser.add_argument("--api-latency", type=float, default=0, help="затримка фейкового Bot API, мс")
+    parser.add_argument("--workers", type=int, default=0, help="запустити через supervisor з N воркерами")
+    parser.add_argument("--timeout", type=float, default=30)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))